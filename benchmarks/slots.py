@@ -0,0 +1,79 @@
+"""
+Benchmark for slot machine spins, and a check of the expected payout.
+
+Usage::
+
+    python -m benchmarks.slots
+"""
+from collections import deque
+from pathlib import Path
+from random import randint, sample
+from time import perf_counter
+
+from core.slot_machine import SlotMachine, payout
+
+EMOJI_PATH = Path(__file__).parent.parent.joinpath('data', 'emojis.txt')
+
+
+def _old_spin(emojis, lower=2, upper=5):
+    """
+    The spin slots_setup and roll_slots used to do.
+    """
+    emoji_lst = sample(emojis, randint(upper // 2, upper) * 3)
+    reels = [deque(sample(emoji_lst, len(emoji_lst))) for _ in range(3)]
+    for reel in reels:
+        reel.rotate(randint(lower, upper))
+    return reels[0][0], reels[1][0], reels[2][0]
+
+
+def expected_return(lower: int = 2, upper: int = 5) -> float:
+    """
+    Get the exact expected payout of a bet of 1.
+    :param lower: the minimum number of rotations of a reel.
+    :param upper: the maximum number of rotations of a reel.
+    :return: the expected payout.
+    """
+    sizes = [k * 3 for k in range(upper // 2, upper + 1)]
+    res = 0
+    for m in sizes:
+        win = 1 / m ** 2
+        lose = (m - 1) * (m - 2) / m ** 2
+        res += 3 * win + (1 - win - lose)
+    return res / len(sizes)
+
+
+def _report(name: str, spins: int, elapsed: float):
+    """
+    Print the time per spin and the spin rate.
+    """
+    print(f'{name}: {elapsed / spins * 1e6:.1f} us/spin, '
+          f'{spins / elapsed / 1e3:.0f}k spins/s')
+
+
+def run(spins: int = 200000, seed: int = 0):
+    """
+    Time spins and compare the simulated payout with the expected one.
+    :param spins: the number of spins to simulate.
+    :param seed: the random seed.
+    """
+    with EMOJI_PATH.open() as f:
+        emojis = f.read().splitlines()
+    machine = SlotMachine(emojis, seed=seed)
+    total = 0
+    start = perf_counter()
+    for _ in range(spins):
+        total += payout([reel[-1] for reel in machine.spin_indices()], 1)
+    _report('spin_indices', spins, perf_counter() - start)
+    start = perf_counter()
+    for _ in range(spins):
+        machine.spin()
+    _report('spin', spins, perf_counter() - start)
+    start = perf_counter()
+    for _ in range(spins):
+        _old_spin(emojis)
+    _report('old spin', spins, perf_counter() - start)
+    print(f'payout: {total / spins:.4f} (expected {expected_return():.4f})')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,53 @@
+"""
+Benchmark for translation lookups.
+
+Usage::
+
+    python -m benchmarks.translate
+"""
+import sys
+from pathlib import Path
+from time import perf_counter
+
+TRANSLATIONS_PATH = Path(__file__).parent.parent.joinpath('translations')
+
+
+def _nested_get(data, lan, file, key):
+    """
+    The lookup Translation used to do on nested per file dicts.
+    """
+    if not file.endswith('.json'):
+        file = f'{file}.json'
+    language_data = data[lan][file]
+    english_data = data['en'][file][key]
+    return language_data.get(key, english_data)
+
+
+def run(lookups: int = 1000000):
+    """
+    Time translation lookups against the nested dict lookup.
+    :param lookups: the number of lookups to time.
+    """
+    sys.path.insert(0, str(TRANSLATIONS_PATH))
+    from translations import Translation
+    start = perf_counter()
+    tr = Translation()
+    print(f'load: {(perf_counter() - start) * 1000:.2f} ms')
+    nested = {
+        lan: {f'{file}.json': val for file, val in tr.raw(lan).items()}
+        for lan in tr.languages
+    }
+    keys = [(lan, 'sentence', key) for lan in tr.languages
+            for key in tr.raw('en')['sentence']]
+    keys = (keys * (lookups // len(keys) + 1))[:lookups]
+    for name, func in (('flat', tr.get),
+                       ('nested', lambda *a: _nested_get(nested, *a))):
+        start = perf_counter()
+        for lan, file, key in keys:
+            func(lan, file, key)
+        elapsed = perf_counter() - start
+        print(f'{name}: {lookups / elapsed / 1e6:.2f}M lookups/s')
+
+
+if __name__ == '__main__':
+    run()
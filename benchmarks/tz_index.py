@@ -0,0 +1,63 @@
+"""
+Benchmark for the offline time zone index.
+
+Usage::
+
+    python -m benchmarks.tz_index [path/to/tz_index.bin]
+
+Without a path, a synthetic index of 1 degree squares is built first.
+"""
+from pathlib import Path
+from random import Random
+from sys import argv
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from core.tz_index import TzIndex, build_index
+
+
+def _synthetic_zones():
+    """
+    Generate one zone per 15 degree longitude band, with a jagged boundary.
+    :return: a generator of (name, polygons)
+    """
+    for band in range(24):
+        x0 = band * 15 - 180
+        ring = [(x0, -85), (x0 + 15, -85)]
+        ring += [(x0 + 15 + (lat % 2) * 0.3, lat) for lat in range(-84, 85)]
+        ring += [(x0 + 15, 85), (x0, 85)]
+        yield f'Etc/Band{band}', [[ring]]
+
+
+def run(path: Path, lookups: int = 1000000):
+    """
+    Time the first lookup (file mapping) and the average lookup.
+    :param path: the index file.
+    :param lookups: the number of lookups to time.
+    """
+    rng = Random(0)
+    coords = [(rng.uniform(-90, 90), rng.uniform(-180, 180))
+              for _ in range(lookups)]
+    index = TzIndex(path)
+    start = perf_counter()
+    index.tz_name_at(0, 0)
+    load = perf_counter() - start
+    lookup = index.tz_name_at
+    start = perf_counter()
+    for lat, lon in coords:
+        lookup(lat, lon)
+    per_lookup = (perf_counter() - start) / lookups
+    print(f'index size: {path.stat().st_size / 1024:.1f} KiB')
+    print(f'load: {load * 1000:.3f} ms')
+    print(f'lookup: {per_lookup * 1e6:.3f} us')
+
+
+if __name__ == '__main__':
+    if len(argv) > 1:
+        run(Path(argv[1]))
+    else:
+        with TemporaryDirectory() as tmp:
+            start = perf_counter()
+            built = build_index(_synthetic_zones(), Path(tmp, 'tz_index.bin'))
+            print(f'build: {perf_counter() - start:.2f} s')
+            run(built)
@@ -0,0 +1,149 @@
+"""
+Background delivery of error reports to the error log channel.
+"""
+from asyncio import ensure_future, sleep
+from hashlib import sha1
+from io import BytesIO
+from typing import List
+
+from discord import File
+
+from scripts.helpers import code_block
+
+_MESSAGE_LIMIT = 2000
+
+
+class ErrorReport:
+    """
+    A traceback and how many times it happened.
+    """
+    __slots__ = ('header', 'tb', 'count')
+
+    def __init__(self, header: str, tb: str):
+        """
+        Initialize an instance of this class.
+        :param header: the header for the error.
+        :param tb: the traceback.
+        """
+        self.header = header
+        self.tb = tb
+        self.count = 1
+
+    @property
+    def title(self) -> str:
+        """
+        :return: the header with the occurrence count.
+        """
+        if self.count > 1:
+            return f'{self.header} (x{self.count})'
+        return self.header
+
+
+class ErrorReporter:
+    """
+    Queues error reports and sends them to the error log channel in the
+    background. Identical tracebacks are merged with an occurrence count,
+    and everything queued since the last delivery is sent as a few pages,
+    or as a single file attachment if it's too long, at most once every
+    ``interval`` seconds.
+    """
+    __slots__ = ('bot', 'interval', 'max_pages', 'max_pending', 'dropped',
+                 'sent', '_pending', '_task')
+
+    def __init__(self, bot, interval: float = 5, max_pages: int = 3,
+                 max_pending: int = 100):
+        """
+        Initialize an instance of this class.
+        :param bot: the bot instance.
+        :param interval: the minimum seconds between two deliveries.
+        :param max_pages: the maximum number of messages per delivery,
+        longer deliveries are sent as a file.
+        :param max_pending: the maximum number of distinct reports queued,
+        reports past this are dropped.
+        """
+        self.bot = bot
+        self.interval = interval
+        self.max_pages = max_pages
+        self.max_pending = max_pending
+        self.dropped = 0
+        self.sent = 0
+        self._pending = {}
+        self._task = None
+
+    def report(self, header: str, tb: str):
+        """
+        Queue an error report, this never blocks.
+        :param header: the header for the error.
+        :param tb: the traceback.
+        """
+        key = sha1(tb.encode()).digest()
+        pending = self._pending.get(key)
+        if pending:
+            pending.count += 1
+        elif len(self._pending) < self.max_pending:
+            self._pending[key] = ErrorReport(header, tb)
+        else:
+            self.dropped += 1
+            return
+        if self._task is None or self._task.done():
+            self._task = ensure_future(self.__drain())
+
+    def pages(self, reports: List[ErrorReport]) -> List[str]:
+        """
+        Pack reports into as few messages as possible.
+        :param reports: the reports.
+        :return: the messages, an empty list if they don't fit in
+        ``max_pages`` messages.
+        """
+        res = []
+        page = ''
+        for report in reports:
+            title = report.title
+            headers = [title[i:i + _MESSAGE_LIMIT]
+                       for i in range(0, len(title), _MESSAGE_LIMIT)]
+            for piece in headers + code_block(report.tb, 'py'):
+                if page and len(page) + len(piece) + 1 > _MESSAGE_LIMIT:
+                    res.append(page)
+                    page = ''
+                page = f'{page}\n{piece}' if page else piece
+            if len(res) >= self.max_pages:
+                return []
+        res.append(page)
+        return res
+
+    async def flush(self):
+        """
+        Send every queued report now.
+        """
+        if not self._pending:
+            return
+        reports = list(self._pending.values())
+        self._pending.clear()
+        channel = self.bot.get_channel(self.bot.config['Bot']['error log'])
+        if not channel:
+            return
+        pages = self.pages(reports)
+        if pages:
+            for page in pages:
+                await channel.send(page)
+        else:
+            text = '\n\n'.join(f'{r.title}\n{r.tb}' for r in reports)
+            total = sum(r.count for r in reports)
+            await channel.send(
+                f'**{total}** errors', file=File(
+                    BytesIO(text.encode('utf-8')), 'errors.txt'
+                )
+            )
+        self.sent += len(reports)
+
+    async def __drain(self):
+        """
+        Deliver queued reports until the queue is empty, waiting
+        ``interval`` seconds after every delivery.
+        """
+        while self._pending:
+            try:
+                await self.flush()
+            except Exception as e:
+                self.bot.logger.warning(f'Failed to send error report: {e}')
+            await sleep(self.interval)
@@ -10,13 +10,17 @@ from aiohttp import ClientSession
 from discord import Message
 from discord.ext.commands import AutoShardedBot, Context
 
+from bot.error_reporter import ErrorReporter
 from bot.hifumi_functions import (get_data_manager, handle_error)
+from bot.message_context import MessageContext, MessageContextCache
+from bot.message_router import MessageKind, MessageRouter
+from bot.mod_log import ModLog
 from bot.session_manager import SessionManager
 from config import Config
-from core.listen_core import send_traceback
-from data_controller import DataManager, TagMatcher
+from data_controller import CommandFilter, DataManager, ReminderScheduler, \
+    TagMatcher, WarnTracker
 from data_controller.data_utils import get_prefix
-from scripts.logger import get_console_handler, setup_logging
+from scripts.logger import setup_logging
 from translations.translations import Translation
 
 
@@ -32,6 +36,9 @@ class Hifumi(AutoShardedBot):
                  session_manager: SessionManager,
                  tag_matcher: TagMatcher,
                  data_manager: DataManager,
+                 command_filter: CommandFilter,
+                 reminders: ReminderScheduler,
+                 warns: WarnTracker,
                  logger,
                  emojis: list):
         """
@@ -41,6 +48,9 @@ class Hifumi(AutoShardedBot):
         :param session_manager: the SessionManager instance.
         :param tag_matcher: the TagMatcher instance.
         :param data_manager: the DataManager instance.
+        :param command_filter: the CommandFilter instance.
+        :param reminders: the ReminderScheduler instance.
+        :param warns: the WarnTracker instance.
         :param logger: the logger.
         :param emojis: the list of emojis.
         """
@@ -49,12 +59,19 @@ class Hifumi(AutoShardedBot):
         self.session_manager = session_manager
         self.tag_matcher = tag_matcher
         self.data_manager = data_manager
+        self.command_filter = command_filter
+        self.reminders = reminders
+        self.reminders.start(self.__send_reminder)
+        self.warns = warns
         self.start_time = start_time
         self.language = Translation()
+        self.message_contexts = MessageContextCache()
+        self.router = MessageRouter(self)
+        self.router.subscribe(MessageKind.COMMAND, self.process_commands)
+        self.error_reporter = ErrorReporter(self)
+        self.mod_log = ModLog(self)
         self.logger = logger
         self.all_emojis = emojis
-        self.mention_regex = None
-        self.mention_msg_regex = None
         super().__init__(command_prefix=get_prefix)
 
     @classmethod
@@ -69,17 +86,18 @@ class Hifumi(AutoShardedBot):
         start_time = int(time())
         with data_path.joinpath('emojis.txt').open() as f:
             all_emojis = f.read().splitlines()
-        logger = setup_logging(start_time, log_path)
-        if config['Bot']['console logging']:
-            logger.addHandler(get_console_handler())
-        session_manager = SessionManager(ClientSession(), logger)
-        data_manager, tag_matcher = await get_data_manager(
-            config.postgres(), logger
+        logger = setup_logging(
+            start_time, log_path, config['Bot']['console logging'],
+            config.logging()
         )
+        session_manager = SessionManager(ClientSession(), logger)
+        data_manager, tag_matcher, command_filter, reminders, warns = \
+            await get_data_manager(config.postgres(), logger)
         return cls(
             start_time=start_time, config=config,
             session_manager=session_manager, tag_matcher=tag_matcher,
-            data_manager=data_manager, logger=logger,
+            data_manager=data_manager, command_filter=command_filter,
+            reminders=reminders, warns=warns, logger=logger,
             emojis=all_emojis
         )
 
@@ -99,6 +117,15 @@ class Hifumi(AutoShardedBot):
     def mention_nick(self):
         return '<@!{}>'.format(self.client_id)
 
+    async def close(self):
+        """
+        Finish the queued mod log and warn history work before closing.
+        Check :func:`discord.Client.close` for more details.
+        """
+        await self.mod_log.close()
+        await self.warns.close()
+        await super().close()
+
     async def on_error(self, event_method, *args, **kwargs):
         """
         General error handling for discord
@@ -111,9 +138,14 @@ class Hifumi(AutoShardedBot):
         if ctx:
             await ctx.send(self.translate(ctx, 'sentence', 'ex_error'))
         self.logger.log(lvl, log_msg)
-        await send_traceback(
-            self.get_channel(self.config['Bot']['error log']), header, tb
-        )
+        self.error_reporter.report(header, tb)
+
+    async def on_message(self, message):
+        """
+        Pass every message through the message router.
+        Check :func:`discord.Client.on_message` for more details.
+        """
+        await self.router.route(message)
 
     async def process_commands(self, message):
         """
@@ -125,9 +157,27 @@ class Hifumi(AutoShardedBot):
             return
         prefix = get_prefix(self, message)
         name = message.content.split(' ')[0][len(prefix):]
-        # TODO Implement command black list
+        command = self.all_commands.get(name)
+        if (command is not None and command.name != 'cmdfilter' and
+                message.author.id not in self.config['Bot']['owners']):
+            guild = message.guild
+            if await self.command_filter.is_blocked(
+                    guild.id if guild else None, message.channel.id,
+                    message.author.id, command.name):
+                return
         await super().process_commands(message)
 
+    async def __send_reminder(self, channel_id: int, content: str):
+        """
+        Send a due reminder.
+        :param channel_id: the channel id.
+        :param content: the reminder content.
+        """
+        await self.wait_until_ready()
+        channel = self.get_channel(channel_id)
+        if channel:
+            await channel.send(content)
+
     def start_bot(self, cogs):
         """
         Start the bot.
@@ -138,16 +188,43 @@ class Hifumi(AutoShardedBot):
             self.add_cog(cog)
         self.run(self.config['Bot']['token'])
 
+    def message_context(
+            self, ctx_msg: Union[Context, Message]) -> MessageContext:
+        """
+        Get the resolved prefix and language of a message, they are resolved
+        once per message and shared by every handler of that message.
+        :param ctx_msg: the discord context object, or a message object
+        :return: the MessageContext of the message
+        """
+        message = getattr(ctx_msg, 'message', ctx_msg)
+        context = self.message_contexts.get(message.id)
+        if context is None:
+            guild = message.guild
+            if guild is None:
+                prefix, language = self.default_prefix, 'en'
+            else:
+                prefix = (self.data_manager.get_prefix(guild.id) or
+                          self.default_prefix)
+                language = self.data_manager.get_language(guild.id) or 'en'
+            context = MessageContext(prefix, language, self.language)
+            self.message_contexts.put(message.id, context)
+        return context
+
+    def guild_settings_changed(self, guild_id: int):
+        """
+        Drop the cached prefix and language state after a guild's settings
+        changed.
+        :param guild_id: the guild id.
+        """
+        self.message_contexts.clear()
+
     def lan(self, ctx_msg: Union[Context, Message]) -> str:
         """
         Get the language key of the context
         :param ctx_msg: the discord context object, or a message object
         :return: the language key
         """
-        try:
-            return self.data_manager.get_language(ctx_msg.guild.id)
-        except (TypeError, AttributeError):
-            return 'en'
+        return self.message_context(ctx_msg).language
 
     def translate(self, ctx_msg: Union[Context, Message], file, key) -> str:
-        return self.language.get(self.lan(ctx_msg), file, key)
+        return self.message_context(ctx_msg).translate(file, key)
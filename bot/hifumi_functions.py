@@ -4,16 +4,20 @@ from logging import CRITICAL, ERROR, INFO
 from asyncpg import create_pool
 from discord.ext.commands import Context
 
-from data_controller import DataManager, TagMatcher
+from data_controller import CommandFilter, DataManager, ReminderScheduler, \
+    TagMatcher, WarnTracker
 from data_controller.postgres import Postgres
 
 
 async def get_data_manager(pg_config: dict, logger) -> tuple:
     """
-    Get an instance of DataManager and TagMatcher.
+    Get an instance of DataManager, TagMatcher, CommandFilter,
+    ReminderScheduler and WarnTracker.
     :param pg_config: the postgres config info.
     :param logger: the logger.
-    :return: a tuple of (DataManager, TagMatcher)
+    :return: a tuple of
+        (DataManager, TagMatcher, CommandFilter, ReminderScheduler,
+        WarnTracker)
     """
     pool = await create_pool(
         host=pg_config['host'], port=pg_config['port'], user=pg_config['user'],
@@ -22,10 +26,15 @@ async def get_data_manager(pg_config: dict, logger) -> tuple:
     post = Postgres(pool, pg_config['schema'], logger)
     data_manager = DataManager(post)
     tag_matcher = TagMatcher(post, await post.get_tags())
+    command_filter = CommandFilter(post)
+    reminders = ReminderScheduler(post, logger)
+    warns = WarnTracker(post, data_manager, logger)
     logger.log(INFO, 'Connected to database: {}.{}'.format(
         pg_config['database'], pg_config['schema']))
     await data_manager.init()
-    return data_manager, tag_matcher
+    await command_filter.init()
+    await warns.init()
+    return data_manager, tag_matcher, command_filter, reminders, warns
 
 
 def handle_error(tb, event_method, *args, **kwargs) -> tuple:
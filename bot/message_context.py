@@ -0,0 +1,75 @@
+"""
+Per message resolved state.
+"""
+from collections import OrderedDict
+
+from translations.translations import Translation
+
+
+class MessageContext:
+    """
+    The prefix and language resolved for a single message.
+    """
+    __slots__ = ('prefix', 'language', '_translation')
+
+    def __init__(self, prefix: str, language: str, translation: Translation):
+        """
+        Initialize an instance of this class.
+        :param prefix: the command prefix for the message.
+        :param language: the language key for the message.
+        :param translation: the Translation instance.
+        """
+        self.prefix = prefix
+        self.language = language
+        self._translation = translation
+
+    def translate(self, file: str, key: str) -> str:
+        """
+        Get a string in the language of the message.
+        :param file: the file name.
+        :param key: the key to the string.
+        :return: the string.
+        """
+        return self._translation.get(self.language, file, key)
+
+
+class MessageContextCache:
+    """
+    A bounded cache of MessageContext keyed by message id, so every handler
+    of a message shares the same resolved state.
+    """
+    __slots__ = ('_contexts', 'max_size')
+
+    def __init__(self, max_size: int = 1024):
+        """
+        Initialize an instance of this class.
+        :param max_size: the maximum number of messages to remember.
+        """
+        self._contexts = OrderedDict()
+        self.max_size = max_size
+
+    def get(self, message_id: int):
+        """
+        Get the context of a message.
+        :param message_id: the message id.
+        :return: the context if it's cached, else None.
+        """
+        return self._contexts.get(message_id)
+
+    def put(self, message_id: int, context: MessageContext):
+        """
+        Cache the context of a message, the oldest context is dropped if
+        the cache is full.
+        :param message_id: the message id.
+        :param context: the context.
+        """
+        self._contexts[message_id] = context
+        if len(self._contexts) > self.max_size:
+            self._contexts.popitem(last=False)
+
+    def clear(self):
+        """
+        Drop all cached contexts, for example after a prefix or language
+        change.
+        """
+        self._contexts.clear()
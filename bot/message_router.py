@@ -0,0 +1,110 @@
+"""
+Single entry point for incoming messages.
+"""
+from asyncio import ensure_future
+from collections import Counter
+from enum import IntFlag
+
+from discord import Message
+from discord.abc import Messageable
+
+
+class MessageKind(IntFlag):
+    """
+    The kinds of messages the router dispatches.
+    """
+    BOT = 1
+    IGNORED = 2
+    PLAIN = 4
+    MENTION = 8
+    COMMAND = 16
+
+
+class MessageRouter:
+    """
+    Classifies every message once and only dispatches it to the handlers
+    subscribed to its kind, so messages nobody cares about are dropped
+    before any handler runs.
+    """
+    __slots__ = ('bot', 'counters', '_handlers', '_mentions')
+
+    def __init__(self, bot):
+        """
+        Initialize an instance of this class.
+        :param bot: the bot instance.
+        """
+        self.bot = bot
+        self.counters = Counter()
+        self._handlers = {kind: [] for kind in MessageKind}
+        self._mentions = None
+
+    def subscribe(self, kinds: MessageKind, handler):
+        """
+        Subscribe a handler to some kinds of messages.
+        :param kinds: the kinds of messages, combined with ``|``.
+        :param handler: a coroutine function that takes the message.
+        """
+        for kind in MessageKind:
+            if kind & kinds:
+                self._handlers[kind].append(handler)
+
+    def unsubscribe(self, handler):
+        """
+        Unsubscribe a handler from every kind of message, for example when
+        its cog is unloaded.
+        :param handler: the handler.
+        """
+        for handlers in self._handlers.values():
+            while handler in handlers:
+                handlers.remove(handler)
+
+    def classify(self, message: Message) -> MessageKind:
+        """
+        Classify a message.
+        :param message: the message.
+        :return: the kind of the message.
+        """
+        if message.author.bot:
+            return MessageKind.BOT
+        content = message.content
+        if not content or not isinstance(message.channel, Messageable):
+            return MessageKind.IGNORED
+        if content.startswith(self.bot.message_context(message).prefix):
+            return MessageKind.COMMAND
+        if self._mentions is None and self.bot.user:
+            self._mentions = (self.bot.mention_normal, self.bot.mention_nick)
+        if self._mentions and content.startswith(self._mentions):
+            return MessageKind.MENTION
+        return MessageKind.PLAIN
+
+    async def route(self, message: Message):
+        """
+        Dispatch a message to the handlers subscribed to its kind.
+        :param message: the message.
+        """
+        kind = self.classify(message)
+        self.counters[kind.name.lower()] += 1
+        handlers = self._handlers[kind]
+        if not handlers:
+            self.counters['dropped'] += 1
+            return
+        for handler in handlers:
+            ensure_future(self.__run(handler, message))
+
+    async def __run(self, handler, message: Message):
+        """
+        Run a handler, errors are passed to the bot's error handling.
+        :param handler: the handler.
+        :param message: the message.
+        """
+        try:
+            await handler(message)
+        except Exception:
+            await self.bot.on_error('on_message', message)
+
+    @property
+    def stats(self) -> dict:
+        """
+        :return: the message counts by kind, and how many were dropped.
+        """
+        return dict(self.counters)
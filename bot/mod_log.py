@@ -0,0 +1,285 @@
+"""
+Batched delivery of mod log entries, and their history in the db.
+"""
+from asyncio import ensure_future, gather, sleep
+from datetime import datetime
+from typing import List, Optional
+
+from discord import Embed, Forbidden, NotFound
+
+from scripts.discord_functions import get_avatar_url, \
+    get_name_with_discriminator
+from scripts.helpers import get_date
+
+ACTION_COLOURS = {
+    'mute': 0x591f60,
+    'unmute': 0x4286f4,
+    'ban': 0xe52424,
+    'kick': 0xdd6f1a,
+    'warn': 0xddc61a,
+    'pardon': 0x4286f4
+}
+
+# Discord embed limits.
+_MAX_FIELDS = 25
+_NAME_LIMIT = 256
+_VALUE_LIMIT = 1024
+
+
+def _describe(member) -> str:
+    return get_name_with_discriminator(member) + ' ({})'.format(member.id)
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 3] + '...'
+
+
+class ModLogEntry:
+    """
+    A moderation action.
+    """
+    __slots__ = ('action', 'mod', 'targets', 'reason', 'warn_count', 'time')
+
+    def __init__(self, action: str, mod, targets: list, reason: str,
+                 warn_count: int = None):
+        """
+        Initialize an instance of this class.
+        :param action: the action, one of the keys of ACTION_COLOURS.
+        :param mod: the mod that performed the action.
+        :param targets: the targets of the action.
+        :param reason: the reason.
+        :param warn_count: the total warning count on the target.
+        """
+        self.action = action
+        self.mod = mod
+        self.targets = targets
+        self.reason = reason
+        self.warn_count = warn_count
+        self.time = datetime.utcnow()
+
+
+def generate_mod_log_entry(entry: ModLogEntry, localize: dict) -> Embed:
+    """
+    Generate the embed of a single mod log entry
+    :param entry: the entry
+    :param localize: the localization strings
+    :return: A discord embed object for the mod log entry
+    """
+    embed = Embed(colour=ACTION_COLOURS[entry.action])
+    targets = entry.targets
+    if len(targets) == 1:
+        embed.set_author(
+            name=_describe(targets[0]), icon_url=get_avatar_url(targets[0])
+        )
+    else:
+        embed.set_author(name=localize['bulk_mod_log'].format(len(targets)))
+    embed.set_footer(
+        text=get_name_with_discriminator(entry.mod) + ' | ' + get_date(),
+        icon_url=get_avatar_url(entry.mod)
+    )
+    embed.add_field(
+        name=localize['type'], value=localize[entry.action].title()
+    )
+    embed.add_field(name=localize['reason'], value=entry.reason)
+    if len(targets) > 1:
+        names = [_describe(t) for t in targets]
+        value = '\n'.join(names)
+        while len(value) > _VALUE_LIMIT:
+            names.pop()
+            value = '\n'.join(names) + '\n...'
+        embed.add_field(name=localize['members'], value=value, inline=False)
+    if entry.warn_count is not None:
+        embed.add_field(name=localize['warnings'], value=str(entry.warn_count))
+    return embed
+
+
+def generate_batch_embed(entries: List[ModLogEntry], localize: dict) -> Embed:
+    """
+    Generate one embed for up to 25 mod log entries, with a field for each
+    entry
+    :param entries: the entries
+    :param localize: the localization strings
+    :return: A discord embed object for the entries
+    """
+    actions = {e.action for e in entries}
+    colour = ACTION_COLOURS[entries[0].action] if len(actions) == 1 \
+        else 0x4286f4
+    embed = Embed(
+        colour=colour,
+        title=localize['mod_log_batch'].format(len(entries))
+    )
+    embed.set_footer(text=get_date())
+    for entry in entries:
+        if len(entry.targets) == 1:
+            target = _describe(entry.targets[0])
+        else:
+            target = localize['bulk_mod_log'].format(len(entry.targets))
+        name = f'{localize[entry.action].title()} | {target}'
+        value = '{}: {}\n{} | {:%H:%M:%S}'.format(
+            localize['reason'], entry.reason,
+            get_name_with_discriminator(entry.mod), entry.time
+        )
+        if entry.warn_count is not None:
+            value += '\n{}: {}'.format(localize['warnings'], entry.warn_count)
+        embed.add_field(
+            name=_truncate(name, _NAME_LIMIT),
+            value=_truncate(value, _VALUE_LIMIT), inline=False
+        )
+    return embed
+
+
+class ModLog:
+    """
+    Sends mod log entries to the mod log channel of their guild and keeps a
+    copy of every action in the db.
+
+    The mod log channel of each guild is cached. Entries of a guild that
+    are added within ``window`` seconds of each other are sent as one
+    message, and the history rows are written in one batch.
+    """
+    __slots__ = ('bot', 'window', 'sent', '_channels', '_pending', '_tasks',
+                 '_rows', '_writer')
+
+    def __init__(self, bot, window: float = 2):
+        """
+        Initialize an instance of this class.
+        :param bot: the bot instance.
+        :param window: the seconds entries are held for before sending.
+        """
+        self.bot = bot
+        self.window = window
+        self.sent = 0
+        self._channels = {}
+        self._pending = {}
+        self._tasks = {}
+        self._rows = []
+        self._writer = None
+
+    def get_channel(self, guild):
+        """
+        Get the mod log channel of a guild, it's removed from the db if the
+        channel no longer exists.
+        :param guild: the guild.
+        :return: the channel, None if there is none.
+        """
+        # FIXME Remove casting after library rewrite
+        guild_id = int(guild.id)
+        try:
+            return self._channels[guild_id]
+        except KeyError:
+            pass
+        channel_id = self.bot.data_manager.get_mod_log(guild_id)
+        channel = guild.get_channel(str(channel_id)) if channel_id else None
+        if channel_id and not channel:
+            ensure_future(self.bot.data_manager.set_mod_log(guild_id, None))
+        self._channels[guild_id] = channel
+        return channel
+
+    async def set_channel(self, guild_id: int, channel_id: Optional[int]):
+        """
+        Set or remove the mod log channel of a guild.
+        :param guild_id: the guild id.
+        :param channel_id: the channel id, None to remove it.
+        """
+        await self.bot.data_manager.set_mod_log(guild_id, channel_id)
+        self._channels.pop(guild_id, None)
+
+    def add(self, guild, localize: dict, entry: ModLogEntry):
+        """
+        Queue a mod log entry, this never blocks.
+        :param guild: the guild.
+        :param localize: the localization strings.
+        :param entry: the entry.
+        """
+        guild_id = str(guild.id)
+        self._rows.extend(
+            (guild_id, entry.action, str(entry.mod.id), str(t.id),
+             entry.reason, entry.time)
+            for t in entry.targets
+        )
+        if self._writer is None or self._writer.done():
+            self._writer = ensure_future(self.__write())
+        if not self.get_channel(guild):
+            return
+        self._pending.setdefault(guild_id, []).append(entry)
+        task = self._tasks.get(guild_id)
+        if task is None or task.done():
+            self._tasks[guild_id] = ensure_future(
+                self.__deliver(guild, localize)
+            )
+
+    async def flush(self, guild, localize: dict):
+        """
+        Send the queued entries of a guild now.
+        :param guild: the guild.
+        :param localize: the localization strings.
+        """
+        entries = self._pending.pop(str(guild.id), None)
+        channel = self.get_channel(guild)
+        if not entries or not channel:
+            return
+        if len(entries) == 1:
+            embeds = [generate_mod_log_entry(entries[0], localize)]
+        else:
+            embeds = [
+                generate_batch_embed(entries[i:i + _MAX_FIELDS], localize)
+                for i in range(0, len(entries), _MAX_FIELDS)
+            ]
+        try:
+            for embed in embeds:
+                await self.bot.send_message(channel, embed=embed)
+        except (Forbidden, NotFound):
+            # The channel was deleted or can't be used anymore.
+            self._channels.pop(int(guild.id), None)
+            raise
+        self.sent += len(entries)
+
+    async def __deliver(self, guild, localize: dict):
+        """
+        Wait for more entries, then send them. Entries added while sending
+        are sent in the next round.
+        """
+        guild_id = str(guild.id)
+        while self._pending.get(guild_id):
+            await sleep(self.window)
+            try:
+                await self.flush(guild, localize)
+            except Exception as e:
+                self.bot.logger.warning(f'Failed to send mod log: {e}')
+
+    async def __write(self):
+        """
+        Write the queued history rows to the db. Rows added while writing
+        are written in the next round.
+        """
+        while self._rows:
+            await sleep(self.window)
+            rows, self._rows = self._rows, []
+            try:
+                await self.bot.data_manager.add_mod_logs(rows)
+            except Exception as e:
+                self.bot.logger.warning(
+                    f'Failed to save mod log history: {e}')
+
+    async def close(self):
+        """
+        Wait for the queued entries to be sent and written.
+        """
+        tasks = [t for t in self._tasks.values() if not t.done()]
+        if self._writer is not None and not self._writer.done():
+            tasks.append(self._writer)
+        await gather(*tasks)
+
+    async def history(self, guild_id: int, target_id: int = None,
+                      limit: int = 10) -> List[tuple]:
+        """
+        Get the most recent actions of a guild.
+        :param guild_id: the guild id.
+        :param target_id: only get the actions on this user if given.
+        :param limit: the maximum number of actions.
+        :return: a list of (action, mod id, target id, reason, time),
+        newest first.
+        """
+        return await self.bot.data_manager.get_mod_logs(
+            guild_id, target_id, limit
+        )
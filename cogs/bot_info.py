@@ -193,6 +193,7 @@ class BotInfo:
         await self.bot.data_manager.set_prefix(
             int(ctx.message.server.id), prefix
         )
+        self.bot.guild_settings_changed(int(ctx.message.server.id))
         await self.bot.say(localize['set_prefix'].format(prefix))
 
     @prefix.command(pass_context=True, no_pm=True, name='set')
@@ -216,5 +217,6 @@ class BotInfo:
         await self.bot.data_manager.set_prefix(
             int(ctx.message.server.id), None
         )
+        self.bot.guild_settings_changed(int(ctx.message.server.id))
         prefix = get_prefix(self.bot, ctx.message)
         await self.bot.say(localize['set_prefix'].format(prefix))
@@ -2,8 +2,8 @@
 The channel reader cog
 """
 from scripts.discord_functions import check_message
-from data_controller.data_utils import get_prefix
 from bot import Hifumi
+from bot.message_router import MessageKind
 
 
 class ChannelReader:
@@ -18,10 +18,14 @@ class ChannelReader:
         :param bot: the bot object
         """
         self.bot = bot
+        self.bot.router.subscribe(MessageKind.MENTION, self.on_mention)
 
-    async def on_message(self, message):
+    def __unload(self):
+        self.bot.router.unsubscribe(self.on_mention)
+
+    async def on_mention(self, message):
         """
-        Events for reading messages
+        Events for reading messages that start with a mention to the bot
         :param message: the message
         """
         if check_message(
@@ -29,8 +33,7 @@ class ChannelReader:
         ) or check_message(
             self.bot, message, self.bot.mention_nick + ' prefix'
         ):
-            prefix = get_prefix(self.bot, message)
-            localize = self.bot.localize(message)
-            await self.bot.send_message(
-                message.channel,
-                localize['prefix'].format(prefix, self.bot.default_prefix))
+            context = self.bot.message_context(message)
+            await message.channel.send(
+                context.translate('sentence', 'prefix').format(
+                    context.prefix, self.bot.default_prefix))
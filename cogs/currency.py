@@ -1,11 +1,15 @@
+from asyncio import sleep
+
 from discord import Member, Object
 from discord.ext import commands
 from pytrivia import Trivia
 
 from bot import Hifumi
-from core.currency_core import daily, determine_slot_result, roll_slots, \
-    slots_setup, transfer
-from core.trivia_core import TriviaGame
+from core.currency_core import SLOT_DELAY, daily, determine_slot_result, \
+    format_slots, roll_slots, transfer
+from core.slot_machine import SlotMachine
+from core.trivia_core import TriviaGame, TriviaSessions
+from core.trivia_pool import TriviaPool
 from data_controller import LowBalanceError
 from data_controller.data_utils import change_balance
 
@@ -14,11 +18,17 @@ class Currency:
     """
     Commands related to currency
     """
-    __slots__ = ['bot', 'trivia_api']
+    __slots__ = ['bot', 'trivia_sessions', 'slot_machine']
 
     def __init__(self, bot: Hifumi):
         self.bot = bot
-        self.trivia_api = Trivia(True)
+        self.trivia_sessions = TriviaSessions(bot, TriviaPool(
+            Trivia(True), bot.session_manager, bot.logger
+        ))
+        self.slot_machine = SlotMachine(bot.all_emojis)
+
+    def __unload(self):
+        self.trivia_sessions.close()
 
     @commands.command(pass_context=True)
     async def daily(self, ctx):
@@ -113,20 +123,20 @@ class Currency:
             await self.bot.say(localize['low_balance'].format(str(e)))
             return
 
-        q1, q2, q3, n1, n2, n3 = slots_setup(self.bot.all_emojis, 2, 5)
-        await self.bot.say(localize['slots_header'])
-        msg = await self.bot.say(
-            '[ {} | {} | {} ]'.format(q1[0], q2[0], q3[0])
-        )
-        r1, r2, r3 = await roll_slots(
-            self.bot, msg, q1, q2, q3, n1, n2, n3
+        frames = self.slot_machine.spin()
+        header = localize['slots_header']
+        msg = await self.bot.say(f'{header}\n{format_slots(frames[0])}')
+        calls = 1 + await roll_slots(self.bot, msg, header, frames[1:-1])
+        r1, r2, r3 = frames[-1]
+        res = await determine_slot_result(
+            self.bot.data_manager, user_id, localize, r1, r2, r3, amount
         )
-        await self.bot.say(
-            await determine_slot_result(
-                self.bot.data_manager, user_id,
-                localize, r1, r2, r3, amount
-            )
+        await sleep(SLOT_DELAY)
+        await self.bot.edit_message(
+            msg, f'{header}\n{format_slots(frames[-1])}\n{res}'
         )
+        calls += 1
+        self.bot.logger.debug(f'Slots spin made {calls} API calls')
 
     @commands.command(pass_context=True)
     @commands.cooldown(rate=1, per=5, type=commands.BucketType.user)
@@ -138,7 +148,7 @@ class Currency:
             There can be at most 4 arguments:
                 Type, Diffculty, Category, Amount(of bet)
         """
-        await TriviaGame(ctx, self.bot, args, self.trivia_api).play()
+        await TriviaGame(ctx, self.bot, args, self.trivia_sessions).play()
 
     @commands.command()
     async def shop(self):
@@ -1,9 +1,7 @@
-import re
-
-from discord import Game, Guild, Message
+from discord import Game, Guild
 from discord.ext.commands import CommandNotFound
 
-from core.listen_core import command_error, post_guild_count, process_message, \
+from core.listen_core import GuildCountReporter, command_error, \
     try_change_presence
 
 
@@ -11,6 +9,7 @@ class Listeners:
     def __init__(self, bot):
         self.bot = bot
         self.logger = self.bot.logger
+        self.guild_count_reporter = GuildCountReporter(bot)
 
     async def on_ready(self):
         """
@@ -20,10 +19,7 @@ class Listeners:
         await try_change_presence(self.bot, True, game=Game(name=name))
         self.logger.info(f'Logged in as {self.bot.user}\n'
                          f'Client ID: {self.bot.client_id}')
-        await post_guild_count(self.bot)
-        _mention = f'<@!?{self.bot.client_id}>'
-        self.bot.mention_regex = re.compile(_mention)
-        self.bot.mention_msg_regex = re.compile(f'^{_mention}\s*[^\s]+.*$')
+        self.guild_count_reporter.changed()
 
     async def on_command_error(self, context, exception):
         """
@@ -54,7 +50,7 @@ class Listeners:
         :param guild: the guild the Bot joined.
         """
         self.bot.logger.info(f'Joined guild {guild.name}')
-        await post_guild_count(self.bot)
+        self.guild_count_reporter.changed()
 
     async def on_guild_remove(self, guild: Guild):
         """
@@ -62,11 +58,4 @@ class Listeners:
         :param guild: the guild the Bot was removed from.
         """
         self.bot.logger.info(f'Left guild {guild.name}')
-        await post_guild_count(self.bot)
-
-    async def on_message(self, message: Message):
-        """
-        Listener for Client.on_message.
-        :param message: the message.
-        """
-        await process_message(self.bot, message)
+        self.guild_count_reporter.changed()
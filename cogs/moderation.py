@@ -2,8 +2,13 @@ from discord import Member
 from discord.ext import commands
 
 from bot import Hifumi
-from core.moderation_core import ban_kick, clean_msg, mute_unmute, warn_pardon
-from data_controller.data_utils import get_modlog, get_prefix
+from core.anti_spam import AntiSpam
+from core.moderation_core import ban_kick, bulk_moderate, clean_msg, \
+    mute_unmute, parse_members, warn_pardon
+from core.purge import PURGE_LIMIT
+from data_controller.command_filter import ALL_COMMANDS
+from data_controller.data_utils import get_prefix
+from data_controller.warns import ESCALATIONS
 from scripts.checks import has_manage_message, has_manage_role, is_admin
 
 
@@ -11,7 +16,7 @@ class Moderation:
     """
     The cog for Moderation commands
     """
-    __slots__ = ['bot']
+    __slots__ = ['bot', 'purges', 'anti_spam']
 
     def __init__(self, bot: Hifumi):
         """
@@ -19,6 +24,24 @@ class Moderation:
         :param bot: the bot
         """
         self.bot = bot
+        self.purges = {}
+        self.anti_spam = AntiSpam(bot, bot.config.anti_spam())
+
+    def __unload(self):
+        self.anti_spam.close()
+
+    async def on_ready(self):
+        """
+        Load the guilds with anti spam on
+        """
+        await self.anti_spam.init()
+
+    async def on_member_join(self, member: Member):
+        """
+        Count the join for raid detection
+        :param member: the member who joined
+        """
+        self.anti_spam.member_joined(member)
 
     @commands.command(pass_context=True, no_pm=True)
     @commands.check(is_admin)
@@ -67,24 +90,101 @@ class Moderation:
         else:
             await ban_kick(self.bot, ctx, member, ' '.join(reason), False)
 
+    async def __bulk(self, ctx, action, args, delete_message_days=0):
+        """
+        Helper method to ban, kick or mute many members.
+        :param ctx: the discord context.
+        :param action: one of 'ban', 'kick' or 'mute'.
+        :param args: the members as mentions or ids, and the reason.
+        :param delete_message_days: number of days to delete messages of
+        the banned members.
+        """
+        members, reason = parse_members(ctx.message.server, args)
+        if not reason:
+            localize = self.bot.localize(ctx)
+            await self.bot.say(localize['pls_provide_reason'])
+        else:
+            await bulk_moderate(
+                self.bot, ctx, members, reason, action, delete_message_days
+            )
+
+    @commands.command(pass_context=True, no_pm=True)
+    @commands.check(is_admin)
+    async def massban(self, ctx, *args):
+        """
+        Ban many members at once
+        :param ctx: the discord context
+        :param args: the members as mentions or ids followed by the reason,
+        if args[0] is a number from 0 to 7 it will be resolved as
+        delete_message_days
+        """
+        delete_message_days = 0
+        if args and args[0].isdigit() and len(args[0]) == 1:
+            delete_message_days = int(args[0])
+            args = args[1:]
+            if delete_message_days > 7:
+                localize = self.bot.localize(ctx)
+                await self.bot.say(localize['delete_message_days'])
+                return
+        await self.__bulk(ctx, 'ban', args, delete_message_days)
+
+    @commands.command(pass_context=True, no_pm=True)
+    @commands.check(is_admin)
+    async def masskick(self, ctx, *args):
+        """
+        Kick many members at once
+        :param ctx: the discord context
+        :param args: the members as mentions or ids followed by the reason
+        """
+        await self.__bulk(ctx, 'kick', args)
+
+    @commands.command(pass_context=True, no_pm=True)
+    @commands.check(has_manage_role)
+    async def massmute(self, ctx, *args):
+        """
+        Give many members the "Muted" role at once
+        :param ctx: the discord context
+        :param args: the members as mentions or ids followed by the reason
+        """
+        await self.__bulk(ctx, 'mute', args)
+
     @commands.command(pass_context=True, no_pm=True)
     @commands.check(has_manage_message)
     @commands.cooldown(rate=1, per=3, type=commands.BucketType.server)
-    async def clean(self, ctx, number=None):
+    async def clean(self, ctx, number=None, *args):
         """
-        Clean amount between 1-99 of messages from the current channel
+        Clean messages from the current channel
         :param ctx: the discord context object
         :param number: the amount of messages to be deleted
+        :param args: filters, mentions to only clean messages from them,
+        bots, files, match:<regex> or within:<hh:mm:ss>
         """
         localize = self.bot.localize(ctx)
-        bad_num_msg = localize['clean_message_bad_num']
+        bad_num_msg = localize['purge_bad_num'].format(PURGE_LIMIT)
         if number is None:
             await self.bot.say(bad_num_msg)
         else:
             try:
-                await clean_msg(ctx, self.bot, int(number))
+                number = int(number)
             except ValueError:
                 await self.bot.say(bad_num_msg)
+            else:
+                await clean_msg(ctx, self.bot, number, args, self.purges)
+
+    @commands.command(pass_context=True, no_pm=True)
+    @commands.check(has_manage_message)
+    async def cleanstop(self, ctx):
+        """
+        Stop cleaning messages in the current channel
+        :param ctx: the discord context object
+        """
+        localize = self.bot.localize(ctx)
+        purge = self.purges.get(ctx.message.channel.id)
+        if purge is None:
+            await self.bot.say(localize['purge_not_running'])
+        else:
+            purge.cancelled = True
+            await self.bot.say(localize['purge_cancelled'])
 
     async def __mute(self, ctx, is_mute, member, reason):
         """
@@ -156,6 +256,83 @@ class Moderation:
         """
         await self.__warn(ctx, False, member, reason)
 
+    @commands.command(pass_context=True, no_pm=True)
+    @commands.check(is_admin)
+    async def warns(self, ctx, member: Member):
+        """
+        Show the most recent warns and pardons of a member
+        :param ctx: the discord context object
+        :param member: the member
+        """
+        localize = self.bot.localize(ctx)
+        # FIXME Remove casting when library rewrite is finished
+        guild = ctx.message.server
+        rows = await self.bot.warns.history(int(guild.id), int(member.id))
+        if not rows:
+            await self.bot.say(localize['warn_no_history'].format(member.name))
+            return
+        lines = []
+        for mod_id, reason, pardon, time in rows:
+            mod = guild.get_member(mod_id)
+            lines.append(localize['mod_log_history_entry'].format(
+                f'{time:%Y-%m-%d %H:%M}',
+                localize['pardon' if pardon else 'warn'].title(),
+                member.name, mod.name if mod else mod_id, reason
+            ))
+        await self.bot.say('\n'.join(lines))
+
+    @commands.group(pass_context=True, no_pm=True)
+    @commands.check(is_admin)
+    async def warnrule(self, ctx):
+        """
+        Command group for warn rules, if no sub command is invoked, the bot
+        will display the warn rules of the guild and how to change them
+        :param ctx: the discord context
+        """
+        if ctx.invoked_subcommand is None:
+            localize = self.bot.localize(ctx)
+            # FIXME Remove casting when library rewrite is finished
+            rules = self.bot.warns.get_rules(int(ctx.message.server.id))
+            lines = [
+                localize['warn_rule_entry'].format(count, localize[action])
+                for count, action in sorted(rules.items())
+            ] or [localize['warn_rule_empty']]
+            lines.append(localize['warn_rule_info'].format(
+                get_prefix(self.bot, ctx.message), ', '.join(ESCALATIONS)))
+            await self.bot.say('\n'.join(lines))
+
+    @warnrule.command(pass_context=True, name='set')
+    async def r_set(self, ctx, count: int, action: str):
+        """
+        Mute, kick or ban members when they reach a number of warns
+        :param ctx: the discord context
+        :param count: the number of warns
+        :param action: mute, kick or ban
+        """
+        localize = self.bot.localize(ctx)
+        action = action.lower()
+        if count < 1 or action not in ESCALATIONS:
+            await self.bot.say(localize['warn_rule_invalid'].format(
+                ', '.join(ESCALATIONS)))
+            return
+        # FIXME Remove casting when library rewrite is finished
+        await self.bot.warns.set_rule(
+            int(ctx.message.server.id), count, action)
+        await self.bot.say(
+            localize['warn_rule_set'].format(count, localize[action]))
+
+    @warnrule.command(pass_context=True, name='remove')
+    async def r_remove(self, ctx, count: int):
+        """
+        Remove the rule at a number of warns
+        :param ctx: the discord context
+        :param count: the number of warns
+        """
+        localize = self.bot.localize(ctx)
+        # FIXME Remove casting when library rewrite is finished
+        await self.bot.warns.remove_rule(int(ctx.message.server.id), count)
+        await self.bot.say(localize['warn_rule_remove'].format(count))
+
     @commands.group(pass_context=True, no_pm=True)
     @commands.check(is_admin)
     async def modlog(self, ctx):
@@ -166,7 +343,7 @@ class Moderation:
         """
         if ctx.invoked_subcommand is None:
             localize = self.bot.localize(ctx)
-            modlog = await get_modlog(self.bot.data_manager, ctx.message.server)
+            modlog = self.bot.mod_log.get_channel(ctx.message.server)
             if modlog:
                 await self.bot.say(
                     localize['mod_log_channel'].format(modlog.name))
@@ -187,10 +364,10 @@ class Moderation:
         channel = ctx.message.channel
         channel_id = int(channel.id)
         if is_set:
-            await self.bot.data_manager.set_mod_log(guild_id, channel_id)
+            await self.bot.mod_log.set_channel(guild_id, channel_id)
             key = 'mod_log_set'
         else:
-            await self.bot.data_manager.set_mod_log(guild_id, None)
+            await self.bot.mod_log.set_channel(guild_id, None)
             key = 'mod_log_rm'
         await self.bot.say(localize[key].format(channel.name))
 
@@ -209,3 +386,160 @@ class Moderation:
         :param ctx: the discord context
         """
         await self.__modify_modlog(ctx, False)
+
+    @modlog.command(pass_context=True)
+    async def history(self, ctx, member: Member = None):
+        """
+        Show the most recent moderation actions
+        :param ctx: the discord context
+        :param member: only show the actions on this member if given
+        """
+        localize = self.bot.localize(ctx)
+        # FIXME Remove casting when library rewrite is finished
+        guild = ctx.message.server
+        rows = await self.bot.mod_log.history(
+            int(guild.id), int(member.id) if member else None
+        )
+        if not rows:
+            await self.bot.say(localize['mod_log_no_history'])
+            return
+        lines = []
+        for action, mod_id, target_id, reason, time in rows:
+            mod = guild.get_member(mod_id)
+            target = guild.get_member(target_id)
+            lines.append(localize['mod_log_history_entry'].format(
+                f'{time:%Y-%m-%d %H:%M}', localize[action].title(),
+                target.name if target else target_id,
+                mod.name if mod else mod_id, reason
+            ))
+        await self.bot.say('\n'.join(lines))
+
+    @commands.group(pass_context=True, no_pm=True)
+    @commands.check(is_admin)
+    async def cmdfilter(self, ctx):
+        """
+        Command group for command black/white lists, if no sub command is
+        invoked, the bot will display how to use the sub commands
+        :param ctx: the discord context
+        """
+        if ctx.invoked_subcommand is None:
+            localize = self.bot.localize(ctx)
+            await self.bot.say(localize['cmd_filter_info'].format(
+                get_prefix(self.bot, ctx.message)))
+
+    async def __modify_filter(self, ctx, command: str, whitelist):
+        """
+        Helper method to black list, white list or remove a command filter.
+        The filter applies to the first mentioned user or channel in the
+        message, or the whole guild if there is no mention.
+        :param ctx: the discord context.
+        :param command: the command name, '*' for all commands.
+        :param whitelist: True to white list, False to black list,
+        None to remove.
+        """
+        localize = self.bot.localize(ctx)
+        message = ctx.message
+        if command != ALL_COMMANDS:
+            cmd = self.bot.get_command(command)
+            if cmd is None:
+                await self.bot.say(
+                    localize['cmd_filter_bad_command'].format(command))
+                return
+            command = cmd.name
+        # FIXME Remove casting when library rewrite is finished
+        guild_id = int(message.server.id)
+        if message.mentions:
+            scope, target = 'user', message.mentions[0]
+            target_id, target_name = int(target.id), target.mention
+        elif message.channel_mentions:
+            scope, target = 'channel', message.channel_mentions[0]
+            target_id, target_name = int(target.id), target.mention
+        else:
+            scope, target_id = 'guild', guild_id
+            target_name = localize['cmd_filter_guild']
+        if whitelist is None:
+            await self.bot.command_filter.remove_filter(
+                guild_id, scope, target_id, command)
+            key = 'cmd_filter_remove'
+        else:
+            await self.bot.command_filter.set_filter(
+                guild_id, scope, target_id, command, whitelist)
+            key = 'cmd_filter_allow' if whitelist else 'cmd_filter_block'
+        await self.bot.say(localize[key].format(command, target_name))
+
+    @cmdfilter.command(pass_context=True)
+    async def block(self, ctx, command: str, *target):
+        """
+        Black list a command for a user, a channel or the whole guild.
+        :param ctx: the discord context
+        :param command: the command name, '*' for all commands
+        :param target: a user or channel mention, optional
+        """
+        await self.__modify_filter(ctx, command, False)
+
+    @cmdfilter.command(pass_context=True)
+    async def allow(self, ctx, command: str, *target):
+        """
+        White list a command for a user, a channel or the whole guild.
+        :param ctx: the discord context
+        :param command: the command name, '*' for all commands
+        :param target: a user or channel mention, optional
+        """
+        await self.__modify_filter(ctx, command, True)
+
+    @cmdfilter.command(pass_context=True, name='remove')
+    async def f_remove(self, ctx, command: str, *target):
+        """
+        Remove a command from the black/white list of a user, a channel or
+        the whole guild.
+        :param ctx: the discord context
+        :param command: the command name, '*' for all commands
+        :param target: a user or channel mention, optional
+        """
+        await self.__modify_filter(ctx, command, None)
+
+    @commands.group(pass_context=True, no_pm=True)
+    @commands.check(is_admin)
+    async def antispam(self, ctx):
+        """
+        Command group for anti spam, if no sub command is invoked, the bot
+        will display whether anti spam is on and how to change it
+        :param ctx: the discord context
+        """
+        if ctx.invoked_subcommand is None:
+            localize = self.bot.localize(ctx)
+            # FIXME Remove casting when library rewrite is finished
+            enabled = int(ctx.message.server.id) in self.anti_spam.guilds
+            await self.bot.say(
+                localize['anti_spam_on' if enabled else 'anti_spam_off'] +
+                '\n' + localize['anti_spam_info'].format(
+                    get_prefix(self.bot, ctx.message))
+            )
+
+    async def __set_anti_spam(self, ctx, enabled: bool):
+        """
+        Helper method to turn anti spam on or off.
+        :param ctx: the discord context.
+        :param enabled: True to turn it on.
+        """
+        localize = self.bot.localize(ctx)
+        # FIXME Remove casting when library rewrite is finished
+        await self.anti_spam.set_enabled(int(ctx.message.server.id), enabled)
+        await self.bot.say(
+            localize['anti_spam_on' if enabled else 'anti_spam_off'])
+
+    @antispam.command(pass_context=True, name='on')
+    async def s_on(self, ctx):
+        """
+        Mute members who send spam and delete their recent messages
+        :param ctx: the discord context
+        """
+        await self.__set_anti_spam(ctx, True)
+
+    @antispam.command(pass_context=True, name='off')
+    async def s_off(self, ctx):
+        """
+        Stop checking messages for spam
+        :param ctx: the discord context
+        """
+        await self.__set_anti_spam(ctx, False)
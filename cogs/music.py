@@ -1,10 +1,21 @@
 import asyncio
+from itertools import islice
+from pathlib import Path
+from time import monotonic
 
 import discord
 from discord.ext import commands
-from data_controller import DataManager
+
+from core.audio_cache import AudioCache, CACHE_PATH
+from core.music_core import FFMPEG_BEFORE_OPTS, GapStats, SongQueue, \
+    TrackResolver, VoiceSessions
 from data_controller.data_utils import get_prefix
-from json import load
+from scripts.checks import is_owner
+
+# The number of queued entries whose stream urls are kept fresh.
+PREFETCH_COUNT = 3
+# The number of entries shown per queue page.
+PAGE_SIZE = 20
 
 if not discord.opus.is_loaded():
     # The 'opus' library here is opus.dll on Windows
@@ -18,47 +29,94 @@ if not discord.opus.is_loaded():
                      'it to your PATH.')
 
 class VoiceEntry:
-    def __init__(self, message, player, bot):
+    def __init__(self, message, query, track, bot):
         self.bot = bot
         self.bot.localize = bot.localize
         self.server = message.server
         self.requester = message.author
         self.channel = message.channel
         self.message = message
-        self.player = player
+        self.query = query
+        self.track = track
+        self.resolved_at = monotonic()
+        self.player = None
+        self.display = None
 
     def __str__(self):
-        localize = self.bot.localize(self.message)
-        fmt = localize['song_display']
-        duration = self.player.duration
-        if duration:
-            fmt = fmt + " " + localize['song_duration'].format(divmod(duration, 60))
-        if self.player.uploader is None:
-            self.player.uploader = "Livestream"
-        return fmt.format(self.player, self.requester)
+        if self.display is None:
+            localize = self.bot.localize(self.message)
+            fmt = localize['song_display']
+            duration = self.track.duration
+            if duration:
+                fmt = fmt + " " + localize['song_duration'].format(divmod(duration, 60))
+            self.display = fmt.format(self.track, self.requester)
+        return self.display
+
+    @property
+    def duration(self):
+        return self.track.duration
+
+    async def refresh(self, resolver):
+        """Resolve the stream url again if it may have expired."""
+        if self.player is None and not self.track.is_live and \
+                monotonic() - self.resolved_at > resolver.ttl:
+            track = await resolver.resolve(self.query)
+            if track:
+                self.track = track
+                self.resolved_at = monotonic()
+
+    def prepare(self, voice, after, cache=None):
+        """
+        Start ffmpeg for this entry so it buffers before it's played, from
+        the audio cache if the track is cached.
+        """
+        if self.player is None:
+            path = cache.get(self.track) if cache else None
+            if path:
+                self.player = voice.create_ffmpeg_player(path, after=after)
+            else:
+                self.player = voice.create_ffmpeg_player(
+                    self.track.url, before_options=FFMPEG_BEFORE_OPTS,
+                    after=after
+                )
+            self.player.volume = 2
+        return self.player
+
+    def unprepare(self):
+        """Stop the ffmpeg process of a pre-buffered entry."""
+        if self.player is not None:
+            self.player.stop()
+            self.player = None
+
 
 class VoiceState:
-    def __init__(self, bot):
-        self.current = None
-        self.playlist = []
-        self.queuelength = 0
-        self.voice = None
+    def __init__(self, bot, resolver, cache=None):
+        self.resolver = resolver
+        self.cache = cache
         self.waitplayer = None
-        self.bot = bot
-        self.bot.localize = bot.localize
-        self.play_next_song = asyncio.Event()
-        self.songs = asyncio.Queue()
-        self.skip_votes = set()
-        self.audio_player = self.bot.loop.create_task(self.audio_player_task())
+        self.gaps = GapStats()
+        self.reassign(bot)
 
     def is_playing(self):
         if self.voice is None or self.current is None \
-           or not self.voice.is_connected():
+           or self.current.player is None or not self.voice.is_connected():
             return False
 
         player = self.current.player
         return not player.is_done()
 
+    def is_connected(self):
+        return self.voice is not None and self.voice.is_connected()
+
+    def ffmpeg_processes(self):
+        """Count the players of this session that are still running."""
+        players = [self.waitplayer]
+        if self.current is not None:
+            players.append(self.current.player)
+        if self.songs:
+            players.append(self.songs[0].player)
+        return sum(p is not None and not p.is_done() for p in players)
+
     @property
     def player(self):
         return self.current.player
@@ -76,65 +134,127 @@ class VoiceState:
         except:
             pass
 
-    def safe_coro_two(self):
-        coro = self.timeout_leave()
-        fut = asyncio.run_coroutine_threadsafe(coro, self.bot.loop)
-        try:
-            fut.result()
-        except:
-            pass
-            
     def reassign(self, bot):
         self.current = None
-        self.playlist = []
-        self.queuelength = 0
         self.voice = None
         self.bot = bot
         self.bot.localize = bot.localize
         self.play_next_song = asyncio.Event()
-        self.songs = asyncio.Queue()
+        self.song_added = asyncio.Event()
+        self.songs = SongQueue()
+        self.started_at = None
+        self.song_ended = None
         self.skip_votes = set()
+        self.idle_since = monotonic()
+        self.closed = False
         self.audio_player = self.bot.loop.create_task(self.audio_player_task())
-    
+
+    def add(self, entry):
+        self.songs.append(entry)
+        self.song_added.set()
+        if self.is_playing():
+            self.bot.loop.create_task(self.prefetch())
+
+    def clear(self):
+        """Stop the ffmpeg processes of the entries that were pre-buffered."""
+        for entry in self.songs:
+            entry.unprepare()
+        self.songs.clear()
+
+    def remove(self, index):
+        entry = self.songs.remove(index)
+        entry.unprepare()
+        self.__reordered()
+        return entry
+
+    def move(self, src, dst):
+        front = self.songs[0]
+        entry = self.songs.move(src, dst)
+        self.__reordered(front)
+        return entry
+
+    def shuffle(self):
+        front = self.songs[0]
+        self.songs.shuffle()
+        self.__reordered(front)
+
+    def __reordered(self, front=None):
+        """Pre-buffer the new next entry instead of the old one."""
+        if front is not None and front is not self.songs[0]:
+            front.unprepare()
+        if self.is_playing():
+            self.bot.loop.create_task(self.prefetch())
+
+    @property
+    def remaining(self):
+        """The estimated seconds until the queue ends."""
+        total = self.songs.total
+        if self.is_playing() and self.current.duration:
+            elapsed = monotonic() - self.started_at
+            total += max(int(self.current.duration - elapsed), 0)
+        return total
+
+    async def prefetch(self):
+        """
+        Refresh the stream urls of the next few entries and pre-buffer the
+        one that plays next, so it starts as soon as the current one ends.
+        """
+        upcoming = list(islice(self.songs, PREFETCH_COUNT))
+        await asyncio.gather(*[e.refresh(self.resolver) for e in upcoming],
+                             return_exceptions=True)
+        if self.songs and self.voice is not None:
+            self.songs[0].prepare(self.voice, self.safe_coro, self.cache)
+
     async def toggle_next(self):
-        try:
-            self.playlist.remove(self.playlist[0])
-            if self.current.player.duration:
-                self.queuelength -= self.current.player.duration
-            self.bot.loop.call_soon_threadsafe(self.play_next_song.set)
-            if self.songs.empty():
-                await self.leave()
-        except IndexError:
-            pass
+        if self.closed:
+            return
+        self.song_ended = monotonic()
+        self.bot.loop.call_soon_threadsafe(self.play_next_song.set)
+        if not self.songs:
+            self.idle_since = self.song_ended
+            await self.leave()
 
     async def wait_play(self):
-        self.waitplayer = self.voice.create_ffmpeg_player('./music.mp3',
-                                              after=self.safe_coro_two)
+        self.waitplayer = self.voice.create_ffmpeg_player('./music.mp3')
         self.waitplayer.start()
 
     async def wait_stop(self):
         if self.waitplayer.is_playing():
-            self.waitplayer.pause()
-            self.waitplayer.volume = 0
-            # FIXME Stop player without invoking timeout leaving function
-        else:
-            pass
+            self.waitplayer.stop()
         
     async def audio_player_task(self):
         while True:
             self.play_next_song.clear()
-            self.current = await self.songs.get()
+            while not self.songs:
+                self.song_added.clear()
+                await self.song_added.wait()
+            self.current = self.songs.popleft()
+            await self.current.refresh(self.resolver)
+            self.current.prepare(self.voice, self.safe_coro, self.cache).start()
+            self.started_at = monotonic()
+            self.idle_since = None
+            if self.song_ended is not None:
+                self.record_gap(monotonic() - self.song_ended)
+                self.song_ended = None
             await self.bot.send_message(self.current.channel,
                            self.bot.localize(self.current.message)['np'].format(
                            str(self.current)))
-            self.current.player.start()
+            self.bot.loop.create_task(self.prefetch())
             await self.play_next_song.wait()
 
+    def record_gap(self, gap):
+        self.gaps.add(gap)
+        self.bot.logger.debug(
+            f'Music gap {gap:.3f}s (mean {self.gaps.mean:.3f}s, '
+            f'max {self.gaps.max:.3f}s over {self.gaps.count} songs)'
+        )
+
     async def leave(self):
         if self.is_playing():
             self.current.player.stop()
         if not self.waitplayer.is_playing():
             self.audio_player.cancel()
+            self.clear()
             await self.voice.disconnect()
             await self.bot.send_message(self.current.channel,
                   self.bot.localize(self.current.message)['music_self_leave'])
@@ -142,14 +262,20 @@ class VoiceState:
         else:
             pass
         
-    async def timeout_leave(self):
-        if self.is_playing():
-            self.current.player.stop()
+    async def close(self, timed_out=False):
+        """Stop every player of this session and disconnect."""
+        self.closed = True
         self.audio_player.cancel()
-        await self.voice.disconnect()
-        await self.bot.send_message(self.current.channel,
-                    self.bot.localize(self.current.message)['music_timeout_leave']) 
-        self.reassign(self.bot)
+        if self.current is not None and self.current.player is not None:
+            self.current.player.stop()
+        if self.waitplayer is not None:
+            self.waitplayer.stop()
+        self.clear()
+        if self.voice is not None:
+            await self.voice.disconnect()
+            if timed_out and self.current is not None:
+                await self.bot.send_message(self.current.channel,
+                    self.bot.localize(self.current.message)['music_timeout'])
 
 class Music:
     """Voice related commands.
@@ -159,15 +285,28 @@ class Music:
     
     def __init__(self, bot):
         self.bot = bot
-        self.voice_states = {}
+        self.resolver = TrackResolver()
+        self.cache = self.__get_cache()
+        self.voice_states = VoiceSessions(
+            lambda: VoiceState(self.bot, self.resolver, self.cache),
+            bot.logger
+        )
+
+    def __get_cache(self):
+        """Create the audio cache, None if it's disabled in the config."""
+        config = self.bot.config.music()
+        size = config.get('cache size', 2048)
+        if not size:
+            return None
+        path = config.get('cache dir')
+        return AudioCache(
+            self.bot.logger, Path(path) if path else CACHE_PATH,
+            max_bytes=size * 1024 * 1024,
+            min_plays=config.get('cache after plays', 2)
+        )
 
     def get_voice_state(self, server):
-        state = self.voice_states.get(server.id)
-        if state is None:
-            state = VoiceState(self.bot)
-            self.voice_states[server.id] = state
-
-        return state
+        return self.voice_states.get(server.id)
 
     async def create_voice_client(self, channel):
         voice = await self.bot.join_voice_channel(channel)
@@ -175,13 +314,10 @@ class Music:
         state.voice = voice
 
     def __unload(self):
-        for state in self.voice_states.values():
-            try:
-                state.audio_player.cancel()
-                if state.voice:
-                    self.bot.loop.create_task(state.voice.disconnect())
-            except:
-                pass
+        self.resolver.close()
+        if self.cache:
+            self.cache.close()
+        self.bot.loop.create_task(self.voice_states.close())
 
     @commands.command(pass_context=True, no_pm=True)
     async def join(self, ctx):
@@ -214,34 +350,23 @@ class Music:
         """
         localize = self.bot.localize(ctx)
         state = self.get_voice_state(ctx.message.server)
-        opts = {
-            'default_search': 'auto',
-            'geo_bypass': True,
-            'ignoreerrors': True,
-            'quality': 'highest',
-            'quiet': True,
-        }
 
         if state.voice is None:
             await self.bot.say(localize['no_play'])
         else:
             try:
                 await self.bot.send_typing(ctx.message.channel)
-                player = await state.voice.create_ytdl_player(song,
-                                                 ytdl_options=opts,
-                                             after=state.safe_coro)
+                track = await self.resolver.resolve(song)
             except Exception:
+                track = None
+            if track is None:
                 await self.bot.send_message(ctx.message.channel,
                                                localize['music_error'])
             else:
-                player.volume = 2
-                entry = VoiceEntry(ctx.message, player, self.bot)
+                entry = VoiceEntry(ctx.message, song, track, self.bot)
                 await self.bot.say(localize['song_queued'].format(str(entry)))
                 await state.wait_stop()
-                await state.songs.put(entry)
-                state.playlist.append(str(entry))
-                if player.duration:
-                    state.queuelength += player.duration
+                state.add(entry)
 
     @commands.command(pass_context=True, no_pm=True)
     async def volume(self, ctx, value: int):
@@ -295,17 +420,11 @@ class Music:
         """
         localize = self.bot.localize(ctx)
         server = ctx.message.server
-        state = self.get_voice_state(server)
+        state = self.voice_states.pop(server.id)
 
-        if state.voice:
-            if state.is_playing():
-                player = state.player
-                player.stop()
-        
+        if state is not None and state.voice:
             try:
-                state.audio_player.cancel()
-                del self.voice_states[server.id]
-                await state.voice.disconnect()
+                await state.close()
                 await self.bot.say(localize['music_leave'])
             except:
                 pass
@@ -346,26 +465,20 @@ class Music:
         """
         localize = self.bot.localize(ctx)
         state = self.get_voice_state(ctx.message.server)
-        total_pages = int(len(state.playlist) / 20 + 1)
-        if page < 1 or page > total_pages:
-            await self.bot.say(localize['invalid_page'])
-        elif not isinstance(page, int):
+        total_pages = state.songs.pages(PAGE_SIZE)
+        if not isinstance(page, int):
             await self.bot.say(localize['not_integer_page'])
-        elif not state.playlist:
+        elif page < 1 or page > total_pages:
+            await self.bot.say(localize['invalid_page'])
+        elif not state.is_playing() and not state.songs:
             await self.bot.say(localize['empty_queue'])
         else:
             temp = []
-            temp.append(localize['np'].format(state.playlist[0]))
-            page_playlist = state.playlist[20*page-20:20*page]
-            for index in range(len(page_playlist)):
-                if page == 1 and index == 0:
-                    pass
-                elif index == 21:
-                    break
-                else:
-                    temp.append("{}. {}".format((int(20*page-20) + index + 1), 
-                                                       page_playlist[index]))
-            m, s = divmod(state.queuelength, 60)
+            if state.is_playing():
+                temp.append(localize['np'].format(state.current))
+            for index, entry in state.songs.page(page, PAGE_SIZE):
+                temp.append("{}. {}".format(index + 1, entry))
+            m, s = divmod(state.remaining, 60)
             h, m = divmod(m, 60)
             temp.append('')
             temp.append(localize['total_duration'].format(str(h), 
@@ -378,4 +491,52 @@ class Music:
                                                              total_pages,
                                                              get_prefix(self.bot,
                                                                    ctx.message)))
-            await self.bot.say("\n".join(temp))
\ No newline at end of file
+            await self.bot.say("\n".join(temp))
+
+    @commands.command(pass_context=True, no_pm=True)
+    async def remove(self, ctx, position: int):
+        """Removes a song from the queue.
+
+        Only the song requester can remove it.
+        """
+        localize = self.bot.localize(ctx)
+        state = self.get_voice_state(ctx.message.server)
+        if not 1 <= position <= len(state.songs):
+            await self.bot.say(localize['invalid_position'])
+        elif state.songs[position - 1].requester != ctx.message.author:
+            await self.bot.say(localize['not_requester'])
+        else:
+            entry = state.remove(position - 1)
+            await self.bot.say(localize['song_removed'].format(str(entry)))
+
+    @commands.command(pass_context=True, no_pm=True)
+    async def move(self, ctx, position: int, new_position: int):
+        """Moves a song in the queue to another position."""
+        localize = self.bot.localize(ctx)
+        state = self.get_voice_state(ctx.message.server)
+        length = len(state.songs)
+        if not (1 <= position <= length and 1 <= new_position <= length):
+            await self.bot.say(localize['invalid_position'])
+        else:
+            entry = state.move(position - 1, new_position - 1)
+            await self.bot.say(localize['song_moved'].format(str(entry),
+                                                             new_position))
+
+    @commands.command(pass_context=True, no_pm=True)
+    async def shuffle(self, ctx):
+        """Shuffles the queue."""
+        localize = self.bot.localize(ctx)
+        state = self.get_voice_state(ctx.message.server)
+        if not state.songs:
+            await self.bot.say(localize['empty_queue'])
+        else:
+            state.shuffle()
+            await self.bot.say(localize['shuffle'])
+
+    @commands.command(pass_context=True)
+    @commands.check(is_owner)
+    async def voicestats(self, ctx):
+        """Shows the number of voice sessions and ffmpeg processes."""
+        localize = self.bot.localize(ctx)
+        await self.bot.say(localize['voice_stats'].format(
+            evicted=self.voice_states.evicted, **self.voice_states.stats()))
\ No newline at end of file
@@ -14,6 +14,7 @@ from discord.ext import commands
 from requests import get
 
 from bot import Hifumi
+from bot.message_router import MessageKind
 from core.owner_only_core import handle_eval, setavatar
 from data_controller.data_utils import get_prefix
 from scripts.checks import is_owner
@@ -33,10 +34,14 @@ class OwnerOnly:
         :param bot: the bot object
         """
         self.bot = bot
+        self.bot.router.subscribe(MessageKind.COMMAND, self.on_command_message)
 
-    async def on_message(self, message):
+    def __unload(self):
+        self.bot.router.unsubscribe(self.on_command_message)
+
+    async def on_command_message(self, message):
         """
-        Events for reading messages
+        Events for reading messages that start with the command prefix
         :param message: the message
         """
         prefix = get_prefix(self.bot, message)
@@ -77,6 +82,21 @@ class OwnerOnly:
                 self.bot.logger.log(WARN, str(e))
                 await self.bot.say(localize['avatar_fail'])
 
+    @commands.command(pass_context=True)
+    @commands.check(is_owner)
+    async def messagestats(self, ctx):
+        """
+        Show how many messages of each kind the bot received
+        :param ctx: the discord context
+        """
+        localize = self.bot.localize(ctx)
+        stats = self.bot.router.stats
+        dropped = stats.pop('dropped', 0)
+        kinds = ', '.join(f'{kind} **{count}**'
+                          for kind, count in sorted(stats.items()))
+        await self.bot.say(localize['message_stats'].format(
+            kinds=kinds or '-', dropped=dropped))
+
     @commands.command(pass_context=True)
     @commands.check(is_owner)
     async def shutdown(self, ctx):
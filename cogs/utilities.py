@@ -1,18 +1,19 @@
-from asyncio import sleep
-from difflib import get_close_matches
+from datetime import datetime, timedelta
 from time import time
 
 from discord.embeds import Embed
 from discord.ext import commands
 from imdbpie import Imdb
-from pytz import all_timezones, timezone
+from pytz import timezone
 
 from bot import HTTPStatusError, Hifumi
-from core.tzwhere_fix import TzWhere
+from core.tz_index import TzIndex
+from core.tz_names import TzNameIndex
 from core.utilities_core import imdb, number_fact, parse_remind_arg, \
     recipe_search, urban
-from core.weather_core import weather
+from core.weather_core import WeatherBatcher, WeatherCache, weather
 from data_controller.data_utils import get_prefix
+from scripts.checks import is_owner
 from scripts.helpers import get_time_elapsed, time_with_zone
 
 
@@ -20,7 +21,8 @@ class Utilities:
     """
     Class for Utilities/Search commands
     """
-    __slots__ = ['bot', 'imdb_api', 'tzs', 'tzw']
+    __slots__ = ['bot', 'imdb_api', 'tz_names', 'tz_index',
+                 'weather_cache', 'weather_batcher']
 
     def __init__(self, bot: Hifumi):
         """
@@ -29,8 +31,12 @@ class Utilities:
         """
         self.bot = bot
         self.imdb_api = Imdb()
-        self.tzs = all_timezones
-        self.tzw = TzWhere()
+        self.tz_names = TzNameIndex()
+        self.tz_index = TzIndex()
+        self.weather_cache = WeatherCache()
+        self.weather_batcher = WeatherBatcher(
+            bot.session_manager, bot.config['API keys']['openweathermap']
+        )
 
     @commands.command(pass_context=True)
     async def advice(self, ctx):
@@ -134,7 +140,7 @@ class Utilities:
             await self.bot.say(res)
 
     @commands.command(pass_context=True)
-    async def remind(self, ctx, *, time_: str = None, task: str = None):
+    async def remind(self, ctx, time_: str = None, *, task: str = None):
         """
         Set a reminder and notify the user when time is up.
         """
@@ -143,23 +149,22 @@ class Utilities:
             await self.bot.say(localize['no_remind'])
             return
         if not task:
-            task = self.bot.say(localize['unknown'])
+            await self.bot.say(localize['unknown'])
             return
         try:
             seconds = parse_remind_arg(time_)
             d, h, m, s = get_time_elapsed(0, seconds)
             h += d * 24
-            if d > 0:
-                await self.bot.say(localize['remind_long'])
         except ValueError:
             await self.bot.say(localize['remind_bad'])
             return
-        await self.bot.say(localize['remind_start'].format(h, m, s))
-        await sleep(seconds)
         fin = localize['remind_fin']
-        await self.bot.send_message(
-            ctx.message.channel,
-            f'{ctx.message.author.mention}, {fin.format(h,m,s)}\n```{task}```')
+        await self.bot.reminders.add(
+            ctx.message.channel.id,
+            datetime.utcnow() + timedelta(seconds=seconds),
+            f'{ctx.message.author.mention}, {fin.format(h,m,s)}\n```{task}```'
+        )
+        await self.bot.say(localize['remind_start'].format(h, m, s))
 
     @commands.command(pass_context=True)
     async def time(self, ctx, *, tz=None):
@@ -170,11 +175,11 @@ class Utilities:
         if not tz:
             await self.bot.say(localize['no_tz'])
             return
-        matched = get_close_matches(tz, self.tzs, 1)
+        matched = self.tz_names.resolve(tz)
         if not matched:
             await self.bot.say(localize['bad_tz'].format(tz))
             return
-        zone = timezone(matched[0])
+        zone = timezone(matched)
         dt = time_with_zone(time(), zone)
         await self.bot.say(localize['tz_res'].format(
             zone, dt.strftime('%Y-%m-%d %H:%M:%S')))
@@ -204,9 +209,23 @@ class Utilities:
         api = self.bot.config['API keys']['openweathermap']
         res = await weather(
             api, self.bot.config['Bot']['colour'],
-            self.bot.session_manager, self.tzw, query, localize
+            self.bot.session_manager, self.tz_index, self.weather_cache,
+            self.weather_batcher, query, localize
         )
         if isinstance(res, Embed):
             await self.bot.say(embed=res)
         else:
             await self.bot.say(res)
+
+    @commands.command(pass_context=True)
+    @commands.check(is_owner)
+    async def weatherstats(self, ctx):
+        """
+        Show how many weather lookups were served from the cache
+        :param ctx: the discord context
+        """
+        localize = self.bot.localize(ctx)
+        cache = self.weather_cache
+        await self.bot.say(localize['weather_stats'].format(
+            hits=cache.hits, misses=cache.misses, hit_rate=cache.hit_rate,
+            calls=self.weather_batcher.upstream_calls))
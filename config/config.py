@@ -31,3 +31,12 @@ class Config(dict):
 
     def postgres(self):
         return self['Postgres']
+
+    def logging(self):
+        return self.get('Logging') or {}
+
+    def music(self):
+        return self.get('Music') or {}
+
+    def anti_spam(self):
+        return self.get('Anti spam') or {}
@@ -0,0 +1,354 @@
+"""
+Automatic spam and raid protection.
+"""
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from time import monotonic
+from typing import Optional
+
+from bot import Hifumi
+from bot.message_router import MessageKind
+from core.moderation_core import mute_unmute
+from core.purge import Purge, PurgeFilter
+from scripts.discord_functions import handle_forbidden_http
+
+__all__ = ['SlidingWindow', 'SpamDetector', 'AntiSpam']
+
+# Strict limits use windows this many times longer than the normal ones.
+_STRICT_FACTOR = 2
+
+
+class SlidingWindow:
+    """
+    A ring buffer of the times of the last ``size`` events. An event is
+    over the limit when ``size`` events happened within the window, which
+    is known from the oldest time in the buffer alone.
+    """
+    __slots__ = ['times', 'index']
+
+    def __init__(self, size: int):
+        """
+        Initialize an instance of this class.
+        :param size: the number of events in a window that is over the
+        limit.
+        """
+        self.times = [float('-inf')] * size
+        self.index = 0
+
+    def hit(self, now: float, window: float) -> bool:
+        """
+        Record an event.
+        :param now: the time of the event.
+        :param window: the window length in seconds.
+        :return: True if ``size`` events happened within the window.
+        """
+        times = self.times
+        times[self.index] = now
+        self.index = (self.index + 1) % len(times)
+        return now - times[self.index] <= window
+
+    def clear(self):
+        """
+        Forget every event.
+        """
+        self.times = [float('-inf')] * len(self.times)
+
+
+class _UserState:
+    """
+    The recent activity of a member.
+    """
+    __slots__ = ['messages', 'duplicates', 'last_hash', 'last_seen',
+                 'flagged_until']
+
+    def __init__(self, messages: int, duplicates: int):
+        self.messages = SlidingWindow(messages)
+        self.duplicates = SlidingWindow(duplicates)
+        self.last_hash = None
+        self.last_seen = 0
+        self.flagged_until = 0
+
+
+class SpamDetector:
+    """
+    Decides which messages are spam, every check is O(1) per message.
+
+    A member sends spam when they send ``messages`` messages within
+    ``seconds`` seconds, or the same content ``duplicates`` times in a row
+    within ``duplicate_seconds`` seconds. Duplicate content is compared by
+    hash. The member windows are twice as long in a channel that had
+    ``channel_messages`` messages within ``seconds`` seconds, and for
+    members who joined less than ``cooldown`` seconds ago while their guild
+    is raided. A guild is raided for ``cooldown`` seconds after ``joins``
+    members joined it within ``join_seconds`` seconds.
+    """
+    __slots__ = ['messages', 'seconds', 'duplicates', 'duplicate_seconds',
+                 'channel_messages', 'joins', 'join_seconds', 'cooldown',
+                 'flagged', '_users', '_channels', '_joins', '_raids']
+
+    def __init__(self, messages: int = 6, seconds: float = 5,
+                 duplicates: int = 4, duplicate_seconds: float = 30,
+                 channel_messages: int = 20, joins: int = 10,
+                 join_seconds: float = 10, cooldown: float = 60):
+        """
+        Initialize an instance of this class.
+        :param messages: the most messages a member may send in a window.
+        :param seconds: the window length of messages.
+        :param duplicates: the most times a member may repeat a message.
+        :param duplicate_seconds: the window length of repeated messages.
+        :param channel_messages: the messages in a window that make a
+        channel flooded.
+        :param joins: the joins in a window that make a guild raided.
+        :param join_seconds: the window length of joins.
+        :param cooldown: the seconds a flagged member isn't checked for, and
+        a raid lasts after the last join that was over the limit.
+        """
+        self.messages = messages
+        self.seconds = seconds
+        self.duplicates = duplicates
+        self.duplicate_seconds = duplicate_seconds
+        self.channel_messages = channel_messages
+        self.joins = joins
+        self.join_seconds = join_seconds
+        self.cooldown = cooldown
+        self.flagged = 0
+        self._users = OrderedDict()
+        self._channels = OrderedDict()
+        self._joins = {}
+        self._raids = {}
+
+    def member_joined(self, guild_id: int, now: float) -> bool:
+        """
+        Record a member joining a guild.
+        :param guild_id: the guild id.
+        :param now: the time of the join.
+        :return: True if the guild is being raided.
+        """
+        window = self._joins.get(guild_id)
+        if window is None:
+            window = self._joins[guild_id] = SlidingWindow(self.joins)
+        if window.hit(now, self.join_seconds):
+            self._raids[guild_id] = now + self.cooldown
+        return self.raided(guild_id, now)
+
+    def raided(self, guild_id: int, now: float) -> bool:
+        """
+        Check if a guild is being raided.
+        :param guild_id: the guild id.
+        :param now: the current time.
+        :return: True if the guild is being raided.
+        """
+        return self._raids.get(guild_id, 0) > now
+
+    def __user(self, key: tuple, now: float) -> _UserState:
+        """
+        Get the state of a member, the states of members who haven't sent
+        anything for a while are dropped.
+        :param key: the guild id and user id.
+        :param now: the current time.
+        :return: the state.
+        """
+        users = self._users
+        ttl = max(self.duplicate_seconds, self.cooldown)
+        while users:
+            oldest = next(iter(users.values()))
+            if now - oldest.last_seen <= ttl:
+                break
+            users.popitem(last=False)
+        state = users.pop(key, None)
+        if state is None:
+            state = _UserState(self.messages, self.duplicates)
+        state.last_seen = now
+        users[key] = state
+        return state
+
+    def __channel_flooded(self, channel_id: int, now: float) -> bool:
+        """
+        Record a message in a channel.
+        :param channel_id: the channel id.
+        :param now: the time of the message.
+        :return: True if the channel is flooded.
+        """
+        channels = self._channels
+        window = channels.pop(channel_id, None)
+        if window is None:
+            window = SlidingWindow(self.channel_messages)
+            if len(channels) >= 4096:
+                channels.popitem(last=False)
+        channels[channel_id] = window
+        return window.hit(now, self.seconds)
+
+    def check(self, guild_id: int, channel_id: int, user_id: int,
+              content: str, now: float,
+              strict: bool = False) -> Optional[str]:
+        """
+        Check a message.
+        :param guild_id: the guild id.
+        :param channel_id: the channel id.
+        :param user_id: the author id.
+        :param content: the content.
+        :param now: the time of the message.
+        :param strict: True to use the strict limits for this member.
+        :return: 'spam_flood' or 'spam_duplicate' if the message is spam,
+        else None.
+        """
+        strict = self.__channel_flooded(channel_id, now) or strict
+        factor = _STRICT_FACTOR if strict else 1
+        state = self.__user((guild_id, user_id), now)
+        if state.flagged_until > now:
+            return None
+        content_hash = hash(content.strip().lower())
+        if content_hash != state.last_hash:
+            state.last_hash = content_hash
+            state.duplicates.clear()
+        res = None
+        if state.duplicates.hit(now, self.duplicate_seconds * factor):
+            res = 'spam_duplicate'
+        elif state.messages.hit(now, self.seconds * factor):
+            res = 'spam_flood'
+        if res:
+            self.flagged += 1
+            state.flagged_until = now + self.cooldown
+            state.messages.clear()
+            state.duplicates.clear()
+        return res
+
+
+class _AutoContext:
+    """
+    Stands in for the command context of a moderation action the bot
+    takes on its own, with the bot as the author.
+    """
+    __slots__ = ['message']
+
+    def __init__(self, message):
+        self.message = _AutoMessage(message)
+
+
+class _AutoMessage:
+    __slots__ = ['id', 'guild', 'server', 'channel', 'author', 'mentions']
+
+    def __init__(self, message):
+        self.id = message.id
+        self.guild = self.server = message.guild
+        self.channel = message.channel
+        self.author = message.guild.me
+        self.mentions = [message.author]
+
+
+class AntiSpam:
+    """
+    Checks the messages and joins of the guilds that turned it on, and
+    mutes members who send spam and deletes their recent messages in the
+    channel.
+    """
+    __slots__ = ['bot', 'detector', 'clean_seconds', 'clean_limit', 'guilds']
+
+    def __init__(self, bot: Hifumi, config: dict):
+        """
+        Initialize an instance of this class.
+        :param bot: the bot.
+        :param config: the anti spam config.
+        """
+        self.bot = bot
+        self.detector = SpamDetector(
+            messages=config.get('messages', 6),
+            seconds=config.get('seconds', 5),
+            duplicates=config.get('duplicates', 4),
+            duplicate_seconds=config.get('duplicate seconds', 30),
+            channel_messages=config.get('channel messages', 20),
+            joins=config.get('joins', 10),
+            join_seconds=config.get('join seconds', 10),
+            cooldown=config.get('cooldown', 60)
+        )
+        self.clean_seconds = config.get('clean seconds', 60)
+        self.clean_limit = config.get('clean limit', 100)
+        self.guilds = set()
+        bot.router.subscribe(
+            MessageKind.PLAIN | MessageKind.MENTION | MessageKind.COMMAND,
+            self.on_message
+        )
+
+    def close(self):
+        """
+        Stop receiving messages.
+        """
+        self.bot.router.unsubscribe(self.on_message)
+
+    async def init(self):
+        """
+        Load the guilds that turned anti spam on.
+        """
+        self.guilds = set(await self.bot.data_manager.get_anti_spam_guilds())
+
+    async def set_enabled(self, guild_id: int, enabled: bool):
+        """
+        Turn anti spam on or off for a guild.
+        :param guild_id: the guild id.
+        :param enabled: True to turn it on.
+        """
+        await self.bot.data_manager.set_anti_spam(guild_id, enabled)
+        if enabled:
+            self.guilds.add(guild_id)
+        else:
+            self.guilds.discard(guild_id)
+
+    def member_joined(self, member):
+        """
+        Record a member joining a guild.
+        :param member: the member.
+        """
+        # FIXME Remove casting after library rewrite
+        guild_id = int(member.guild.id)
+        if guild_id in self.guilds and \
+                self.detector.member_joined(guild_id, monotonic()):
+            self.bot.logger.info(f'Join raid in guild {guild_id}')
+
+    async def on_message(self, message):
+        """
+        Check a message and act on it if it's spam.
+        :param message: the message.
+        """
+        guild = message.guild
+        # FIXME Remove casting after library rewrite
+        if guild is None or int(guild.id) not in self.guilds:
+            return
+        guild_id = int(guild.id)
+        now = monotonic()
+        strict = False
+        if self.detector.raided(guild_id, now):
+            joined_at = getattr(message.author, 'joined_at', None)
+            strict = joined_at is not None and joined_at > \
+                datetime.utcnow() - timedelta(seconds=self.detector.cooldown)
+        reason = self.detector.check(
+            guild_id, int(message.channel.id), int(message.author.id),
+            message.content, now, strict
+        )
+        if reason and not message.channel.permissions_for(
+                message.author).manage_messages:
+            await self.__act(message, reason)
+
+    async def __act(self, message, reason: str):
+        """
+        Mute the author of a spam message and delete their recent messages
+        in the channel.
+        :param message: the spam message.
+        :param reason: the localization key of the reason.
+        """
+        ctx = _AutoContext(message)
+        localize = self.bot.localize(ctx)
+        await mute_unmute(ctx, self.bot, message.author, True,
+                          localize[reason])
+        check = PurgeFilter(
+            authors={message.author.id},
+            after=datetime.utcnow() - timedelta(seconds=self.clean_seconds)
+        )
+        try:
+            await Purge(
+                self.bot, message.channel, self.clean_limit, check
+            ).run()
+        except Exception as e:
+            await handle_forbidden_http(
+                e, self.bot, message.channel, localize,
+                localize['clean_messages']
+            )
@@ -0,0 +1,205 @@
+"""
+An on-disk cache of transcoded audio.
+"""
+from asyncio import CancelledError, Semaphore, create_subprocess_exec, \
+    ensure_future, get_event_loop
+from asyncio.subprocess import DEVNULL
+from collections import OrderedDict
+from os import remove, replace, scandir, utime
+from pathlib import Path
+from re import compile
+from typing import Optional
+
+__all__ = ['AudioCache', 'CACHE_PATH']
+
+CACHE_PATH = Path(__file__).parent.parent.joinpath('data', 'audio_cache')
+
+_SUFFIX = '.opus'
+_PART_SUFFIX = '.part'
+_UNSAFE = compile(r'[^\w.-]')
+
+
+class AudioCache:
+    """
+    Keeps transcoded Opus files of the tracks played most recently, keyed by
+    their source id, so popular tracks aren't streamed from the source and
+    decoded again every time they are played.
+
+    A track is transcoded in the background once it has been asked for
+    ``min_plays`` times, and at most ``max_jobs`` transcodes run at once.
+    The least recently played files are deleted once the cache is larger
+    than ``max_bytes``.
+    """
+    __slots__ = ['path', 'logger', 'max_bytes', 'min_plays', 'max_duration',
+                 'size', 'hits', 'misses', '_files', '_plays', '_jobs',
+                 '_semaphore']
+
+    def __init__(self, logger, path: Path = CACHE_PATH,
+                 max_bytes: int = 2048 * 1024 * 1024, min_plays: int = 2,
+                 max_duration: int = 900, max_jobs: int = 2):
+        """
+        Initialize an instance of this class.
+        :param logger: the logger.
+        :param path: the cache directory.
+        :param max_bytes: the maximum size of the cache.
+        :param min_plays: cache a track once it's been played this many
+        times.
+        :param max_duration: the longest track in seconds that is cached.
+        :param max_jobs: the maximum number of concurrent transcodes.
+        """
+        self.path = path
+        self.logger = logger
+        self.max_bytes = max_bytes
+        self.min_plays = min_plays
+        self.max_duration = max_duration
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._files = OrderedDict()
+        self._plays = OrderedDict()
+        self._jobs = {}
+        self._semaphore = Semaphore(max_jobs)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.__scan()
+
+    def __len__(self):
+        return len(self._files)
+
+    def __scan(self):
+        """
+        Index the files already in the cache, least recently played first.
+        """
+        entries = []
+        for entry in scandir(str(self.path)):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(_PART_SUFFIX):
+                # A transcode that didn't finish.
+                remove(entry.path)
+                continue
+            if not entry.name.endswith(_SUFFIX):
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._files[name] = size
+            self.size += size
+
+    @staticmethod
+    def file_name(source_id: str) -> str:
+        """
+        Get the file name of a source id.
+        :param source_id: the source id.
+        :return: the file name.
+        """
+        return _UNSAFE.sub('_', source_id) + _SUFFIX
+
+    def get(self, track) -> Optional[str]:
+        """
+        Get the cached file of a track, and count a play of it.
+        :param track: the track, which has ``source_id``, ``url``,
+        ``duration`` and ``is_live`` attributes.
+        :return: the file path if the track is cached, else None.
+        """
+        if not track.source_id or track.is_live:
+            return None
+        name = self.file_name(track.source_id)
+        if name in self._files:
+            self.hits += 1
+            self._files.move_to_end(name)
+            path = str(self.path.joinpath(name))
+            get_event_loop().run_in_executor(None, self.__touch, path)
+            return path
+        self.misses += 1
+        self.__count_play(name, track)
+        return None
+
+    def __count_play(self, name: str, track):
+        """
+        Count a play of an uncached track, it's transcoded once it has been
+        played enough.
+        :param name: the file name.
+        :param track: the track.
+        """
+        plays = self._plays.pop(name, 0) + 1
+        if plays < self.min_plays:
+            self._plays[name] = plays
+            if len(self._plays) > 4096:
+                self._plays.popitem(last=False)
+        elif name not in self._jobs and track.duration and \
+                track.duration <= self.max_duration:
+            self._jobs[name] = ensure_future(self.__transcode(name, track.url))
+
+    async def __transcode(self, name: str, url: str):
+        """
+        Transcode a stream into the cache.
+        :param name: the file name.
+        :param url: the stream url.
+        """
+        path = self.path.joinpath(name)
+        tmp = path.with_suffix(_PART_SUFFIX)
+        proc = None
+        try:
+            async with self._semaphore:
+                proc = await create_subprocess_exec(
+                    'ffmpeg', '-nostdin', '-loglevel', 'error', '-y',
+                    '-i', url, '-vn', '-c:a', 'libopus', '-b:a', '96k',
+                    '-f', 'opus', str(tmp), stdin=DEVNULL, stdout=DEVNULL
+                )
+                code = await proc.wait()
+            if code:
+                raise OSError(f'ffmpeg exited with {code}')
+            size = tmp.stat().st_size
+            replace(str(tmp), str(path))
+        except (Exception, CancelledError) as e:
+            if proc is not None and proc.returncode is None:
+                proc.kill()
+            if tmp.exists():
+                tmp.unlink()
+            if isinstance(e, CancelledError):
+                raise
+            self.logger.warning(f'Failed to cache {name}: {e}')
+        else:
+            self._files[name] = size
+            self.size += size
+            evicted = []
+            while self.size > self.max_bytes and len(self._files) > 1:
+                old, old_size = self._files.popitem(last=False)
+                self.size -= old_size
+                evicted.append(old)
+            if evicted:
+                await get_event_loop().run_in_executor(
+                    None, self.__remove, evicted
+                )
+        finally:
+            del self._jobs[name]
+
+    def __remove(self, names: list):
+        """
+        Delete evicted files.
+        :param names: the file names.
+        """
+        for name in names:
+            try:
+                remove(str(self.path.joinpath(name)))
+            except OSError as e:
+                self.logger.warning(f'Failed to evict {name}: {e}')
+
+    @staticmethod
+    def __touch(path: str):
+        """
+        Update the modified time of a file, so its recency survives a
+        restart.
+        :param path: the file path.
+        """
+        try:
+            utime(path)
+        except OSError:
+            pass
+
+    def close(self):
+        """
+        Cancel the running transcodes.
+        """
+        for job in self._jobs.values():
+            job.cancel()
@@ -1,14 +1,18 @@
 """
 Functions for currency commands
 """
-from collections import deque
+from asyncio import sleep
 from datetime import datetime
-from random import randint, sample
 
+from core.slot_machine import payout
 from data_controller import DataManager, LowBalanceError
 from data_controller.data_utils import change_balance, transfer_balance
 from scripts.helpers import get_time_elapsed
 
+# Seconds between two slot frames. Keeps a spin within Discord's message
+# edit rate limit.
+SLOT_DELAY = 1
+
 
 async def daily(data_manager: DataManager, user_id: int, localize):
     """
@@ -56,50 +60,29 @@ async def transfer(
     )
 
 
-def slots_setup(emojis, lower, upper):
+def format_slots(reels) -> str:
     """
-    Return 3 random emoji dequeues and 3 random numbers
-    :param emojis: the entire emoji list
-    :param lower: the lower bound of the length of the random list
-    :param upper: the upper bound of the length of the random list
-    :return: (rand_emoji_lst, rand_emoji_lst, rand_emoji_lst,
-              rand_int, rand_int, rand_int)
-    :rtype: tuple
+    Format the reels of a slot machine.
+    :param reels: the 3 reels
+    :return: the formatted reels
     """
-    emoji_lst = sample(emojis, randint(upper // 2, upper) * 3)
-    return \
-        deque(sample(emoji_lst, len(emoji_lst))), \
-        deque(sample(emoji_lst, len(emoji_lst))), \
-        deque(sample(emoji_lst, len(emoji_lst))), \
-        randint(lower, upper), randint(lower, upper), randint(lower, upper)
+    return '[ {} | {} | {} ]'.format(*reels)
 
 
-async def roll_slots(bot, msg, q1, q2, q3, n1, n2, n3):
+async def roll_slots(bot, msg, header, frames, delay=SLOT_DELAY) -> int:
     """
-    Simulates playing a slot machine
+    Simulates playing a slot machine by editing the message once per frame
     :param bot: the bot
     :param msg: the initial message the bot sent for the slot
-    :param q1: the first dequeue
-    :param q2: the second dequeue
-    :param q3: the third dequeue
-    :param n1: the first random number
-    :param n2: the second random number
-    :param n3: the third random number
-    :return: the final result
+    :param header: the header of the message
+    :param frames: the reels of each frame to show
+    :param delay: the seconds between two frames
+    :return: the number of API calls made
     """
-    i = max(n1, n2, n3)
-    while i > 0:
-        if n1 > 0:
-            q1.rotate()
-        if n2 > 0:
-            q2.rotate()
-        if n3 > 0:
-            q3.rotate()
-        n1, n2, n3, i = n1 - 1, n2 - 1, n3 - 1, i - 1
-        await bot.edit_message(
-            msg, '[ {} | {} | {} ]'.format(q1[0], q2[0], q3[0])
-        )
-    return q1[0], q2[0], q3[0]
+    for reels in frames:
+        await sleep(delay)
+        await bot.edit_message(msg, f'{header}\n{format_slots(reels)}')
+    return len(frames)
 
 
 async def determine_slot_result(
@@ -115,15 +98,15 @@ async def determine_slot_result(
     :param amount: the amount of bet
     :return: the resulting string
     """
-    if r1 == r2 == r3:
-        delta = amount * 3
+    delta = payout((r1, r2, r3), amount)
+    if delta:
         await change_balance(data_manager, user_id, delta)
+    if delta > amount:
         res = localize['slots_win'].format(delta - amount)
-    elif r1 != r2 and r1 != r3 and r2 != r3:
+    elif not delta:
         res = localize['slots_loose'].format(amount)
     else:
         res = localize['slots_draw']
-        await change_balance(data_manager, user_id, amount)
     return res + '\n' + localize['new_balance'].format(
         data_manager.get_user_balance(user_id)
     )
@@ -1,14 +1,12 @@
+from asyncio import TimeoutError, ensure_future, gather, sleep, wait_for
 from json import dumps
-from textwrap import wrap
 from traceback import format_exc
 from typing import Optional
 
 from discord import ConnectionClosed, Game, Status
-from discord.abc import Messageable
 from discord.ext.commands import Context
 
 from bot import HTTPStatusError
-from data_controller.data_utils import get_prefix
 
 
 async def try_change_presence(
@@ -80,50 +78,17 @@ def format_command_error(context: Context, ex: Exception) -> tuple:
             f'{four_space}Exception: {str(ex)}'), triggered
 
 
-def format_traceback(tb: str):
-    """
-    Format a traceback to be able to display in discord.
-
-    :param tb: the traceback.
-
-    :return: the traceback divided up into sections of max 1800 chars.
-    """
-    res = wrap(tb, 1800, replace_whitespace=False)
-    str_out = ['```py\n' + s.replace('`', chr(0x1fef)) + '\n```'
-               for s in res]
-    return str_out
-
-
-async def send_traceback(channel, tb, header):
-    """
-    Send traceback to the error log channel if it exists.
-
-    :param channel: The channel to send tb to.
-
-    :param tb: the traceback.
-
-    :param header: the header for the error.
-    """
-    if not channel:
-        return
-    await channel.send(header)
-    for s in format_traceback(tb):
-        await channel.send(s)
-
-
 async def command_error(ctx, ex):
     """
     Handle command error.
 
-    Send error message to the context and send traceback to the
+    Send error message to the context and queue the traceback for the
     error log channel.
 
     :param ctx: The discord Context.
 
     :param ex: the exception raised.
     """
-    id_ = ctx.bot.config['Bot']['error log']
-    ch = ctx.bot.get_channel(id_)
     try:
         raise ex
     except Exception as e:
@@ -133,34 +98,51 @@ async def command_error(ctx, ex):
         await ctx.send(
             ctx.bot.translate(ctx, 'sentence', 'ex_warn').format(msg)
         )
-        await send_traceback(
-            ch, tb, f'**WARNING** Triggered message:\n{triggered}'
+        ctx.bot.error_reporter.report(
+            f'**WARNING** Triggered message:\n{triggered}', tb
         )
 
 
-async def post_guild_count(bot):
+def guild_counts(bot) -> dict:
+    """
+    Count the guilds of the bot across all shards.
+
+    :param bot: the bot instance.
+
+    :return: the bot list payload with the total guild count.
+    """
+    return {
+        'server_count': len(bot.guilds),
+        'shard_count': bot.shard_count or 1
+    }
+
+
+async def post_guild_count(bot, timeout: float = 10):
     """
     Post guild count to
     https://discordbots.org/ and https://bots.discord.pw/
+    concurrently.
 
     :param bot: the bot instance.
+
+    :param timeout: the timeout of each request in seconds.
     """
     botsorgapi = bot.config['Bot lists']['discord bots dot org']
     bots_discord_pw = bot.config['Bot lists']['bots_discord_pw']
-    if not bots_discord_pw and not botsorgapi:
-        return
-    data = dumps({
-        'shard_id': bot.shard_id,
-        'shard_count': bot.shard_count,
-        'server_count': len(bot.guilds)
-    })
+    sites = []
     if botsorgapi:
-        await __try_post(bot, 'discordbots.org', data, botsorgapi)
+        sites.append(('discordbots.org', botsorgapi))
     if bots_discord_pw:
-        await __try_post(bot, 'bots.discord.pw', data, bots_discord_pw)
+        sites.append(('bots.discord.pw', bots_discord_pw))
+    if not sites:
+        return
+    data = dumps(guild_counts(bot))
+    await gather(*[
+        __try_post(bot, site, data, key, timeout) for site, key in sites
+    ])
 
 
-async def __try_post(bot, site, data, key):
+async def __try_post(bot, site, data, key, timeout):
     """
     Try to post guild count to the site.
 
@@ -171,6 +153,8 @@ async def __try_post(bot, site, data, key):
     :param data: the data to post.
 
     :param key: the api key.
+
+    :param timeout: the timeout in seconds.
     """
     url = f'https://{site}/api/bots/{bot.client_id}/stats'
     header = {
@@ -178,80 +162,60 @@ async def __try_post(bot, site, data, key):
         'content-type': 'application/json'
     }
     try:
-        async with await bot.session_manager.post(url, data=data,
-                                                  headers=header):
+        resp = await wait_for(
+            bot.session_manager.post(url, data=data, headers=header), timeout
+        )
+        async with resp:
             bot.logger.info(f'Posted {data} to {site}')
     except HTTPStatusError as e:
         bot.logger.warn(str(e))
-
-
-async def process_message(bot, message):
-    """
-    Process the message recieved from Client.on_message
-
-    :param bot: The bot instance.
-
-    :param message: The message recieved.
-    """
-    author = message.author
-    content = message.content
-    channel = message.channel
-    prefix = get_prefix(bot, message)
-    if (author.bot or
-            content.startswith(prefix) or
-            not isinstance(content, str) or
-            not isinstance(channel, Messageable)):
-        return
-    prefix_msg = __for_prefix(
-        bot, message, prefix, bot.default_prefix
-    )
-    if prefix_msg:
-        await channel.send(prefix_msg)
-
-
-def __strip_mention(mention, mention_msg, s: str):
-    """
-    Strip message starts with mention to the bot.
-
-    :param mention: The regex to match for the bot mention.
-
-    :param mention_msg:
-        The regex to match for if the message starts with
-        the mention to the bot and has at least one non-empty
-        character beside the mention.
-
-    :param s: The string to match against.
-
-    :return: The message with sripped mentions if both regex matched.
-    """
-    match = mention_msg.fullmatch(s)
-    mention = mention.findall(s)
-    if match and mention:
-        return match.string.replace(mention[0], '', 1).strip()
-
-
-def __for_prefix(bot, message, prefix, default_prefix):
-    """
-    Get the string to display help bot prefix.
-
-    :param bot: the bot instance.
-
-    :param message: message recieved from Client.on_message
-
-    :param prefix: Bot prefix for the message.
-
-    :param default_prefix: default bot prefix.
-
-    :return:
-        The message to display if the message starts with a mention to
-        the bot and contains only 'prefix'
-
-        Otherwise return None.
-    """
-
-    stripped = __strip_mention(
-        bot.mention_regex, bot.mention_msg_regex, message.content
-    )
-    if stripped and stripped.lower() == 'prefix':
-        local_str = bot.translate(message, 'sentence', 'prefix')
-        return local_str.format(prefix, default_prefix)
+    except TimeoutError:
+        bot.logger.warn(f'Posting guild count to {site} timed out')
+
+
+class GuildCountReporter:
+    """
+    Posts the guild count to bot lists in the background. Guild count
+    changes are debounced, and the count is posted at most once every
+    ``interval`` seconds no matter how many guilds are joined or left.
+    """
+    __slots__ = ('bot', 'delay', 'interval', 'posts', '_dirty', '_task')
+
+    def __init__(self, bot, delay: float = 10, interval: float = 300):
+        """
+        Initialize an instance of this class.
+
+        :param bot: the bot instance.
+
+        :param delay: the seconds to wait for more changes before posting.
+
+        :param interval: the minimum seconds between two posts.
+        """
+        self.bot = bot
+        self.delay = delay
+        self.interval = interval
+        self.posts = 0
+        self._dirty = False
+        self._task = None
+
+    def changed(self):
+        """
+        Mark the guild count as changed, this never blocks.
+        """
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = ensure_future(self.__run())
+
+    async def __run(self):
+        """
+        Post the guild count until there are no more changes.
+        """
+        await sleep(self.delay)
+        while self._dirty:
+            self._dirty = False
+            try:
+                await post_guild_count(self.bot)
+                self.posts += 1
+            except Exception as e:
+                self.bot.logger.warn(f'Failed to post guild count: {e}')
+            await sleep(self.interval)
@@ -1,16 +1,25 @@
 """
 Functions for Moderation class
 """
-from asyncio import sleep
+from asyncio import Semaphore, gather, sleep
+from re import compile
+from typing import List, Tuple
 
 from discord import Member, Role
-from discord.embeds import Embed
 
 from bot import Hifumi
-from data_controller.data_utils import get_modlog
-from scripts.discord_functions import get_avatar_url, \
-    get_name_with_discriminator, get_server_role, handle_forbidden_http
-from scripts.helpers import get_date
+from bot.mod_log import ModLogEntry
+from core.purge import PURGE_LIMIT, Purge, parse_purge_args
+from scripts.discord_functions import get_name_with_discriminator, \
+    get_server_role, handle_forbidden_http
+
+# The most members a bulk action can target.
+BULK_LIMIT = 100
+# The most moderation requests a bulk action runs at once, the library
+# waits out rate limits on its own.
+BULK_CONCURRENCY = 5
+
+_MEMBER_ARG = compile(r'(?:<@!?(\d+)>|(\d{15,21}))$')
 
 
 async def ban_kick(bot: Hifumi, ctx, member: Member, reason: str,
@@ -38,7 +47,9 @@ async def ban_kick(bot: Hifumi, ctx, member: Member, reason: str,
             await bot.ban(member, delete_message_days)
         else:
             await bot.kick(member)
-        await send_mod_log(ctx, bot, action, member, reason)
+        await send_mod_log(
+            ctx, bot, 'ban' if is_ban else 'kick', member, reason
+        )
         await bot.say(localize['banned_kicked'].format(action_past) +
                       '`' + member.name + '`')
     except Exception as e:
@@ -47,29 +58,54 @@ async def ban_kick(bot: Hifumi, ctx, member: Member, reason: str,
         )
 
 
-async def clean_msg(ctx, bot: Hifumi, count: int):
+async def clean_msg(ctx, bot: Hifumi, count: int, args=(), running=None):
     """
     A function to handle clean message command
     :param ctx: the discord context
     :param bot: the bot
     :param count: number of messages to be cleaned
+    :param args: the purge filters
+    :param running: a dict of the channel ids with a running purge
     """
-    count += 1
     localize = bot.localize(ctx)
-    if count < 2 or count > 100:
-        await bot.say(localize['clean_message_bad_num'])
+    if not 1 <= count <= PURGE_LIMIT:
+        await bot.say(localize['purge_bad_num'].format(PURGE_LIMIT))
+        return
+    try:
+        check = parse_purge_args(ctx.message, args)
+    except ValueError as e:
+        await bot.say(localize['purge_bad_filter'].format(e))
         return
     channel = ctx.message.channel
+    running = {} if running is None else running
+    if channel.id in running:
+        await bot.say(localize['purge_running'])
+        return
+    status = None
     try:
-        await bot.purge_from(channel, limit=count)
-        purge_msg = await bot.say(
-            localize['clean_message_success'].format(count - 1))
+        status = await bot.say(localize['purge_progress'].format(0, 0))
+        purge = Purge(bot, channel, count, check,
+                      skip={ctx.message.id, status.id})
+        running[channel.id] = purge
+
+        async def progress(p: Purge):
+            await bot.edit_message(
+                status, localize['purge_progress'].format(
+                    p.deleted, p.scanned)
+            )
+
+        await purge.run(progress)
+        await bot.delete_message(ctx.message)
+        await bot.edit_message(
+            status, localize['clean_message_success'].format(purge.deleted))
         await sleep(3)
-        await bot.delete_message(purge_msg)
+        await bot.delete_message(status)
     except Exception as e:
         await handle_forbidden_http(
             e, bot, channel, localize, localize['clean_messages']
         )
+    finally:
+        running.pop(channel.id, None)
 
 
 async def __mute(ctx, bot: Hifumi, member: Member, muted_role: Role,
@@ -98,7 +134,9 @@ async def __mute(ctx, bot: Hifumi, member: Member, muted_role: Role,
         res = localize['mute_unmute_success'].format(
             _res, member.name, reason
         )
-        await send_mod_log(ctx, bot, action, member, reason)
+        await send_mod_log(
+            ctx, bot, 'mute' if is_mute else 'unmute', member, reason
+        )
         await bot.send_message(ctx.message.channel, res)
 
 
@@ -131,73 +169,127 @@ async def mute_unmute(ctx, bot: Hifumi, member: Member,
             ctx.message.channel, localize['muted_role_not_found'])
 
 
-def generate_mod_log_entry(action: str, mod: Member, target: Member,
-                           reason: str, localize: dict,
-                           warn_count: int = None):
+def parse_members(guild, args) -> Tuple[List[Member], str]:
     """
-    Generate a mod log entry
-    :param action: the action
-    :param mod: the mod that performed the action
-    :param target: the target
-    :param reason: the reason
-    :param localize: the localization strings
-    :param warn_count: the total warning count on the user
-    :return: A discord embed object for the mod log entry
-    """
-    colour = {
-        localize['mute']: 0x591f60,
-        localize['unmute']: 0x4286f4,
-        localize['ban']: 0xe52424,
-        localize['kick']: 0xdd6f1a,
-        localize['warn']: 0xddc61a,
-        localize['pardon']: 0x4286f4
-    }[action]
-    embed = Embed(colour=colour)
+    Split command arguments into members and a reason
+    :param guild: the guild
+    :param args: the arguments, members are mentions or ids
+    :return: (the members in order without duplicates, the reason)
+    """
+    members = []
+    reason = []
+    for arg in args:
+        match = _MEMBER_ARG.match(arg)
+        member = guild.get_member(match.group(1) or match.group(2)) \
+            if match else None
+        if member is None:
+            reason.append(arg)
+        elif member not in members:
+            members.append(member)
+    return members, ' '.join(reason)
 
-    embed.set_author(
-        name=get_name_with_discriminator(target) + ' ({})'.format(target.id),
-        icon_url=get_avatar_url(target)
-    )
-    embed.set_footer(
-        text=get_name_with_discriminator(mod) + ' | ' + get_date(),
-        icon_url=get_avatar_url(mod)
-    )
 
-    embed.add_field(name=localize['type'], value=action.title())
-    embed.add_field(name=localize['reason'], value=reason)
-    if action == localize['warn'] or action == localize['pardon']:
-        embed.add_field(name=localize['warnings'], value=str(warn_count))
+def _join_names(members: List[Member], limit: int = 20) -> str:
+    """
+    Join member names for a message
+    :param members: the members
+    :param limit: the most names to show
+    :return: the names, with the number of names left out
+    """
+    res = ', '.join(f'`{m.name}`' for m in members[:limit])
+    if len(members) > limit:
+        res += f' (+{len(members) - limit})'
+    return res
+
+
+async def bulk_moderate(bot: Hifumi, ctx, members: List[Member], reason: str,
+                        action: str, delete_message_days: int = 0):
+    """
+    Ban, kick or mute many members at once
+    :param bot: the bot
+    :param ctx: the discord context
+    :param members: the members
+    :param reason: the reason
+    :param action: one of 'ban', 'kick' or 'mute'
+    :param delete_message_days: number of days to delete messages of the
+    banned users, only used for bans.
+    """
+    localize = bot.localize(ctx)
+    action_str = localize[action]
+    if not members:
+        await bot.say(localize['bulk_no_members'])
+        return
+    if len(members) > BULK_LIMIT:
+        await bot.say(localize['bulk_too_many'].format(BULK_LIMIT))
+        return
+    author = ctx.message.author
+    if author in members:
+        await bot.say(localize['ban_kick_mute_self'].format(action_str))
+        return
+    members = [m for m in members if m.id != bot.user.id]
+    muted_role = None
+    if action == 'mute':
+        muted_role = get_server_role('Muted', ctx.message.server)
+        if not muted_role:
+            await bot.say(localize['muted_role_not_found'])
+            return
+    semaphore = Semaphore(BULK_CONCURRENCY)
+
+    async def run(member):
+        async with semaphore:
+            if action == 'ban':
+                await bot.ban(member, delete_message_days)
+            elif action == 'kick':
+                await bot.kick(member)
+            else:
+                await bot.add_roles(member, muted_role)
 
-    return embed
+    await bot.send_typing(ctx.message.channel)
+    results = await gather(*[run(m) for m in members], return_exceptions=True)
+    done = [m for m, r in zip(members, results) if r is None]
+    failed = [m for m, r in zip(members, results) if r is not None]
+    if done:
+        await send_mod_log(ctx, bot, action, done, reason)
+    past = {
+        'ban': localize['banned'], 'kick': localize['kicked'],
+        'mute': localize['muted']
+    }[action]
+    res = localize['bulk_done'].format(
+        past, len(done), len(members),
+        _join_names(done)
+    )
+    if failed:
+        res += '\n' + localize['bulk_failed'].format(
+            action_str, _join_names(failed)
+        )
+    await bot.say(res)
 
 
-async def send_mod_log(ctx, bot: Hifumi, action: str, member: Member,
-                       reason: str, warn_count: int = None):
+async def send_mod_log(ctx, bot: Hifumi, action: str, member, reason: str,
+                       warn_count: int = None):
     """
     Helper function to send a mod log
     :param ctx: the discord funtion
     :param bot: the bot
-    :param action: the action preformed
-    :param member: the target of the action
+    :param action: the action preformed, one of 'ban', 'kick', 'mute',
+    'unmute', 'warn' or 'pardon'
+    :param member: the target of the action, or a list of targets for a
+    bulk action
     :param reason: the reason of the action
     :param warn_count: the total warning count on the user
     """
-    localize = bot.localize(ctx)
-    # FIXME Remove type casting when library rewrite is finished
-    mod_log = bot.data_manager.get_mod_log(int(ctx.message.server.id))
-    if mod_log:
-        entry = generate_mod_log_entry(
-            action, ctx.message.author, member, reason, localize, warn_count
-        )
-        channel = await get_modlog(bot.data_manager, ctx.message.server)
-        if channel:
-            await bot.send_message(channel, embed=entry)
+    targets = member if isinstance(member, list) else [member]
+    entry = ModLogEntry(
+        action, ctx.message.author, targets, reason, warn_count
+    )
+    bot.mod_log.add(ctx.message.server, bot.localize(ctx), entry)
 
 
 async def warn_pardon(bot: Hifumi, ctx, reason: str, member: Member,
                       is_warn: bool):
     """
-    Helper function for warn/pardon commands
+    Helper function for warn/pardon commands, a warn that reaches a warn
+    rule of the guild escalates to its action
     :param bot: the bot
     :param ctx: the discord context
     :param reason: the warn/pardon reason
@@ -206,23 +298,30 @@ async def warn_pardon(bot: Hifumi, ctx, reason: str, member: Member,
     """
     localize = bot.localize(ctx)
     author = ctx.message.author
-    author = get_name_with_discriminator(author)
     # FIXME Remove casting when library rewrite is finished
     guild_id = int(ctx.message.server.id)
-    member_id = int(ctx.message.author.id)
-    data_manager = bot.data_manager
-    warn_count = data_manager.get_member_warns(member_id, guild_id) or 0
-    if is_warn:
-        new_warn_count = warn_count + 1
-        actions = 'warn', 'warn_success'
-    else:
-        new_warn_count = max(0, warn_count - 1)
-        actions = 'pardon', 'pardon_success'
-    await data_manager.set_member_warns(member_id, guild_id, new_warn_count)
+    member_id = int(member.id)
+    actions = ('warn', 'warn_success') if is_warn \
+        else ('pardon', 'pardon_success')
+    new_warn_count, escalation = await bot.warns.add(
+        guild_id, member_id, int(author.id), reason, is_warn
+    )
     await bot.say(
-        localize[actions[1]].format(member, reason, author) +
-        str(new_warn_count)
+        localize[actions[1]].format(
+            member, reason, get_name_with_discriminator(author)
+        ) + str(new_warn_count)
     )
     await send_mod_log(
-        ctx, bot, localize[actions[0]], member, reason, new_warn_count
+        ctx, bot, actions[0], member, reason, new_warn_count
+    )
+    if not escalation:
+        return
+    escalation_reason = localize['warn_escalation'].format(
+        new_warn_count, reason
     )
+    if escalation == 'mute':
+        await mute_unmute(ctx, bot, member, True, escalation_reason)
+    else:
+        await ban_kick(
+            bot, ctx, member, escalation_reason, escalation == 'ban'
+        )
@@ -0,0 +1,481 @@
+"""
+Functions and classes for the music commands
+"""
+from asyncio import ensure_future, gather, get_event_loop, shield, sleep
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from random import shuffle
+from time import monotonic
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+YTDL_OPTS = {
+    'default_search': 'auto',
+    'format': 'webm[abr>0]/bestaudio/best',
+    'geo_bypass': True,
+    'ignoreerrors': True,
+    'noplaylist': True,
+    'quiet': True,
+}
+
+# Lets ffmpeg reconnect to streams that drop.
+FFMPEG_BEFORE_OPTS = '-reconnect 1 -reconnect_streamed 1 ' \
+                     '-reconnect_delay_max 5'
+
+
+class TrackInfo:
+    """
+    The metadata of a track resolved by youtube-dl.
+    """
+    __slots__ = ['title', 'uploader', 'duration', 'url', 'webpage_url',
+                 'is_live', 'source_id']
+
+    def __init__(self, info: dict):
+        """
+        Initialize an instance of this class
+        :param info: the info dict returned by youtube-dl
+        """
+        self.title = info.get('title')
+        self.uploader = info.get('uploader') or 'Livestream'
+        self.duration = info.get('duration') or 0
+        self.url = info.get('url')
+        self.webpage_url = info.get('webpage_url')
+        self.is_live = bool(info.get('is_live'))
+        id_ = info.get('id')
+        self.source_id = f"{info.get('extractor_key')}-{id_}" if id_ else None
+
+
+def _extract(query: str, opts: dict) -> Optional[TrackInfo]:
+    """
+    Resolve a url or search term with youtube-dl, this runs in a worker
+    process.
+    :param query: the url or search term
+    :param opts: the youtube-dl options
+    :return: the track info, None if nothing was found
+    """
+    from youtube_dl import YoutubeDL
+    info = YoutubeDL(opts).extract_info(query, download=False)
+    if info and 'entries' in info:
+        info = next((e for e in info['entries'] if e), None)
+    if not info or not info.get('url'):
+        return None
+    return TrackInfo(info)
+
+
+class TrackResolver:
+    """
+    Resolves tracks in a process pool so youtube-dl never runs on the event
+    loop. Results are cached by query for ``ttl`` seconds, which is well
+    below how long the stream urls stay valid, and concurrent requests for
+    the same query share one extraction.
+    """
+    __slots__ = ['executor', 'ttl', 'max_size', 'hits', 'misses',
+                 '_cache', '_pending']
+
+    def __init__(self, max_workers: int = 2, ttl: float = 1800,
+                 max_size: int = 512):
+        """
+        Initialize an instance of this class
+        :param max_workers: the number of worker processes
+        :param ttl: the seconds a result is cached for
+        :param max_size: the maximum number of cached results
+        """
+        self.executor = ProcessPoolExecutor(max_workers)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._pending = {}
+
+    @staticmethod
+    def normalise(query: str) -> str:
+        """
+        Normalise a query for caching
+        :param query: the url or search term
+        :return: the normalised query
+        """
+        return ' '.join(query.split()).casefold()
+
+    def get(self, query: str) -> Optional[TrackInfo]:
+        """
+        Get a cached track
+        :param query: the url or search term
+        :return: the track if it's cached and not expired, else None
+        """
+        key = self.normalise(query)
+        try:
+            expires, track = self._cache[key]
+        except KeyError:
+            return None
+        if expires < monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return track
+
+    async def resolve(self, query: str) -> Optional[TrackInfo]:
+        """
+        Resolve a url or search term
+        :param query: the url or search term
+        :return: the track info, None if nothing was found
+        """
+        track = self.get(query)
+        if track:
+            self.hits += 1
+            return track
+        self.misses += 1
+        key = self.normalise(query)
+        future = self._pending.get(key)
+        if future is None:
+            future = ensure_future(self.__extract(key, query))
+            self._pending[key] = future
+        return await shield(future)
+
+    async def __extract(self, key: str, query: str) -> Optional[TrackInfo]:
+        """
+        Run youtube-dl in the process pool and cache the result
+        :param key: the cache key
+        :param query: the url or search term
+        :return: the track info, None if nothing was found
+        """
+        try:
+            track = await get_event_loop().run_in_executor(
+                self.executor, _extract, query, YTDL_OPTS
+            )
+        finally:
+            del self._pending[key]
+        if track and not track.is_live:
+            self._cache[key] = (monotonic() + self.ttl, track)
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return track
+
+    def close(self):
+        """
+        Shut down the worker processes
+        """
+        self.executor.shutdown(wait=False)
+
+
+class GapStats:
+    """
+    Tracks the silence between the end of a song and the start of the next.
+    """
+    __slots__ = ['count', 'total', 'max', 'last']
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, gap: float):
+        """
+        Record a gap
+        :param gap: the gap in seconds
+        """
+        self.count += 1
+        self.total += gap
+        self.max = max(self.max, gap)
+        self.last = gap
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class SongQueue:
+    """
+    The songs queued in a voice session.
+
+    Entries are kept in a list with a head index, so taking the next song
+    and reading any position are O(1), and the list is compacted once the
+    head passes half of it. ``_ends`` holds the running total of the
+    durations, so the total duration and the time until any entry plays
+    are O(1) as well. Removing, moving and shuffling rebuild the totals
+    from the first changed position.
+
+    Entries must have a ``duration`` attribute in seconds.
+    """
+    __slots__ = ['_entries', '_ends', '_head']
+
+    def __init__(self):
+        self._entries = []
+        self._ends = []
+        self._head = 0
+
+    def __len__(self):
+        return len(self._entries) - self._head
+
+    def __iter__(self) -> Iterator:
+        return islice(self._entries, self._head, None)
+
+    def __getitem__(self, index: int):
+        return self._entries[self.__index(index)]
+
+    def __index(self, index: int) -> int:
+        """
+        Get the list index of a queue position
+        :param index: the queue position, negative counts from the end
+        :return: the list index
+        """
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('queue index out of range')
+        return self._head + index
+
+    @property
+    def __offset(self) -> int:
+        return self._ends[self._head - 1] if self._head else 0
+
+    @property
+    def total(self) -> int:
+        """
+        The total duration of the queue in seconds
+        """
+        return self._ends[-1] - self.__offset if len(self) else 0
+
+    def starts_in(self, index: int) -> int:
+        """
+        Get how long after the current song an entry starts
+        :param index: the queue position
+        :return: the sum of the durations of the entries before it
+        """
+        return self._ends[self.__index(index) - 1] - self.__offset \
+            if index else 0
+
+    def append(self, entry):
+        """
+        Add an entry to the end of the queue
+        :param entry: the entry
+        """
+        last = self._ends[-1] if self._ends else 0
+        self._entries.append(entry)
+        self._ends.append(last + (entry.duration or 0))
+
+    def popleft(self):
+        """
+        Remove the first entry
+        :return: the entry
+        """
+        i = self.__index(0)
+        entry = self._entries[i]
+        self._entries[i] = None
+        self._head += 1
+        if self._head * 2 >= len(self._entries):
+            self.__compact()
+        return entry
+
+    def remove(self, index: int):
+        """
+        Remove an entry
+        :param index: the queue position
+        :return: the entry
+        """
+        i = self.__index(index)
+        entry = self._entries.pop(i)
+        self._ends.pop(i)
+        self.__rebuild(i)
+        return entry
+
+    def move(self, src: int, dst: int):
+        """
+        Move an entry to another position
+        :param src: the current queue position
+        :param dst: the new queue position
+        :return: the entry
+        """
+        i = self.__index(src)
+        j = self.__index(dst)
+        entry = self._entries.pop(i)
+        self._entries.insert(j, entry)
+        self.__rebuild(min(i, j))
+        return entry
+
+    def shuffle(self):
+        """
+        Shuffle the queue
+        """
+        rest = self._entries[self._head:]
+        shuffle(rest)
+        self._entries[self._head:] = rest
+        self.__rebuild(self._head)
+
+    def clear(self):
+        self._entries.clear()
+        self._ends.clear()
+        self._head = 0
+
+    def page(self, page: int, size: int) -> List[Tuple[int, object]]:
+        """
+        Get a page of the queue
+        :param page: the page number, starting from 1
+        :param size: the entries per page
+        :return: a list of (queue position, entry)
+        """
+        start = (page - 1) * size
+        stop = min(start + size, len(self))
+        head = self._head
+        return [(i, self._entries[head + i]) for i in range(start, stop)]
+
+    def pages(self, size: int) -> int:
+        """
+        Get the number of pages
+        :param size: the entries per page
+        :return: the number of pages, at least 1
+        """
+        return max(-(-len(self) // size), 1)
+
+    def __compact(self):
+        """
+        Drop the entries before the head
+        """
+        head = self._head
+        offset = self.__offset
+        del self._entries[:head]
+        self._ends = [end - offset for end in self._ends[head:]]
+        self._head = 0
+
+    def __rebuild(self, start: int):
+        """
+        Recompute the running totals from a list index
+        :param start: the list index
+        """
+        ends = self._ends
+        total = ends[start - 1] if start else 0
+        for i in range(start, len(self._entries)):
+            total += self._entries[i].duration or 0
+            ends[i] = total
+
+
+class VoiceSessions:
+    """
+    Tracks the voice session of every guild.
+
+    Sessions that have been idle for ``idle_timeout`` seconds are closed and
+    dropped by a single sweep that runs every ``interval`` seconds, instead
+    of each session timing itself out. A session must have an
+    ``idle_since`` attribute, the monotonic time it went idle or None while
+    it's active, an ``is_connected`` method, an ``is_playing`` method, an
+    ``ffmpeg_processes`` method that counts its running ffmpeg processes
+    and an async ``close`` method that takes whether it timed out.
+    """
+    __slots__ = ['factory', 'logger', 'idle_timeout', 'interval', 'evicted',
+                 '_sessions', '_task']
+
+    def __init__(self, factory: Callable, logger, idle_timeout: float = 300,
+                 interval: float = 60):
+        """
+        Initialize an instance of this class
+        :param factory: a function that creates a session
+        :param logger: the logger
+        :param idle_timeout: the seconds a session can be idle for
+        :param interval: the seconds between sweeps
+        """
+        self.factory = factory
+        self.logger = logger
+        self.idle_timeout = idle_timeout
+        self.interval = interval
+        self.evicted = 0
+        self._sessions = {}
+        self._task = None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, guild_id):
+        return guild_id in self._sessions
+
+    def values(self):
+        return self._sessions.values()
+
+    def get(self, guild_id):
+        """
+        Get the session of a guild, it's created if it doesn't exist
+        :param guild_id: the guild id
+        :return: the session
+        """
+        session = self._sessions.get(guild_id)
+        if session is None:
+            session = self._sessions[guild_id] = self.factory()
+            if self._task is None:
+                self._task = ensure_future(self.__run())
+        return session
+
+    def pop(self, guild_id):
+        """
+        Stop tracking the session of a guild
+        :param guild_id: the guild id
+        :return: the session, None if there was none
+        """
+        return self._sessions.pop(guild_id, None)
+
+    async def sweep(self, now: float = None) -> int:
+        """
+        Close and drop the idle sessions
+        :param now: the current monotonic time
+        :return: the number of sessions dropped
+        """
+        if now is None:
+            now = monotonic()
+        deadline = now - self.idle_timeout
+        idle = [
+            key for key, session in self._sessions.items()
+            if session.idle_since is not None and
+            session.idle_since <= deadline
+        ]
+        sessions = [self._sessions.pop(key) for key in idle]
+        results = await gather(
+            *[session.close(True) for session in sessions],
+            return_exceptions=True
+        )
+        for res in results:
+            if isinstance(res, Exception):
+                self.logger.warning(f'Failed to close voice session: {res}')
+        self.evicted += len(sessions)
+        return len(sessions)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Count the sessions
+        :return: the number of sessions, connected sessions, playing
+        sessions and running ffmpeg processes
+        """
+        sessions = self._sessions.values()
+        return {
+            'sessions': len(sessions),
+            'connected': sum(s.is_connected() for s in sessions),
+            'playing': sum(s.is_playing() for s in sessions),
+            'ffmpeg': sum(s.ffmpeg_processes() for s in sessions),
+        }
+
+    async def __run(self):
+        """
+        Sweep the sessions periodically
+        """
+        while True:
+            await sleep(self.interval)
+            try:
+                count = await self.sweep()
+            except Exception as e:
+                self.logger.warning(f'Voice session sweep failed: {e}')
+                continue
+            if count:
+                self.logger.info(
+                    f'Closed {count} idle voice sessions, {self.stats()}'
+                )
+
+    async def close(self):
+        """
+        Stop sweeping and close every session
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        await gather(*[session.close(False) for session in sessions],
+                     return_exceptions=True)
@@ -0,0 +1,199 @@
+"""
+Deletes messages from channel history in bulk.
+"""
+from asyncio import sleep
+from datetime import datetime, timedelta
+from re import IGNORECASE, compile, error
+from time import monotonic
+from typing import Pattern, Set
+
+from core.utilities_core import parse_remind_arg
+
+__all__ = ['PurgeFilter', 'Purge', 'parse_purge_args', 'PURGE_LIMIT']
+
+# The most messages a purge can delete.
+PURGE_LIMIT = 10000
+# The most messages a filtered purge looks through.
+SCAN_LIMIT = 50000
+# Bulk deletes only work on messages newer than 14 days, with a margin
+# for the time the purge takes.
+BULK_MAX_AGE = timedelta(days=14) - timedelta(minutes=10)
+# The most messages in one bulk delete.
+BULK_SIZE = 100
+
+
+class PurgeFilter:
+    """
+    Decides which messages a purge deletes.
+    """
+    __slots__ = ['authors', 'pattern', 'attachments', 'bots', 'after']
+
+    def __init__(self, authors: Set[str] = None, pattern: Pattern = None,
+                 attachments: bool = False, bots: bool = False,
+                 after: datetime = None):
+        """
+        Initialize an instance of this class.
+        :param authors: only delete messages from these user ids.
+        :param pattern: only delete messages that match this regex.
+        :param attachments: only delete messages with attachments.
+        :param bots: only delete messages from bots.
+        :param after: stop at messages created before this time.
+        """
+        self.authors = authors or set()
+        self.pattern = pattern
+        self.attachments = attachments
+        self.bots = bots
+        self.after = after
+
+    def __bool__(self):
+        return bool(self.authors or self.pattern or self.attachments or
+                    self.bots)
+
+    def __call__(self, message) -> bool:
+        """
+        Check if a message should be deleted.
+        :param message: the message.
+        :return: True if it matches every filter.
+        """
+        if self.authors and message.author.id not in self.authors:
+            return False
+        if self.bots and not message.author.bot:
+            return False
+        if self.attachments and not (message.attachments or message.embeds):
+            return False
+        if self.pattern and not self.pattern.search(message.content):
+            return False
+        return True
+
+
+def parse_purge_args(message, args) -> PurgeFilter:
+    """
+    Parse the filters of the purge command.
+    :param message: the command message, its mentions are the authors.
+    :param args: the arguments, ``bots``, ``files``, ``match:<regex>`` or
+    ``within:<hh:mm:ss>``.
+    :return: the filter.
+    :raises ValueError: if an argument is invalid.
+    """
+    res = PurgeFilter(authors={m.id for m in message.mentions})
+    for arg in args:
+        key, _, value = arg.partition(':')
+        key = key.lower()
+        if arg.startswith('<@'):
+            continue
+        elif key == 'bots':
+            res.bots = True
+        elif key in ('files', 'attachments'):
+            res.attachments = True
+        elif key in ('match', 'regex') and value:
+            try:
+                res.pattern = compile(value, IGNORECASE)
+            except error:
+                raise ValueError(arg)
+        elif key == 'within' and value:
+            try:
+                seconds = parse_remind_arg(value)
+            except ValueError:
+                raise ValueError(arg)
+            res.after = datetime.utcnow() - timedelta(seconds=seconds)
+        else:
+            raise ValueError(arg)
+    return res
+
+
+class Purge:
+    """
+    Goes through the history of a channel from the newest message and
+    deletes the ones that match a filter.
+
+    History is read 100 messages at a time. Messages newer than 14 days
+    are deleted in bulk deletes of up to 100 messages. Older messages can't
+    be bulk deleted, so they are deleted one at a time every ``delay``
+    seconds after the bulk deletes. Setting ``cancelled`` stops the purge
+    before its next delete.
+    """
+    __slots__ = ['bot', 'channel', 'limit', 'check', 'skip', 'delay',
+                 'scan_limit', 'scanned', 'deleted', 'cancelled']
+
+    def __init__(self, bot, channel, limit: int, check: PurgeFilter,
+                 skip: Set[str] = None, delay: float = 1.2):
+        """
+        Initialize an instance of this class.
+        :param bot: the bot.
+        :param channel: the channel.
+        :param limit: the number of messages to delete.
+        :param check: the filter.
+        :param skip: ids of messages that are not deleted.
+        :param delay: the seconds between single deletes.
+        """
+        self.bot = bot
+        self.channel = channel
+        self.limit = limit
+        self.check = check
+        self.skip = skip or set()
+        self.delay = delay
+        self.scan_limit = SCAN_LIMIT if check else limit + len(self.skip)
+        self.scanned = 0
+        self.deleted = 0
+        self.cancelled = False
+
+    async def run(self, progress=None, interval: float = 5):
+        """
+        Run the purge.
+        :param progress: a coroutine function called with this purge every
+        ``interval`` seconds while it runs.
+        :param interval: the seconds between progress reports.
+        """
+        bulk_after = datetime.utcnow() - BULK_MAX_AGE
+        after = self.check.after
+        chunk = []
+        old = []
+        last_report = monotonic()
+        async for message in self.bot.logs_from(self.channel,
+                                                limit=self.scan_limit):
+            if self.cancelled or (after and message.timestamp < after):
+                break
+            self.scanned += 1
+            if message.id in self.skip or not self.check(message):
+                continue
+            if message.timestamp > bulk_after:
+                chunk.append(message)
+                if len(chunk) == BULK_SIZE:
+                    await self.__delete_bulk(chunk)
+                    chunk = []
+            else:
+                old.append(message)
+            if len(chunk) + len(old) + self.deleted >= self.limit:
+                break
+            if progress and monotonic() - last_report >= interval:
+                await progress(self)
+                last_report = monotonic()
+        if chunk and not self.cancelled:
+            await self.__delete_bulk(chunk)
+        for message in old:
+            if self.cancelled:
+                break
+            await self.__delete_single(message)
+            if progress and monotonic() - last_report >= interval:
+                await progress(self)
+                last_report = monotonic()
+
+    async def __delete_bulk(self, messages: list):
+        """
+        Delete up to 100 messages newer than 14 days.
+        :param messages: the messages.
+        """
+        if len(messages) == 1:
+            await self.bot.delete_message(messages[0])
+        else:
+            await self.bot.delete_messages(messages)
+        self.deleted += len(messages)
+
+    async def __delete_single(self, message):
+        """
+        Delete a message that is too old to be bulk deleted.
+        :param message: the message.
+        """
+        await self.bot.delete_message(message)
+        self.deleted += 1
+        await sleep(self.delay)
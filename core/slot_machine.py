@@ -0,0 +1,95 @@
+"""
+Slot machine spins.
+"""
+from random import Random
+from typing import List, Optional, Sequence, Tuple
+
+__all__ = ['SlotMachine', 'payout', 'SLOT_FRAMES']
+
+# Frames shown after the first one.
+SLOT_FRAMES = 3
+
+
+def payout(reels: Sequence, amount: int) -> int:
+    """
+    Get the amount paid back for a bet.
+    :param reels: the 3 final reels.
+    :param amount: the amount of bet.
+    :return: 3 times the bet if all reels match, the bet if two match,
+    else 0.
+    """
+    r1, r2, r3 = reels
+    if r1 == r2 == r3:
+        return amount * 3
+    if r1 != r2 and r1 != r3 and r2 != r3:
+        return 0
+    return amount
+
+
+class SlotMachine:
+    """
+    Draws slot machine spins from a preloaded emoji list.
+
+    Every spin picks a pool of ``upper // 2 * 3`` to ``upper * 3``
+    neighbouring emojis, and each reel runs through that pool from a random
+    offset for ``lower`` to ``upper`` rotations. The whole spin comes from a single 64 bit draw, which is split into the
+    pool, the offsets and the rotations, so every reel result is equally
+    likely and a spin costs one call into the random generator.
+    """
+    __slots__ = ['emojis', 'lower', 'upper', 'random']
+
+    def __init__(self, emojis: Sequence[str], lower: int = 2,
+                 upper: int = 5, seed: Optional[int] = None):
+        """
+        Initialize an instance of this class.
+        :param emojis: the emoji list.
+        :param lower: the minimum number of rotations of a reel.
+        :param upper: the maximum number of rotations of a reel.
+        :param seed: the random seed, for reproducible spins.
+        """
+        self.emojis = tuple(emojis)
+        self.lower = lower
+        self.upper = upper
+        self.random = Random(seed)
+
+    def spin_indices(self) -> Tuple[List[int], List[int], List[int]]:
+        """
+        Draw a spin as emoji indices.
+        :return: the 3 reels, item i of a reel is the emoji shown after i
+        rotations and the last item is the result.
+        """
+        count = len(self.emojis)
+        lower = self.lower
+        upper = self.upper
+        x, size = divmod(self.random.getrandbits(64), upper - upper // 2 + 1)
+        size = (upper // 2 + size) * 3
+        x, start = divmod(x, count)
+        reels = []
+        for _ in range(3):
+            x, offset = divmod(x, size)
+            x, rotations = divmod(x, upper - lower + 1)
+            reels.append([
+                (start + (offset + i) % size) % count
+                for i in range(lower + rotations + 1)
+            ])
+        return tuple(reels)
+
+    def spin(self, frames: int = SLOT_FRAMES) -> List[Tuple[str, str, str]]:
+        """
+        Draw a spin, only a few evenly spaced rotations are shown.
+        :param frames: the number of frames after the first one.
+        :return: the emojis of every frame, the first frame is the start
+        and the last frame is the result.
+        """
+        r1, r2, r3 = self.spin_indices()
+        l1, l2, l3 = len(r1) - 1, len(r2) - 1, len(r3) - 1
+        steps = max(l1, l2, l3)
+        emojis = self.emojis
+        res = []
+        for k in range(frames + 1):
+            step = -(-steps * k // frames)
+            frame = (emojis[r1[min(step, l1)]], emojis[r2[min(step, l2)]],
+                     emojis[r3[min(step, l3)]])
+            if not res or frame != res[-1]:
+                res.append(frame)
+        return res
@@ -1,37 +1,215 @@
+from asyncio import sleep
 from logging import WARN
 from random import shuffle
 from string import ascii_uppercase
 
-from aiohttp import ClientSession
 from discord.embeds import Embed
-from pytrivia import Category, Diffculty, Trivia, Type
+from pytrivia import Category, Diffculty, Type
 
 from bot import Hifumi
+from bot.message_router import MessageKind
+from core.trivia_pool import TriviaPool
 from data_controller import LowBalanceError
 from data_controller.data_utils import change_balance, get_prefix
 
 
+# Price money multipliers for correct answers by difficulty.
+_MULTIPLIERS = {
+    'easy': 0.5,
+    'medium': 1,
+    'hard': 2
+}
+
+
 class ArgumentError(ValueError):
     pass
 
 
+class TriviaRound:
+    """
+    A question asked in a channel, anyone in the channel can answer it.
+    Only the first answer of each user counts.
+    """
+    __slots__ = ['answer', 'choices', 'bets', 'answered', 'winners']
+
+    def __init__(self, answer: str, choices: str):
+        """
+        Initialize an instance of this class
+        :param answer: the correct answer letter
+        :param choices: the valid answer letters
+        """
+        self.answer = answer
+        self.choices = choices
+        self.bets = {}
+        self.answered = set()
+        self.winners = set()
+
+    def add_answer(self, user_id: int, content: str):
+        """
+        Record the answer of a user
+        :param user_id: the user id
+        :param content: the message content
+        """
+        content = content.strip().upper()
+        if (len(content) != 1 or content not in self.choices or
+                user_id in self.answered):
+            return
+        self.answered.add(user_id)
+        if content == self.answer:
+            self.winners.add(user_id)
+
+
+class TriviaSessions:
+    """
+    Runs the trivia rounds of every channel. A single message router
+    subscription dispatches answers to the round of their channel, and
+    each round is timed by one task no matter how many users play it.
+    """
+    __slots__ = ['bot', 'pool', 'round_time', 'rounds']
+
+    def __init__(self, bot: Hifumi, pool: TriviaPool, round_time: float = 10):
+        """
+        Initialize an instance of this class
+        :param bot: the bot
+        :param pool: the trivia question pool
+        :param round_time: the seconds users have to answer
+        """
+        self.bot = bot
+        self.pool = pool
+        self.round_time = round_time
+        self.rounds = {}
+        bot.router.subscribe(MessageKind.PLAIN, self.on_answer)
+
+    def close(self):
+        """
+        Stop receiving answers
+        """
+        self.bot.router.unsubscribe(self.on_answer)
+
+    async def on_answer(self, message):
+        """
+        Pass a message to the round running in its channel
+        :param message: the message
+        """
+        round_ = self.rounds.get(message.channel.id)
+        if round_:
+            round_.add_answer(int(message.author.id), message.content)
+
+    async def run(self, channel, trivia_data, localize, user_id: int,
+                  bet: int):
+        """
+        Run a round in a channel. If a round is already running there the
+        bet is placed on that round instead.
+        :param channel: the channel
+        :param trivia_data: the question
+        :param localize: the localization strings
+        :param user_id: the id of the user who started the round
+        :param bet: the bet of the user who started the round
+        """
+        running = self.rounds.get(channel.id)
+        if running:
+            await self.join(running, channel, localize, user_id, bet)
+            return
+        embed, answer, correct_str, difficulty = _format_trivia(
+            trivia_data, localize
+        )
+        if trivia_data['type'] == 'multiple':
+            count = len(trivia_data['incorrect_answers']) + 1
+            choices = ascii_uppercase[:count]
+        else:
+            choices = 'TF'
+        round_ = TriviaRound(answer, choices)
+        if bet > 0:
+            round_.bets[user_id] = bet
+        self.rounds[channel.id] = round_
+        try:
+            await self.bot.send_message(channel, embed=embed)
+            await sleep(self.round_time)
+        except Exception as e:
+            if round_.bets:
+                await self.bot.data_manager.add_user_balances(round_.bets)
+            raise e
+        finally:
+            del self.rounds[channel.id]
+        await self.bot.send_message(
+            channel, await self.__settle(round_, correct_str, difficulty,
+                                         localize)
+        )
+
+    async def join(self, round_: TriviaRound, channel, localize,
+                   user_id: int, bet: int):
+        """
+        Place a bet on a running round, the bet is refunded if the round
+        ended in the meantime.
+        :param round_: the round
+        :param channel: the channel
+        :param localize: the localization strings
+        :param user_id: the user id
+        :param bet: the bet, already taken from the user's balance
+        """
+        if bet <= 0:
+            return
+        if self.rounds.get(channel.id) is not round_:
+            await change_balance(self.bot.data_manager, user_id, bet)
+            return
+        round_.bets[user_id] = round_.bets.get(user_id, 0) + bet
+        await self.bot.send_message(
+            channel, localize['trivia_joined'].format(f'<@{user_id}>', bet)
+        )
+
+    async def __settle(self, round_: TriviaRound, correct_str, difficulty,
+                       localize) -> str:
+        """
+        Pay out the bets of a round with one balance update
+        :param round_: the round
+        :param correct_str: the correct answer string
+        :param difficulty: the difficulty of the question
+        :param localize: the localization strings
+        :return: the round result message
+        """
+        multiplier = _MULTIPLIERS[difficulty]
+        deltas = {
+            user_id: amount + round(amount * multiplier)
+            for user_id, amount in round_.bets.items()
+            if user_id in round_.winners
+        }
+        if deltas:
+            await self.bot.data_manager.add_user_balances(deltas)
+        lines = [localize['trivia_timeount'].format(correct_str)]
+        if round_.winners:
+            lines.append(localize['trivia_winners'].format(
+                ', '.join(f'<@{user_id}>' for user_id in round_.winners)
+            ))
+        else:
+            lines.append(localize['trivia_no_winners'])
+        for user_id, amount in round_.bets.items():
+            if user_id in deltas:
+                key, delta = 'trivia_correct_balance', deltas[user_id] - amount
+            else:
+                key, delta = 'trivia_wrong_balance', amount
+            balance = self.bot.data_manager.get_user_balance(user_id)
+            lines.append(
+                f'<@{user_id}> ' + localize[key].format(delta, balance)
+            )
+        return '\n'.join(lines)
+
+
 class TriviaGame:
     """
     A class to handle the trivia command
     """
-    __slots__ = ['api', 'bot', 'args', 'channel', 'author', 'conn', 'cur',
-                 'localize', 'bet', 'prefix', 'data_manager', 'user_id',
-                 'ctx']
+    __slots__ = ['sessions', 'bot', 'args', 'channel', 'author', 'localize',
+                 'bet', 'prefix', 'data_manager', 'user_id', 'ctx']
 
-    def __init__(self, ctx, bot: Hifumi, args, api: Trivia):
+    def __init__(self, ctx, bot: Hifumi, args, sessions: TriviaSessions):
         """
         Initialize an instance of this class
         :param ctx: the discord context
         :param bot: the bot
         :param args: the args the user passed in from trivia command
-        :param api: the trivia api
+        :param sessions: the trivia sessions
         """
-        self.api = api
+        self.sessions = sessions
         self.bot = bot
         self.ctx = ctx
         self.data_manager = bot.data_manager
@@ -45,45 +223,30 @@ class TriviaGame:
 
     async def play(self):
         """
-        Play the trivia game
+        Play the trivia game, or bet on the round running in the channel
         """
+        running = self.sessions.rounds.get(self.channel.id)
+        if running:
+            kwargs = await self.__get_kwargs()
+            if kwargs is not None and await self.__process_bet(kwargs):
+                await self.sessions.join(
+                    running, self.channel, self.localize, self.user_id,
+                    self.bet
+                )
+            return
         if not self.args and not await self.__handle_no_args():
             return
         kwargs = await self.__get_kwargs()
         if kwargs is None:
             return
-        trivia_data = await self.__get_trivia_data(
-            kwargs, self.bot.session_manager.session)
+        trivia_data = await self.__get_trivia_data(kwargs)
         if not trivia_data:
             return
         if not await self.__process_bet(kwargs):
             return
-        try:
-            embed, answer, correct_str, difficulty = _format_trivia(
-                trivia_data, self.localize
-            )
-            await self.bot.send_message(self.channel, embed=embed)
-            user_answer = await self.bot.wait_for_message(
-                10, author=self.author, channel=self.channel
-            )
-            correct = await self.__handle_answer(
-                user_answer, answer, correct_str
-            )
-            if self.bet > 0:
-                await self.bot.say(
-                    await _handle_bet(
-                        data_manager=self.data_manager,
-                        correct=correct,
-                        difficulty=difficulty,
-                        amount=self.bet,
-                        user_id=self.user_id,
-                        localize=self.localize
-                    )
-                )
-        except Exception as e:
-            if self.bet > 0:
-                await change_balance(self.data_manager, self.user_id, self.bet)
-            raise e
+        await self.sessions.run(
+            self.channel, trivia_data, self.localize, self.user_id, self.bet
+        )
 
     async def __handle_no_args(self):
         """
@@ -125,13 +288,13 @@ class TriviaGame:
                 self.localize['trivia_bad_args'].format(self.prefix)
             )
 
-    async def __get_trivia_data(self, kwargs, session: ClientSession):
+    async def __get_trivia_data(self, kwargs):
         """
         Get the trivia data from kwargs
         :return: the trivia data
         """
         try:
-            trivia_data = await _get_trivia_data(kwargs, self.api, session)
+            trivia_data = await _get_trivia_data(kwargs, self.sessions.pool)
         except Exception as e:
             self.bot.logger.log(WARN, str(e))
             trivia_data = None
@@ -160,32 +323,6 @@ class TriviaGame:
                 return False
         return True
 
-    async def __handle_answer(self, user_answer, answer, correct_str):
-        """
-        Handle the user answer
-        :param user_answer: the user answer
-        :param answer: the correct answer
-        :param correct_str: the correct answer string
-        :return: True if the user answer is correct else False
-        """
-        if user_answer is None:
-            await self.bot.send_message(
-                self.channel, self.localize['trivia_timeount'].format(
-                    correct_str
-                )
-            )
-            return False
-        elif user_answer.content.upper() != answer:
-            await self.bot.send_message(
-                self.channel, self.localize['trivia_wrong'].format(correct_str)
-            )
-            return False
-        else:
-            await self.bot.send_message(
-                self.channel, self.localize['trivia_correct']
-            )
-            return True
-
 
 def _parse_args(args):
     """
@@ -239,21 +376,17 @@ def _no_args(message):
             return 'trivia_abort', False
 
 
-async def _get_trivia_data(kwargs, api: Trivia, session: ClientSession):
+async def _get_trivia_data(kwargs, pool: TriviaPool):
     """
-    Get the trivia data from the api
+    Get the trivia data from the question pool
     :param kwargs: the kwargs parsed from user input args
-    :param api: the trivia api
-    :param session: the aiohttp ClientSession
-    :return: the api response
+    :param pool: the trivia question pool
+    :return: a question, None if there is no question
     """
     category = kwargs['category'] if 'category' in kwargs else None
     type_ = kwargs['type'] if 'type' in kwargs else None
     diffculty = kwargs['diffculty'] if 'diffculty' in kwargs else None
-
-    res = await api.request_async(
-        session, False, 1, category, diffculty, type_)
-    return res if res['response_code'] == 0 else None
+    return await pool.get(category, diffculty, type_)
 
 
 def __generate_choices(correct, incorrect):
@@ -283,7 +416,7 @@ def _format_trivia(trivia_data, localize):
     :param localize: the localization strings
     :return: (embed, answer, correct_str, difficulty)
     """
-    result = trivia_data['results'][0]
+    result = trivia_data
     question = result['question']
     type_ = result['type']
     category = result['category']
@@ -314,37 +447,3 @@ def _format_trivia(trivia_data, localize):
         correct_str = correct
 
     return embed, answer, correct_str, difficulty
-
-
-async def _handle_bet(**kwargs):
-    """
-    Handle the trivia outcome if the user placed a bet
-    :param kwargs: see below for details
-    :key data_manager: the data_manager
-    :key correct: if the answer was correct or not
-    :key difficulty: the difficulty of the answer
-    :key amount: the amount of bet
-    :key user_id: the user id
-    :key localize: the localization strings
-    :return: the bot response string
-    """
-    data_manager = kwargs['data_manager']
-    correct = kwargs['correct']
-    difficulty = kwargs['difficulty']
-    amount = kwargs['amount']
-    user_id = kwargs['user_id']
-    localize = kwargs['localize']
-    if correct:
-        multiplier = {
-            "easy": 0.5,
-            "medium": 1,
-            "hard": 2
-        }[difficulty]
-        price = round(amount * multiplier)
-        delta = price
-        await change_balance(data_manager, user_id, amount + price)
-    else:
-        delta = amount
-    key = 'trivia_correct_balance' if correct else 'trivia_wrong_balance'
-    return localize[key].format(
-        delta, data_manager.get_user_balance(user_id))
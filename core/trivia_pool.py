@@ -0,0 +1,235 @@
+"""
+A prefetching pool of trivia questions.
+"""
+from asyncio import ensure_future, get_event_loop, shield
+from collections import deque
+from json import dump, load
+from logging import WARN
+from os import replace
+from pathlib import Path
+from random import choice
+from tempfile import NamedTemporaryFile
+from time import monotonic
+from typing import Optional
+
+from pytrivia import Category, Diffculty, Trivia, Type
+
+from bot.session_manager import SessionManager
+
+__all__ = ['TriviaPool', 'BANK_PATH']
+
+BANK_PATH = Path(__file__).parent.parent.joinpath('data', 'trivia_bank.json')
+
+_TOKEN_URL = 'https://opentdb.com/api_token.php'
+
+# Open Trivia DB response codes.
+_SUCCESS = 0
+_NO_RESULTS = 1
+_TOKEN_NOT_FOUND = 3
+_TOKEN_EMPTY = 4
+
+
+def _key(category: Optional[Category], difficulty: Optional[Diffculty],
+         type_: Optional[Type]) -> tuple:
+    """
+    Get the pool key of a question filter.
+    :param category: the question category.
+    :param difficulty: the question difficulty.
+    :param type_: the question type.
+    :return: a tuple of the enum names.
+    """
+    return tuple(e.name if e else None for e in (category, difficulty, type_))
+
+
+class TriviaPool:
+    """
+    Keeps a queue of questions for every (category, difficulty, type) that
+    has been asked for. Questions are fetched up to ``batch_size`` at a
+    time, and a queue is refilled in the background once it falls below
+    ``low_water``. Every fetched question is also kept in a bounded bank
+    on disk, which questions are drawn from when the API is unavailable.
+    Once the session token has returned every question of a filter it is
+    reset, and a new token is requested if OpenTDB dropped the old one
+    after 6 hours of inactivity. After a failed request only the bank is used for
+    ``retry_delay`` seconds.
+    """
+    __slots__ = ['api', 'session_manager', 'logger', 'batch_size',
+                 'low_water', 'bank_size', 'bank_path', 'retry_delay',
+                 'fetches', '_pools', '_refills', '_bank', '_retry_at']
+
+    def __init__(self, api: Trivia, session_manager: SessionManager, logger,
+                 batch_size: int = 50, low_water: int = 10,
+                 bank_size: int = 200, bank_path: Path = BANK_PATH,
+                 retry_delay: float = 60):
+        """
+        Initialize an instance of this class.
+        :param api: the trivia api, created with a session token so
+        questions don't repeat.
+        :param session_manager: the SessionManager.
+        :param logger: the logger.
+        :param batch_size: the number of questions fetched per request,
+        at most 50.
+        :param low_water: refill a queue when it has fewer questions.
+        :param bank_size: the number of questions kept per key in the bank.
+        :param bank_path: the path of the bank file.
+        :param retry_delay: the seconds to only use the bank for after a
+        failed request.
+        """
+        self.api = api
+        self.session_manager = session_manager
+        self.logger = logger
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self.bank_size = bank_size
+        self.bank_path = bank_path
+        self.retry_delay = retry_delay
+        self.fetches = 0
+        self._pools = {}
+        self._refills = {}
+        self._bank = {}
+        self._retry_at = 0
+        self.__load_bank()
+
+    async def get(self, category: Category = None,
+                  difficulty: Diffculty = None,
+                  type_: Type = None) -> Optional[dict]:
+        """
+        Get a question.
+        :param category: the question category, None for any.
+        :param difficulty: the question difficulty, None for any.
+        :param type_: the question type, None for any.
+        :return: the question, None if there is no question.
+        """
+        key = _key(category, difficulty, type_)
+        pool = self._pools.setdefault(key, deque())
+        if len(pool) <= self.low_water:
+            task = self.__refill(key, category, difficulty, type_)
+            if not pool and task:
+                await shield(task)
+        if pool:
+            return pool.popleft()
+        bank = self._bank.get(key)
+        return choice(bank) if bank else None
+
+    def __refill(self, key: tuple, category, difficulty, type_):
+        """
+        Refill a queue in the background, only one refill runs per key.
+        :return: the refill task, None if the API failed recently.
+        """
+        if monotonic() < self._retry_at:
+            return None
+        task = self._refills.get(key)
+        if task is None or task.done():
+            task = ensure_future(
+                self.__fetch(key, category, difficulty, type_)
+            )
+            self._refills[key] = task
+        return task
+
+    async def __fetch(self, key: tuple, category, difficulty, type_):
+        """
+        Fetch questions into a queue. If there aren't enough questions left
+        for the filter, fewer questions are asked for.
+        """
+        amount = self.batch_size
+        reset = renewed = False
+        while amount:
+            try:
+                res = await self.api.request_async(
+                    self.session_manager.session, False, amount,
+                    category, difficulty, type_
+                )
+            except Exception as e:
+                self.logger.log(WARN, f'Trivia request failed: {e}')
+                self._retry_at = monotonic() + self.retry_delay
+                return
+            self.fetches += 1
+            code = res['response_code']
+            if code == _SUCCESS:
+                self._pools[key].extend(res['results'])
+                self.__add_to_bank(key, res['results'])
+                return
+            if code == _TOKEN_EMPTY and not reset:
+                reset = True
+                if await self.__reset_token():
+                    continue
+            if code == _TOKEN_NOT_FOUND and not renewed:
+                renewed = True
+                if await self.__request_token():
+                    continue
+            if code != _NO_RESULTS:
+                self.logger.log(WARN, f'Trivia response code {code}')
+                self._retry_at = monotonic() + self.retry_delay
+                return
+            amount //= 2
+
+    async def __reset_token(self) -> bool:
+        """
+        Reset the session token, so it returns questions it already
+        returned again.
+        :return: True if the token was reset.
+        """
+        if self.api.token is None:
+            return False
+        try:
+            res = await self.session_manager.get_json(
+                _TOKEN_URL, {'command': 'reset', 'token': self.api.token}
+            )
+        except Exception as e:
+            self.logger.log(WARN, f'Trivia token reset failed: {e}')
+            return False
+        return bool(res) and res.get('response_code') == _SUCCESS
+
+    async def __request_token(self) -> bool:
+        """
+        Request a new session token, for when OpenTDB no longer knows the
+        current one.
+        :return: True if a new token was set.
+        """
+        try:
+            res = await self.session_manager.get_json(
+                _TOKEN_URL, {'command': 'request'}
+            )
+        except Exception as e:
+            self.logger.log(WARN, f'Trivia token request failed: {e}')
+            return False
+        if not res or res.get('response_code') != _SUCCESS:
+            return False
+        self.api.token = res['token']
+        return True
+
+    def __add_to_bank(self, key: tuple, results: list):
+        """
+        Add questions to the bank and save it.
+        :param key: the pool key.
+        :param results: the questions.
+        """
+        bank = self._bank.setdefault(key, deque(maxlen=self.bank_size))
+        bank.extend(results)
+        data = [[list(k), list(v)] for k, v in self._bank.items()]
+        get_event_loop().run_in_executor(None, self.__save_bank, data)
+
+    def __save_bank(self, data: list):
+        """
+        Write the bank to disk.
+        :param data: the bank as a list of [key, questions].
+        """
+        try:
+            with NamedTemporaryFile('w', encoding='utf-8', delete=False,
+                                    dir=self.bank_path.parent) as f:
+                dump(data, f)
+            replace(f.name, self.bank_path)
+        except OSError as e:
+            self.logger.log(WARN, f'Failed to save trivia bank: {e}')
+
+    def __load_bank(self):
+        """
+        Read the bank from disk if it exists.
+        """
+        try:
+            with self.bank_path.open(encoding='utf-8') as f:
+                data = load(f)
+        except (OSError, ValueError):
+            return
+        for key, results in data:
+            self._bank[tuple(key)] = deque(results, maxlen=self.bank_size)
@@ -0,0 +1,267 @@
+"""
+An offline coordinate to time zone index.
+
+The index is a two level grid over the globe. Each 1x1 degree cell either
+maps directly to a single time zone, or points to a block of finer cells
+for cells that are crossed by a time zone boundary. The grid is stored in a
+single binary file that is memory mapped on first use, so a lookup is two
+array reads.
+
+To build the index from a GeoJSON time zone map (e.g. ``combined.json`` from
+https://github.com/evansiroky/timezone-boundary-builder/releases), run::
+
+    python -m core.tz_index path/to/combined.json
+"""
+from array import array
+from json import load
+from math import ceil
+from mmap import ACCESS_READ, mmap
+from pathlib import Path
+from struct import Struct
+from sys import argv
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+__all__ = ['TzIndex', 'build_index', 'load_geojson', 'INDEX_PATH']
+
+INDEX_PATH = Path(Path(__file__).parent.parent.joinpath(
+    'data', 'tz_index.bin'))
+
+_MAGIC = b'HTZI'
+_VERSION = 1
+# magic, version, fine cells per degree, name count, block count
+_HEADER = Struct('<4sHHII')
+_BLOCK_FLAG = 0x80000000
+_COLS, _ROWS = 360, 180
+
+_Ring = Sequence[Tuple[float, float]]
+_Polygon = Sequence[_Ring]
+
+
+class TzIndex:
+    """
+    A memory mapped coordinate to time zone index.
+    """
+    __slots__ = ('path', '_file', '_mmap', '_coarse', '_fine', '_div',
+                 '_names', '_loaded')
+
+    def __init__(self, path: Path = INDEX_PATH):
+        """
+        Initialize an instance of this class. The index file is not read
+        until the first lookup.
+        :param path: the path to the index file.
+        """
+        self.path = path
+        self._file = None
+        self._mmap = None
+        self._coarse = None
+        self._fine = None
+        self._div = 0
+        self._names = ()
+        self._loaded = False
+
+    def __del__(self):
+        """
+        Class destructor, close the index file.
+        """
+        self.close()
+
+    @property
+    def available(self) -> bool:
+        """
+        :return: True if the index file exists and is loaded.
+        """
+        self.__ensure_loaded()
+        return self._coarse is not None
+
+    def close(self):
+        """
+        Release the memory map and the index file.
+        """
+        for view in (self._coarse, self._fine):
+            if view is not None:
+                view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+        if self._file is not None:
+            self._file.close()
+        self._coarse = self._fine = self._mmap = self._file = None
+        self._loaded = False
+
+    def __ensure_loaded(self):
+        """
+        Map the index file into memory if it hasn't been done yet.
+        """
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path.is_file():
+            return
+        self._file = self.path.open('rb')
+        self._mmap = mmap(self._file.fileno(), 0, access=ACCESS_READ)
+        magic, version, div, name_count, block_count = _HEADER.unpack_from(
+            self._mmap
+        )
+        if magic != _MAGIC or version != _VERSION:
+            self.close()
+            raise ValueError(f'{self.path} is not a valid time zone index.')
+        offset = _HEADER.size
+        names = []
+        for _ in range(name_count):
+            length = self._mmap[offset]
+            names.append(self._mmap[offset + 1:offset + 1 + length].decode())
+            offset += 1 + length
+        offset += -offset % 4
+        coarse_end = offset + _COLS * _ROWS * 4
+        fine_end = coarse_end + block_count * div * div * 2
+        view = memoryview(self._mmap)
+        self._coarse = view[offset:coarse_end].cast('I')
+        self._fine = view[coarse_end:fine_end].cast('H')
+        view.release()
+        self._div = div
+        self._names = tuple(names)
+
+    def tz_name_at(self, lat: float, lon: float) -> Optional[str]:
+        """
+        Get the time zone name at a coordinate.
+        :param lat: the latitude.
+        :param lon: the longitude.
+        :return: the time zone name, None if the coordinate isn't in any
+        time zone (e.g. open sea) or the index file doesn't exist.
+        """
+        self.__ensure_loaded()
+        if self._coarse is None:
+            return None
+        y = min(max(lat + 90.0, 0.0), _ROWS - 1e-9)
+        x = (lon + 180.0) % _COLS
+        row, col = int(y), int(x)
+        code = self._coarse[row * _COLS + col]
+        if code & _BLOCK_FLAG:
+            div = self._div
+            start = (code ^ _BLOCK_FLAG) * div * div
+            fine_row = int((y - row) * div)
+            fine_col = int((x - col) * div)
+            code = self._fine[start + fine_row * div + fine_col]
+        return self._names[code - 1] if code else None
+
+
+def __ring_crossings(ring: _Ring, div: int, rows: dict):
+    """
+    Add the x positions where a ring crosses each fine row centre.
+    :param ring: the ring as a sequence of (lon, lat) points.
+    :param div: the number of fine cells per degree.
+    :param rows: a dict of {fine row: list of x crossings} to add to.
+    """
+    height = _ROWS * div
+    for i in range(len(ring)):
+        x0, y0 = ring[i - 1]
+        x1, y1 = ring[i]
+        y0, y1 = (y0 + 90) * div, (y1 + 90) * div
+        if y0 == y1:
+            continue
+        x0, x1 = (x0 + 180) * div, (x1 + 180) * div
+        low, high = (y0, y1) if y0 < y1 else (y1, y0)
+        first = max(ceil(low - 0.5), 0)
+        for r in range(first, min(ceil(high - 0.5), height)):
+            x = x0 + (r + 0.5 - y0) * (x1 - x0) / (y1 - y0)
+            rows.setdefault(r, []).append(x)
+
+
+def __fill_polygon(grid: array, polygon: _Polygon, code: int, div: int):
+    """
+    Rasterize a polygon onto the fine grid with even-odd scanline filling.
+    :param grid: the fine grid.
+    :param polygon: the polygon, a sequence of rings, holes included.
+    :param code: the value to fill with.
+    :param div: the number of fine cells per degree.
+    """
+    width = _COLS * div
+    rows = {}
+    for ring in polygon:
+        __ring_crossings(ring, div, rows)
+    for r, xs in rows.items():
+        xs.sort()
+        base = r * width
+        for i in range(0, len(xs) - 1, 2):
+            start = max(ceil(xs[i] - 0.5), 0)
+            end = min(ceil(xs[i + 1] - 0.5), width)
+            if end > start:
+                grid[base + start:base + end] = array('H', [code]) * (
+                    end - start)
+
+
+def build_index(zones: Iterable[Tuple[str, List[_Polygon]]],
+                path: Path = INDEX_PATH, div: int = 10) -> Path:
+    """
+    Build a time zone index file.
+    :param zones: an iterable of (time zone name, list of polygons), each
+    polygon is a sequence of rings of (lon, lat) points, the first ring
+    being the outer boundary and the rest being holes.
+    :param path: the path to write the index to.
+    :param div: the number of fine cells per degree.
+    :return: the path to the index file.
+    """
+    assert 0 < div <= 255
+    width = _COLS * div
+    grid = array('H', [0]) * (width * _ROWS * div)
+    names = []
+    codes = {}
+    for name, polygons in zones:
+        if name not in codes:
+            names.append(name)
+            codes[name] = len(names)
+        for polygon in polygons:
+            __fill_polygon(grid, polygon, codes[name], div)
+
+    coarse = array('I', [0]) * (_COLS * _ROWS)
+    fine = array('H')
+    for row in range(_ROWS):
+        for col in range(_COLS):
+            cells = array('H')
+            for fine_row in range(row * div, row * div + div):
+                start = fine_row * width + col * div
+                cells.extend(grid[start:start + div])
+            first = cells[0]
+            if cells.count(first) == len(cells):
+                coarse[row * _COLS + col] = first
+            else:
+                block = len(fine) // (div * div)
+                coarse[row * _COLS + col] = _BLOCK_FLAG | block
+                fine.extend(cells)
+
+    header = bytearray(_HEADER.pack(
+        _MAGIC, _VERSION, div, len(names), len(fine) // (div * div)
+    ))
+    for name in names:
+        encoded = name.encode()
+        header.append(len(encoded))
+        header.extend(encoded)
+    header.extend(bytes(-len(header) % 4))
+    with path.open('wb') as f:
+        f.write(header)
+        f.write(coarse.tobytes())
+        f.write(fine.tobytes())
+    return path
+
+
+def load_geojson(path: Path):
+    """
+    Read time zone polygons from a GeoJSON feature collection.
+    :param path: the path to the GeoJSON file.
+    :return: a generator of (time zone name, list of polygons)
+    """
+    with path.open(encoding='utf-8') as f:
+        features = load(f)['features']
+    for feature in features:
+        props = feature['properties']
+        name = props.get('tzid') or props.get('TZID')
+        geometry = feature['geometry']
+        if not name or not geometry:
+            continue
+        if geometry['type'] == 'Polygon':
+            yield name, [geometry['coordinates']]
+        elif geometry['type'] == 'MultiPolygon':
+            yield name, geometry['coordinates']
+
+
+if __name__ == '__main__':
+    print(build_index(load_geojson(Path(argv[1]))))
@@ -0,0 +1,183 @@
+"""
+An index to resolve user input to a time zone name.
+"""
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import List, Optional
+
+from pytz import all_timezones, common_timezones, country_names, \
+    country_timezones
+
+__all__ = ['TzNameIndex']
+
+# Common abbreviations that aren't time zone names on their own.
+_ABBREVIATIONS = {
+    'EDT': 'America/New_York',
+    'CDT': 'America/Chicago',
+    'MDT': 'America/Denver',
+    'PST': 'America/Los_Angeles',
+    'PDT': 'America/Los_Angeles',
+    'AKST': 'America/Anchorage',
+    'AKDT': 'America/Anchorage',
+    'CST': 'America/Chicago',
+    'BST': 'Europe/London',
+    'IST': 'Asia/Kolkata',
+    'CEST': 'Europe/Paris',
+    'EEST': 'Europe/Athens',
+    'WEST': 'Europe/Lisbon',
+    'MSK': 'Europe/Moscow',
+    'PKT': 'Asia/Karachi',
+    'ICT': 'Asia/Bangkok',
+    'WIB': 'Asia/Jakarta',
+    'SGT': 'Asia/Singapore',
+    'HKT': 'Asia/Hong_Kong',
+    'PHT': 'Asia/Manila',
+    'JST': 'Asia/Tokyo',
+    'KST': 'Asia/Seoul',
+    'AEST': 'Australia/Sydney',
+    'AEDT': 'Australia/Sydney',
+    'ACST': 'Australia/Adelaide',
+    'ACDT': 'Australia/Adelaide',
+    'AWST': 'Australia/Perth',
+    'NZST': 'Pacific/Auckland',
+    'NZDT': 'Pacific/Auckland',
+    'BRT': 'America/Sao_Paulo',
+    'ART': 'America/Argentina/Buenos_Aires',
+}
+
+# Offsets that aren't whole hours have no Etc zone, they resolve to a zone
+# whose standard time has that offset.
+_PARTIAL_OFFSETS = {
+    '-9:30': 'Pacific/Marquesas',
+    '-3:30': 'America/St_Johns',
+    '+3:30': 'Asia/Tehran',
+    '+4:30': 'Asia/Kabul',
+    '+5:30': 'Asia/Kolkata',
+    '+5:45': 'Asia/Kathmandu',
+    '+6:30': 'Asia/Yangon',
+    '+8:45': 'Australia/Eucla',
+    '+9:30': 'Australia/Darwin',
+    '+12:45': 'Pacific/Chatham',
+}
+
+_NON_WORD = re.compile(r'[\W_]+')
+_OFFSET = re.compile(r'^(?:utc|gmt)([+-])(\d{1,2})(?::?(\d{2}))?$')
+
+
+def _normalize(s: str) -> str:
+    """
+    Normalize a string for matching.
+    :param s: the string.
+    :return: the string in lower case with non word characters as spaces.
+    >>> _normalize('America/New_York')
+    'america new york'
+    """
+    return _NON_WORD.sub(' ', s).strip().casefold()
+
+
+def _grams(s: str) -> List[str]:
+    """
+    Get the trigrams of a normalized string.
+    :param s: the string.
+    :return: the list of trigrams.
+    >>> _grams('utc')
+    ['  u', ' ut', 'utc', 'tc ']
+    """
+    padded = f'  {s} '
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class TzNameIndex:
+    """
+    A precomputed index of time zone names and their aliases, such as
+    city names, country names and abbreviations, with trigram fuzzy
+    matching for everything else.
+    """
+    __slots__ = ['_zones', '_aliases', '_keys', '_grams', 'resolve']
+
+    def __init__(self, cache_size: int = 1024):
+        """
+        Initialize an instance of this class.
+        :param cache_size: the number of resolved queries to cache.
+        """
+        self._zones = {zone.casefold(): zone for zone in all_timezones}
+        self._aliases = {}
+        for zone in common_timezones:
+            self.__add(zone, zone)
+        for zone in all_timezones:
+            self.__add(zone, zone)
+        for zone in common_timezones:
+            parts = zone.split('/')
+            for i in range(1, len(parts)):
+                self.__add('/'.join(parts[i:]), zone)
+        for code, zones in country_timezones.items():
+            # The first zone of a country is its most populated one.
+            self.__add(code, zones[0])
+            self.__add(country_names[code], zones[0])
+        for abbreviation, zone in _ABBREVIATIONS.items():
+            self.__add(abbreviation, zone)
+        self._keys = tuple(self._aliases)
+        self._grams = {}
+        for i, key in enumerate(self._keys):
+            for gram in set(_grams(key)):
+                self._grams.setdefault(gram, []).append(i)
+        self.resolve = lru_cache(cache_size)(self._resolve)
+
+    def __add(self, alias: str, zone: str):
+        """
+        Add an alias for a zone, existing aliases take precedence.
+        :param alias: the alias.
+        :param zone: the time zone name.
+        """
+        key = _normalize(alias)
+        if key:
+            self._aliases.setdefault(key, zone)
+
+    def _resolve(self, query: str) -> Optional[str]:
+        """
+        Resolve a query to a time zone name.
+        :param query: the user input.
+        :return: the time zone name, None if nothing matched.
+        """
+        compact = query.replace(' ', '').casefold()
+        if compact in self._zones:
+            return self._zones[compact]
+        offset = _OFFSET.match(compact)
+        if offset:
+            sign, hours, minutes = offset.groups()
+            if minutes and int(minutes):
+                return _PARTIAL_OFFSETS.get(f'{sign}{int(hours)}:{minutes}')
+            # The Etc/GMT zones have inverted signs.
+            sign = '-' if sign == '+' else '+'
+            return self._zones.get(f'etc/gmt{sign}{int(hours)}')
+        key = _normalize(query)
+        if not key:
+            return None
+        try:
+            return self._aliases[key]
+        except KeyError:
+            pass
+        best = self.__fuzzy(key)
+        return self._aliases[best] if best else None
+
+    def __fuzzy(self, key: str, cutoff: float = 0.6) -> Optional[str]:
+        """
+        Find the closest alias to a key.
+        :param key: the normalized query.
+        :param cutoff: the minimum similarity to accept a match.
+        :return: the closest alias if any is close enough.
+        """
+        grams = _grams(key)
+        shared = Counter()
+        for gram in set(grams):
+            shared.update(self._grams.get(gram, ()))
+        best, best_score = None, cutoff
+        for i, count in shared.most_common(10):
+            candidate = self._keys[i]
+            dice = 2 * count / (len(grams) + len(candidate) + 1)
+            score = max(dice, SequenceMatcher(None, key, candidate).ratio())
+            if score > best_score:
+                best, best_score = candidate, score
+        return best
@@ -1,40 +1,243 @@
+from asyncio import Future, ensure_future, get_event_loop, shield, sleep
 from time import time
-from typing import Union
+from typing import Dict, Optional, Union
 
 from discord import Embed
 from discord.embeds import EmptyEmbed
 
 from bot import HTTPStatusError, SessionManager
-from core.tzwhere_fix import TzWhere
+from core.tz_index import TzIndex
 from scripts.helpers import is_num, round_place, time_with_zone
 
 __r = round_place(1)
 
 
+class WeatherCache:
+    """
+    A cache of openweathermap responses keyed by normalised location and
+    city id. Entries expire when the upstream data is due to be updated.
+    """
+    __slots__ = ['_ids', '_data', 'interval', 'min_ttl', 'max_size',
+                 'hits', 'misses']
+
+    def __init__(self, interval: int = 600, min_ttl: int = 60,
+                 max_size: int = 4096):
+        """
+        Initialize an instance of this class.
+        :param interval: the upstream update interval in seconds.
+        :param min_ttl: the minimum time to keep an entry in seconds.
+        :param max_size: the maximum number of cached responses.
+        """
+        self._ids = {}
+        self._data = {}
+        self.interval = interval
+        self.min_ttl = min_ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalise(location: str) -> str:
+        """
+        Normalise a location query.
+        :param location: the location.
+        :return: the normalised location.
+        >>> WeatherCache.normalise('  New   York ,US')
+        'new york,us'
+        """
+        return ','.join(' '.join(s.split()) for s in
+                        location.casefold().split(','))
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        :return: the ratio of lookups served from the cache.
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get_id(self, location: str) -> Optional[int]:
+        """
+        Get the resolved city id of a location.
+        :param location: the location.
+        :return: the city id if it's known.
+        """
+        return self._ids.get(self.normalise(location))
+
+    def get(self, location: str) -> Optional[dict]:
+        """
+        Get the cached response of a location.
+        :param location: the location.
+        :return: the cached response if it's still fresh, else None.
+        """
+        key = self.normalise(location)
+        entry = self._data.get(self._ids.get(key, key))
+        if entry and entry[0] > time():
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, location: Optional[str], res: dict):
+        """
+        Cache a response.
+        :param location: the location queried, None if it's only known by
+        its city id.
+        :param res: the api response.
+        """
+        now = time()
+        city_id = res.get('id') or None
+        key = city_id or self.normalise(location)
+        if location is not None and city_id:
+            self._ids[self.normalise(location)] = city_id
+        expires = (res.get('dt') or now) + self.interval
+        self._data[key] = max(expires, now + self.min_ttl), res
+        if len(self._data) > self.max_size:
+            self.__evict(now)
+
+    def __evict(self, now: float):
+        """
+        Remove expired entries, and the oldest entries if still full.
+        :param now: the current time.
+        """
+        self._data = {k: v for k, v in self._data.items() if v[0] > now}
+        while len(self._data) > self.max_size:
+            del self._data[next(iter(self._data))]
+        if len(self._ids) > self.max_size * 4:
+            self._ids.clear()
+
+
+class WeatherBatcher:
+    """
+    Collects weather lookups of resolved city ids within a short window and
+    fetches them with the openweathermap group endpoint, up to 20 cities
+    per request.
+    """
+    __slots__ = ['session_manager', 'api', 'window', 'batch_size',
+                 '_pending', '_inflight', '_timer', 'upstream_calls']
+
+    url = 'http://api.openweathermap.org/data/2.5/group'
+
+    def __init__(self, session_manager: SessionManager, api: str,
+                 window: float = 0.1, batch_size: int = 20):
+        """
+        Initialize an instance of this class.
+        :param session_manager: the session manager.
+        :param api: the openweathermap api key.
+        :param window: the time to wait for more lookups in seconds.
+        :param batch_size: the maximum number of cities per request.
+        """
+        self.session_manager = session_manager
+        self.api = api
+        self.window = window
+        self.batch_size = batch_size
+        self._pending = {}
+        self._inflight = {}
+        self._timer = None
+        self.upstream_calls = 0
+
+    async def get(self, city_id: int) -> dict:
+        """
+        Get the weather of a city.
+        :param city_id: the openweathermap city id.
+        :return: the weather of the city, in the same format as the
+        weather endpoint.
+        :raises HTTPStatusError: if the request failed or the city wasn't
+        in the response.
+        """
+        future = self._pending.get(city_id) or self._inflight.get(city_id)
+        if future is None:
+            future = get_event_loop().create_future()
+            self._pending[city_id] = future
+            if len(self._pending) >= self.batch_size:
+                self.__flush()
+            elif self._timer is None:
+                self._timer = ensure_future(self.__flush_later())
+        return await shield(future)
+
+    async def __flush_later(self):
+        """
+        Flush the pending lookups after the batching window.
+        """
+        await sleep(self.window)
+        self._timer = None
+        self.__flush()
+
+    def __flush(self):
+        """
+        Send all pending lookups in batches.
+        """
+        pending, self._pending = self._pending, {}
+        self._inflight.update(pending)
+        ids = list(pending)
+        for i in range(0, len(ids), self.batch_size):
+            batch = {id_: pending[id_] for id_ in ids[i:i + self.batch_size]}
+            ensure_future(self.__fetch(batch))
+
+    async def __fetch(self, batch: Dict[int, Future]):
+        """
+        Fetch a batch of cities and resolve their futures.
+        :param batch: a dict of {city id: future}
+        """
+        param = {
+            'id': ','.join(str(id_) for id_ in batch),
+            'appid': self.api
+        }
+        self.upstream_calls += 1
+        try:
+            res = await self.session_manager.get_json(self.url, param)
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            for id_ in batch:
+                self._inflight.pop(id_, None)
+        for item in (res or {}).get('list', []):
+            future = batch.pop(item.get('id'), None)
+            if future and not future.done():
+                future.set_result(item)
+        for future in batch.values():
+            if not future.done():
+                future.set_exception(HTTPStatusError(404, 'NOT_FOUND'))
+
+
 async def weather(api: str, colour, session_manager: SessionManager,
-                  tzw: TzWhere, location: str, localize: dict):
+                  tz_index: TzIndex, cache: WeatherCache,
+                  batcher: WeatherBatcher, location: str, localize: dict):
     """
     Get the weather of an location.
     :param api: the openweathermap api key.
     :param colour: colour for the embed.
     :param session_manager: the session manager.
-    :param tzw: the TzWhere class to get time zone by coordinates.
+    :param tz_index: the index to get time zone by coordinates.
+    :param cache: the weather cache.
+    :param batcher: the batcher for lookups of known city ids.
     :param location: the location.
     :param localize: the localization strings.
     :return: the weather info of that location.
     """
-    url = 'http://api.openweathermap.org/data/2.5/weather?'
-    param = {
-        'q': location,
-        'appid': api
-    }
-    try:
-        res = await session_manager.get_json(url, param)
-    except HTTPStatusError as e:
-        if e.code == 404:
-            return localize['nothing_found']
-        else:
-            return localize['api_error'].format('Openweathermap') + f'\n{e}'
+    res = cache.get(location)
+    if res is None:
+        url = 'http://api.openweathermap.org/data/2.5/weather?'
+        param = {
+            'q': location,
+            'appid': api
+        }
+        city_id = cache.get_id(location)
+        try:
+            if city_id:
+                res = await batcher.get(city_id)
+            else:
+                res = await session_manager.get_json(url, param)
+        except HTTPStatusError as e:
+            if e.code == 404:
+                return localize['nothing_found']
+            else:
+                return localize['api_error'].format(
+                    'Openweathermap') + f'\n{e}'
+        cache.put(location, res)
 
     data = __weather_data(res)
     if not any(data):
@@ -53,7 +256,7 @@ async def weather(api: str, colour, session_manager: SessionManager,
     temp, pressure, sea_level, grnd_level, humidity, temp_min, temp_max = md
     country, sunrise, sunset = __sys_data(res)
     local_time, sunrise_str, sunset_str = __time_info(
-        res, tzw, sunrise, sunset)
+        res, tz_index, sunrise, sunset)
 
     title = localize['weather_info'] + (name or '')
     if country:
@@ -193,16 +396,16 @@ def __sys_data(res):
     return country, sunrise, sunset
 
 
-def __time_info(res, tzw, sunrise, sunset):
+def __time_info(res, tz_index, sunrise, sunset):
     """
     Get the time info from the weather api response.
     :param res: the weather api response.
-    :param tzw: the TzWhere class to get time zone by coordinates.
+    :param tz_index: the index to get time zone by coordinates.
     :return: local_time, sunrise_str, sunset_str
     """
     try:
         lat, lon = res['coord']['lat'], res['coord']['lon']
-        tz = tzw.tzNameAt(lat, lon, True) or 'UTC'
+        tz = tz_index.tz_name_at(lat, lon) or 'UTC'
     except KeyError:
         tz = 'UTC'
 
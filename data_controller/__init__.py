@@ -1,6 +1,9 @@
+from data_controller.command_filter import CommandFilter
 from data_controller.data_manager import DataManager
 from data_controller.errors import *
+from data_controller.reminders import ReminderScheduler
 from data_controller.tag_matcher import TagMatcher
+from data_controller.warns import WarnTracker
 
-__all__ = ['DataManager', 'TagMatcher', 'LowBalanceError',
-           'NegativeTransferError']
+__all__ = ['CommandFilter', 'DataManager', 'ReminderScheduler', 'TagMatcher',
+           'WarnTracker', 'LowBalanceError', 'NegativeTransferError']
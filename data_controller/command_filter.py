@@ -0,0 +1,130 @@
+from typing import Dict, Optional, Tuple
+
+from data_controller.postgres import Postgres
+
+__all__ = ['CommandFilter', 'ALL_COMMANDS', 'SCOPES']
+
+ALL_COMMANDS = '*'
+# Scopes in the order they are checked, the most specific one first.
+SCOPES = ('user', 'channel', 'guild')
+
+_Key = Tuple[str, int, str]
+
+
+class CommandFilter:
+    """
+    A class that holds the per guild command black/white lists in memory
+    and decides whether a command may be used.
+
+    A guild's lists are loaded the first time a command is used in it,
+    guilds without any list entries are known from startup and cost a
+    single set lookup.
+    """
+    __slots__ = ['__postgres', '__guilds', '__filters']
+
+    def __init__(self, postgres: Postgres):
+        """
+        Initialize an instance of this class.
+        :param postgres: the postgres controller.
+        """
+        self.__postgres = postgres
+        self.__guilds = set()
+        self.__filters = {}
+
+    async def init(self):
+        """
+        Find out which guilds have command filters.
+        """
+        self.__guilds = {
+            int(g) for g in await self.__postgres.get_filter_guilds()
+        }
+
+    async def __get_filters(self, guild_id: int) -> Dict[_Key, bool]:
+        """
+        Get the filters of a guild, loading them from the db if needed.
+        :param guild_id: the guild id.
+        :return: a dict of {(scope, target id, command): is whitelist}
+        """
+        try:
+            return self.__filters[guild_id]
+        except KeyError:
+            pass
+        filters = {}
+        if guild_id in self.__guilds:
+            rows = await self.__postgres.get_command_filters(str(guild_id))
+            for _, scope, target_id, command, whitelist in rows:
+                filters[(scope, int(target_id), command)] = whitelist
+        return self.__filters.setdefault(guild_id, filters)
+
+    def __lookup(self, filters: Dict[_Key, bool], guild_id: int,
+                 channel_id: int, user_id: int,
+                 command: str) -> Optional[bool]:
+        """
+        Find the most specific filter entry for a command.
+        :param filters: the filters of the guild.
+        :param guild_id: the guild id.
+        :param channel_id: the channel id.
+        :param user_id: the user id.
+        :param command: the command name.
+        :return: True if whitelisted, False if blacklisted, None if no
+        entry applies.
+        """
+        targets = (user_id, channel_id, guild_id)
+        for scope, target in zip(SCOPES, targets):
+            for name in (command, ALL_COMMANDS):
+                res = filters.get((scope, target, name))
+                if res is not None:
+                    return res
+        return None
+
+    async def is_blocked(self, guild_id: Optional[int], channel_id: int,
+                         user_id: int, command: str) -> bool:
+        """
+        Check if a command is blocked.
+        :param guild_id: the guild id, None for direct messages.
+        :param channel_id: the channel id.
+        :param user_id: the user id.
+        :param command: the command name.
+        :return: True if the command is blocked.
+        """
+        if guild_id is None or guild_id not in self.__guilds:
+            return False
+        filters = await self.__get_filters(guild_id)
+        return self.__lookup(
+            filters, guild_id, channel_id, user_id, command) is False
+
+    async def set_filter(self, guild_id: int, scope: str, target_id: int,
+                         command: str, whitelist: bool):
+        """
+        Black list or white list a command.
+        :param guild_id: the guild id.
+        :param scope: one of 'user', 'channel' or 'guild'.
+        :param target_id: the user, channel or guild id.
+        :param command: the command name, '*' for all commands.
+        :param whitelist: True to white list, False to black list.
+        """
+        assert scope in SCOPES
+        filters = await self.__get_filters(guild_id)
+        await self.__postgres.set_command_filter(
+            (str(guild_id), scope, str(target_id), command, whitelist)
+        )
+        filters[(scope, target_id, command)] = whitelist
+        self.__guilds.add(guild_id)
+
+    async def remove_filter(self, guild_id: int, scope: str, target_id: int,
+                            command: str):
+        """
+        Remove a command from the black/white list.
+        :param guild_id: the guild id.
+        :param scope: one of 'user', 'channel' or 'guild'.
+        :param target_id: the user, channel or guild id.
+        :param command: the command name, '*' for all commands.
+        """
+        assert scope in SCOPES
+        filters = await self.__get_filters(guild_id)
+        await self.__postgres.delete_command_filter(
+            (str(guild_id), scope, str(target_id), command)
+        )
+        filters.pop((scope, target_id, command), None)
+        if not filters:
+            self.__guilds.discard(guild_id)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional, Type, Union
+from typing import Dict, List, Optional, Type, Union
 
 from data_controller.data_rows import *
 from data_controller.postgres import Postgres
@@ -139,6 +139,45 @@ class DataManager:
         row = self.__get_guild_row(guild_id)
         await row.set_mod_log(channel_id)
 
+    async def add_mod_logs(self, rows: List[tuple]):
+        """
+        Save many moderation actions with a single db write.
+        :param rows: the guild id, action, mod id, target id, reason and
+        time of each action, ids as strings.
+        """
+        if rows:
+            await self.__postgres.add_mod_logs(rows)
+
+    async def get_mod_logs(self, guild_id: int, target_id: int = None,
+                           limit: int = 10) -> List[tuple]:
+        """
+        Get the most recent moderation actions of a guild.
+        :param guild_id: the guild id.
+        :param target_id: only get the actions on this user if given.
+        :param limit: the maximum number of actions.
+        :return: a list of (action, mod id, target id, reason, time),
+        newest first.
+        """
+        return await self.__postgres.get_mod_logs(
+            str(guild_id), None if target_id is None else str(target_id),
+            limit
+        )
+
+    async def get_anti_spam_guilds(self) -> List[int]:
+        """
+        Get the ids of all guilds with anti spam on.
+        :return: a list of guild ids.
+        """
+        return [int(g) for g in await self.__postgres.get_anti_spam_guilds()]
+
+    async def set_anti_spam(self, guild_id: int, enabled: bool):
+        """
+        Turn anti spam on or off for a guild.
+        :param guild_id: the guild id.
+        :param enabled: True to turn it on.
+        """
+        await self.__postgres.set_anti_spam(str(guild_id), enabled)
+
     def get_roles(self, guild_id: int) -> List[str]:
         """
         Get the list of roles in the guild.
@@ -198,6 +237,30 @@ class DataManager:
         row = self.__get_user_row(user_id)
         await row.set_balance(balance)
 
+    async def add_user_balances(
+            self, deltas: Dict[int, int]) -> Dict[int, int]:
+        """
+        Add to the balance of many users with a single db write.
+        :param deltas: a dict of {user id: amount to add}
+        :return: a dict of {user id: new balance}
+        """
+        res = {}
+        for user_id, delta in deltas.items():
+            balance = (self.get_user_balance(user_id) or 0) + delta
+            assert 0 <= balance < 9223372036854775807
+            res[user_id] = balance
+        rows = {user_id: self.__get_user_row(user_id) for user_id in res}
+        for user_id, row in rows.items():
+            row.update_balance(res[user_id])
+        values = [row.values for row in rows.values()]
+        try:
+            await self.__postgres.set_users(values)
+        except Exception:
+            for user_id, row in rows.items():
+                row.update_balance((row.balance or 0) - deltas[user_id])
+            raise
+        return res
+
     def get_user_daily(self, user_id: int) -> datetime:
         """
         Get the timestamp of the user's last daily..
@@ -28,6 +28,18 @@ class _Row:
         """
         raise NotImplementedError
 
+    @property
+    def values(self) -> tuple:
+        return tuple(self._row)
+
+    def _update(self, pos: int, val):
+        """
+        Helper method to set a value of the row without writing it to the db.
+        :param pos: the position of the value.
+        :param val: the value to set to.
+        """
+        self._row[pos] = val
+
     async def _set(self, pos: int, val):
         """
         Helper method to set a value of the row.
@@ -165,6 +177,9 @@ class _UserRow(_Row):
     async def set_balance(self, balance: int):
         await self._set(1, balance)
 
+    def update_balance(self, balance: int):
+        self._update(1, balance)
+
     async def set_daily(self, daily: datetime):
         await self._set(2, daily)
 
@@ -4,7 +4,6 @@ Utility functions to interact with the database
 from typing import List
 
 from discord import Server
-from discord.utils import get
 
 from data_controller.data_manager import DataManager
 from data_controller.errors import LowBalanceError, NegativeTransferError
@@ -23,6 +22,7 @@ async def set_language(bot, ctx, language: str) -> str:
     # FIXME Remove casting after library rewrite
     guild_id = int(ctx.message.server.id)
     await bot.data_manager.set_language(guild_id, language)
+    bot.guild_settings_changed(guild_id)
     localize = bot.localize(ctx)
     language_data = localize['language_data']
     translators = language_data['translators']
@@ -38,13 +38,7 @@ def get_prefix(bot, message):
     :param message: the discord message.
     :return: the command prefix.
     """
-    try:
-        server_id = int(message.server.id)
-    except AttributeError:
-        return bot.default_prefix
-    else:
-        r = bot.data_manager.get_prefix(server_id)
-        return r if r else bot.default_prefix
+    return bot.message_context(message).prefix
 
 
 async def change_balance(data_manager: DataManager, user_id: int, delta: int):
@@ -132,20 +126,3 @@ async def self_role_names(
     if new != lst:
         await data_manager.set_roles(guild_id, new)
     return new
-
-
-async def get_modlog(data_manager: DataManager, guild):
-    """
-    Get the mod log channel of a server, remove it from the db if the
-    channel no longer exists
-    :param data_manager: the data manager
-    :param guild: the guild
-    :return: the mod log channel id
-    """
-    # FIXME Remove casting after library rewrite
-    modlog = data_manager.get_mod_log(int(guild.id))
-    guild_channel = get(guild.channels, id=str(modlog))
-    if guild_channel:
-        return guild_channel
-    else:
-        await data_manager.set_mod_log(int(guild.id), None)
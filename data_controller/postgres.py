@@ -11,6 +11,11 @@ _guild_types = (str, str, str, str, list)
 _member_types = (str, str, int)
 _user_types = (str, int, datetime)
 _tag_types = (str, str)
+_command_filter_types = (str, str, str, str, bool)
+_reminder_types = (str, datetime, str)
+_mod_log_types = (str, str, str, str, str, datetime)
+_warn_types = (str, str, str, str, bool, datetime)
+_warn_rule_types = (str, int, str)
 
 
 def _parse_record(record: Record) -> Optional[tuple]:
@@ -33,7 +38,14 @@ class Postgres:
     __slots__ = ['logger', 'pool', '__get_guild', '__set_guild', '__get_member',
                  '__set_member', '__get_user', '__set_user', '__get_tags',
                  '__set_tags', '__get_all_guild', '__get_all_member',
-                 '__get_all_user']
+                 '__get_all_user', '__get_filter_guilds',
+                 '__get_command_filters', '__set_command_filter',
+                 '__delete_command_filter', '__add_reminder',
+                 '__get_reminders', '__delete_reminders', '__add_mod_log',
+                 '__get_mod_logs', '__get_member_mod_logs', '__add_warn',
+                 '__get_warns', '__get_warn_rules', '__set_warn_rule',
+                 '__delete_warn_rule', '__get_anti_spam_guilds',
+                 '__set_anti_spam', '__delete_anti_spam']
 
     def __init__(self, pool: Pool, schema, logger):
         """
@@ -78,6 +90,78 @@ class Postgres:
         self.__get_all_guild = 'SELECT * FROM {}.guild_info'.format(schema)
         self.__get_all_member = 'SELECT * FROM {}.member_info'.format(schema)
         self.__get_all_user = 'SELECT * FROM {}.user_info'.format(schema)
+        self.__get_filter_guilds = (
+            'SELECT DISTINCT guild_id FROM {}.command_filter'.format(schema)
+        )
+        self.__get_command_filters = (
+            'SELECT * FROM {}.command_filter WHERE guild_id=$1'.format(schema)
+        )
+        self.__set_command_filter = (
+            'INSERT INTO {}.command_filter VALUES ($1, $2, $3, $4, $5) '
+            'ON CONFLICT (guild_id, scope, target_id, command) '
+            'DO UPDATE SET whitelist=$5'.format(schema)
+        )
+        self.__delete_command_filter = (
+            'DELETE FROM {}.command_filter WHERE guild_id=$1 AND scope=$2 '
+            'AND target_id=$3 AND command=$4'.format(schema)
+        )
+        self.__add_reminder = (
+            'INSERT INTO {}.reminder (channel_id, end_time, content) '
+            'VALUES ($1, $2, $3) RETURNING id'.format(schema)
+        )
+        self.__get_reminders = (
+            'SELECT * FROM {}.reminder WHERE end_time <= $1 '
+            'ORDER BY end_time'.format(schema)
+        )
+        self.__delete_reminders = (
+            'DELETE FROM {}.reminder WHERE id = ANY($1::INTEGER[])'.format(
+                schema)
+        )
+        self.__add_mod_log = (
+            'INSERT INTO {}.mod_log '
+            '(guild_id, action, mod_id, target_id, reason, time) '
+            'VALUES ($1, $2, $3, $4, $5, $6)'.format(schema)
+        )
+        self.__get_mod_logs = (
+            'SELECT action, mod_id, target_id, reason, time '
+            'FROM {}.mod_log WHERE guild_id=$1 '
+            'ORDER BY time DESC LIMIT $2'.format(schema)
+        )
+        self.__get_member_mod_logs = (
+            'SELECT action, mod_id, target_id, reason, time '
+            'FROM {}.mod_log WHERE guild_id=$1 AND target_id=$2 '
+            'ORDER BY time DESC LIMIT $3'.format(schema)
+        )
+        self.__add_warn = (
+            'INSERT INTO {}.warn_history '
+            '(guild_id, member_id, mod_id, reason, pardon, time) '
+            'VALUES ($1, $2, $3, $4, $5, $6)'.format(schema)
+        )
+        self.__get_warns = (
+            'SELECT mod_id, reason, pardon, time FROM {}.warn_history '
+            'WHERE guild_id=$1 AND member_id=$2 '
+            'ORDER BY time DESC LIMIT $3'.format(schema)
+        )
+        self.__get_warn_rules = 'SELECT * FROM {}.warn_rule'.format(schema)
+        self.__set_warn_rule = (
+            'INSERT INTO {}.warn_rule VALUES ($1, $2, $3) '
+            'ON CONFLICT (guild_id, threshold) '
+            'DO UPDATE SET action=$3'.format(schema)
+        )
+        self.__delete_warn_rule = (
+            'DELETE FROM {}.warn_rule '
+            'WHERE guild_id=$1 AND threshold=$2'.format(schema)
+        )
+        self.__get_anti_spam_guilds = (
+            'SELECT guild_id FROM {}.anti_spam'.format(schema)
+        )
+        self.__set_anti_spam = (
+            'INSERT INTO {}.anti_spam VALUES ($1) '
+            'ON CONFLICT (guild_id) DO NOTHING'.format(schema)
+        )
+        self.__delete_anti_spam = (
+            'DELETE FROM {}.anti_spam WHERE guild_id=$1'.format(schema)
+        )
 
     async def get_guild(self, guild_id: str) -> tuple:
         """
@@ -161,6 +245,15 @@ class Postgres:
         assert_types(values, _user_types, True)
         await self.pool.execute(self.__set_user, *values)
 
+    async def set_users(self, rows: Sequence[Sequence]):
+        """
+        Set many user rows in one batch.
+        :param rows: the values of each row.
+        """
+        for values in rows:
+            assert_types(values, _user_types, True)
+        await self.pool.executemany(self.__set_user, rows)
+
     async def get_tags(self) -> Dict[str, List[str]]:
         """
         Get all tags stored in the DB.
@@ -186,3 +279,155 @@ class Postgres:
         """
         args = [(site, tag) for tag in tags]
         await self.pool.executemany(self.__set_tags, args)
+
+    async def get_filter_guilds(self) -> List[str]:
+        """
+        Get the ids of all guilds with command filters.
+        :return: a list of guild ids.
+        """
+        rows = await self.pool.fetch(self.__get_filter_guilds)
+        return [_parse_record(r)[0] for r in rows]
+
+    async def get_command_filters(self, guild_id: str) -> List[tuple]:
+        """
+        Get all command filter rows of a guild.
+        :param guild_id: the guild id.
+        :return: a list of command filter rows.
+        """
+        rows = await self.pool.fetch(self.__get_command_filters, guild_id)
+        return [_parse_record(r) for r in rows]
+
+    async def set_command_filter(self, values: Sequence):
+        """
+        Set a command filter row.
+        :param values: the values of that row.
+        """
+        assert_types(values, _command_filter_types, False)
+        await self.pool.execute(self.__set_command_filter, *values)
+
+    async def delete_command_filter(self, values: Sequence):
+        """
+        Delete a command filter row.
+        :param values: the guild id, scope, target id and command of the row.
+        """
+        assert_types(values, _command_filter_types[:4], False)
+        await self.pool.execute(self.__delete_command_filter, *values)
+
+    async def add_reminder(self, values: Sequence) -> int:
+        """
+        Add a reminder row.
+        :param values: the channel id, end time and content of the row.
+        :return: the id of the new row.
+        """
+        assert_types(values, _reminder_types, False)
+        return await self.pool.fetchval(self.__add_reminder, *values)
+
+    async def get_reminders(self, until: datetime) -> List[tuple]:
+        """
+        Get all reminder rows that end before a time.
+        :param until: the time.
+        :return: a list of reminder rows ordered by end time.
+        """
+        rows = await self.pool.fetch(self.__get_reminders, until)
+        return [_parse_record(r) for r in rows]
+
+    async def delete_reminders(self, ids: List[int]):
+        """
+        Delete reminder rows.
+        :param ids: the ids of the rows.
+        """
+        await self.pool.execute(self.__delete_reminders, ids)
+
+    async def add_mod_logs(self, rows: Sequence[Sequence]):
+        """
+        Add many mod log rows in one batch.
+        :param rows: the guild id, action, mod id, target id, reason and
+        time of each row.
+        """
+        for values in rows:
+            assert_types(values, _mod_log_types, False)
+        await self.pool.executemany(self.__add_mod_log, rows)
+
+    async def get_mod_logs(self, guild_id: str, target_id: str = None,
+                           limit: int = 10) -> List[tuple]:
+        """
+        Get the most recent mod log rows of a guild.
+        :param guild_id: the guild id.
+        :param target_id: only get the rows of this target if given.
+        :param limit: the maximum number of rows.
+        :return: a list of (action, mod id, target id, reason, time),
+        newest first.
+        """
+        if target_id is None:
+            rows = await self.pool.fetch(self.__get_mod_logs, guild_id, limit)
+        else:
+            rows = await self.pool.fetch(
+                self.__get_member_mod_logs, guild_id, target_id, limit
+            )
+        return [_parse_record(r) for r in rows]
+
+    async def add_warns(self, rows: Sequence[Sequence]):
+        """
+        Add many warn history rows in one batch.
+        :param rows: the guild id, member id, mod id, reason, is pardon and
+        time of each row.
+        """
+        for values in rows:
+            assert_types(values, _warn_types, False)
+        await self.pool.executemany(self.__add_warn, rows)
+
+    async def get_warns(self, guild_id: str, member_id: str,
+                        limit: int = 10) -> List[tuple]:
+        """
+        Get the most recent warn history rows of a member.
+        :param guild_id: the guild id.
+        :param member_id: the member id.
+        :param limit: the maximum number of rows.
+        :return: a list of (mod id, reason, is pardon, time), newest first.
+        """
+        rows = await self.pool.fetch(
+            self.__get_warns, guild_id, member_id, limit
+        )
+        return [_parse_record(r) for r in rows]
+
+    async def get_warn_rules(self) -> List[tuple]:
+        """
+        Get all warn rule rows.
+        :return: a list of warn rule rows.
+        """
+        rows = await self.pool.fetch(self.__get_warn_rules)
+        return [_parse_record(r) for r in rows]
+
+    async def set_warn_rule(self, values: Sequence):
+        """
+        Set a warn rule row.
+        :param values: the guild id, warn count and action of the row.
+        """
+        assert_types(values, _warn_rule_types, False)
+        await self.pool.execute(self.__set_warn_rule, *values)
+
+    async def delete_warn_rule(self, values: Sequence):
+        """
+        Delete a warn rule row.
+        :param values: the guild id and warn count of the row.
+        """
+        assert_types(values, _warn_rule_types[:2], False)
+        await self.pool.execute(self.__delete_warn_rule, *values)
+
+    async def get_anti_spam_guilds(self) -> List[str]:
+        """
+        Get the ids of all guilds with anti spam on.
+        :return: a list of guild ids.
+        """
+        rows = await self.pool.fetch(self.__get_anti_spam_guilds)
+        return [r['guild_id'] for r in rows]
+
+    async def set_anti_spam(self, guild_id: str, enabled: bool):
+        """
+        Turn anti spam on or off for a guild.
+        :param guild_id: the guild id.
+        :param enabled: True to turn it on.
+        """
+        assert isinstance(guild_id, str)
+        query = self.__set_anti_spam if enabled else self.__delete_anti_spam
+        await self.pool.execute(query, guild_id)
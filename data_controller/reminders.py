@@ -0,0 +1,146 @@
+from asyncio import Event, TimeoutError, ensure_future, gather, wait_for
+from datetime import datetime, timedelta
+from heapq import heappop, heappush
+
+from data_controller.postgres import Postgres
+
+__all__ = ['ReminderScheduler']
+
+
+class ReminderScheduler:
+    """
+    A class that fires reminders stored in the db.
+
+    Only reminders due within ``horizon`` seconds are held in memory, in a
+    heap ordered by their end time, and a single task sleeps until the
+    earliest one is due. Reminders that are due at the same time are fired
+    together.
+    """
+    __slots__ = ['__postgres', '__logger', '__send', '__heap', '__ids',
+                 '__loaded_until', '__wake', '__task', 'horizon', 'fired']
+
+    def __init__(self, postgres: Postgres, logger, horizon: int = 3600):
+        """
+        Initialize an instance of this class.
+        :param postgres: the postgres controller.
+        :param logger: the logger.
+        :param horizon: how many seconds ahead reminders are loaded.
+        """
+        self.__postgres = postgres
+        self.__logger = logger
+        self.__send = None
+        self.__heap = []
+        self.__ids = set()
+        self.__loaded_until = None
+        self.__wake = Event()
+        self.__task = None
+        self.horizon = horizon
+        self.fired = 0
+
+    def start(self, send):
+        """
+        Start firing reminders.
+        :param send: a coroutine function that takes a channel id and the
+        reminder content.
+        """
+        if self.__task is None:
+            self.__send = send
+            self.__task = ensure_future(self.__run())
+
+    def __len__(self):
+        return len(self.__heap)
+
+    def __push(self, id_: int, channel_id: str, end_time: datetime,
+               content: str):
+        """
+        Add a reminder to the in memory heap.
+        :param id_: the reminder id.
+        :param channel_id: the channel id.
+        :param end_time: the time the reminder is due.
+        :param content: the reminder content.
+        """
+        if id_ not in self.__ids:
+            self.__ids.add(id_)
+            heappush(self.__heap, (end_time, id_, channel_id, content))
+
+    async def add(self, channel_id: int, end_time: datetime, content: str):
+        """
+        Add a reminder.
+        :param channel_id: the channel id.
+        :param end_time: the UTC time the reminder is due.
+        :param content: the reminder content.
+        """
+        id_ = await self.__postgres.add_reminder(
+            (str(channel_id), end_time, content)
+        )
+        if self.__loaded_until and end_time <= self.__loaded_until:
+            self.__push(id_, str(channel_id), end_time, content)
+            self.__wake.set()
+
+    async def __load(self, now: datetime):
+        """
+        Load the reminders due within the horizon from the db.
+        :param now: the current time.
+        """
+        until = now + timedelta(seconds=self.horizon)
+        # Reminders added while loading are pushed by add.
+        previous, self.__loaded_until = self.__loaded_until, until
+        try:
+            rows = await self.__postgres.get_reminders(until)
+        except Exception:
+            self.__loaded_until = previous
+            raise
+        for row in rows:
+            self.__push(*row)
+
+    async def __fire(self, due: list):
+        """
+        Fire reminders and delete them from the db.
+        :param due: the due heap entries.
+        """
+        results = await gather(*[
+            self.__send(int(channel_id), content)
+            for _, _, channel_id, content in due
+        ], return_exceptions=True)
+        for res in results:
+            if isinstance(res, Exception):
+                self.__logger.warning(f'Failed to send reminder: {res}')
+        ids = [id_ for _, id_, _, _ in due]
+        self.fired += len(due)
+        try:
+            await self.__postgres.delete_reminders(ids)
+        finally:
+            # If the delete failed they are loaded and fired again later.
+            self.__ids.difference_update(ids)
+
+    async def __run(self):
+        """
+        Fire reminders as they become due.
+        """
+        half = timedelta(seconds=self.horizon / 2)
+        while True:
+            self.__wake.clear()
+            now = datetime.utcnow()
+            try:
+                loaded_until = self.__loaded_until
+                if not loaded_until or now >= loaded_until - half:
+                    await self.__load(now)
+                due = []
+                while self.__heap and self.__heap[0][0] <= now:
+                    due.append(heappop(self.__heap))
+                if due:
+                    await self.__fire(due)
+                    continue
+            except Exception as e:
+                self.__logger.warning(f'Reminder scheduler error: {e}')
+            if self.__loaded_until:
+                wake_at = self.__loaded_until - half
+            else:
+                wake_at = now + half
+            if self.__heap:
+                wake_at = min(wake_at, self.__heap[0][0])
+            timeout = max((wake_at - now).total_seconds(), 1)
+            try:
+                await wait_for(self.__wake.wait(), timeout)
+            except TimeoutError:
+                pass
@@ -0,0 +1,153 @@
+from asyncio import ensure_future, sleep
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from data_controller.data_manager import DataManager
+from data_controller.postgres import Postgres
+
+__all__ = ['WarnTracker', 'ESCALATIONS']
+
+# Actions a warn count can escalate to.
+ESCALATIONS = ('mute', 'kick', 'ban')
+
+
+class WarnTracker:
+    """
+    A class that counts warns, keeps their history and decides when a warn
+    escalates to a harsher action.
+
+    Warn counts are the in memory member rows of the DataManager, and the
+    escalation rules of every guild are held in memory as a dict of
+    {warn count: action}, so finding the escalation of a warn is a dict
+    lookup. History rows are written in batches ``window`` seconds after
+    the first unwritten warn.
+    """
+    __slots__ = ['__postgres', '__data_manager', '__logger', '__rules',
+                 '__rows', '__writer', 'window']
+
+    def __init__(self, postgres: Postgres, data_manager: DataManager, logger,
+                 window: float = 2):
+        """
+        Initialize an instance of this class.
+        :param postgres: the postgres controller.
+        :param data_manager: the data manager.
+        :param logger: the logger.
+        :param window: the seconds history rows are held for before they
+        are written.
+        """
+        self.__postgres = postgres
+        self.__data_manager = data_manager
+        self.__logger = logger
+        self.__rules = {}
+        self.__rows = []
+        self.__writer = None
+        self.window = window
+
+    async def init(self):
+        """
+        Load the escalation rules of every guild.
+        """
+        for guild_id, threshold, action in \
+                await self.__postgres.get_warn_rules():
+            self.__rules.setdefault(int(guild_id), {})[threshold] = action
+
+    def get_rules(self, guild_id: int) -> Dict[int, str]:
+        """
+        Get the escalation rules of a guild.
+        :param guild_id: the guild id.
+        :return: a dict of {warn count: action}
+        """
+        return dict(self.__rules.get(guild_id, {}))
+
+    async def set_rule(self, guild_id: int, threshold: int, action: str):
+        """
+        Escalate to an action when a member reaches a warn count.
+        :param guild_id: the guild id.
+        :param threshold: the warn count.
+        :param action: one of ESCALATIONS.
+        """
+        assert action in ESCALATIONS and threshold > 0
+        await self.__postgres.set_warn_rule((str(guild_id), threshold, action))
+        self.__rules.setdefault(guild_id, {})[threshold] = action
+
+    async def remove_rule(self, guild_id: int, threshold: int):
+        """
+        Remove the escalation at a warn count.
+        :param guild_id: the guild id.
+        :param threshold: the warn count.
+        """
+        await self.__postgres.delete_warn_rule((str(guild_id), threshold))
+        rules = self.__rules.get(guild_id)
+        if rules:
+            rules.pop(threshold, None)
+
+    async def add(self, guild_id: int, member_id: int, mod_id: int,
+                  reason: str, is_warn: bool) -> Tuple[int, Optional[str]]:
+        """
+        Warn or pardon a member.
+        :param guild_id: the guild id.
+        :param member_id: the member id.
+        :param mod_id: the id of the mod.
+        :param reason: the reason.
+        :param is_warn: True for a warn, False for a pardon.
+        :return: the new warn count, and the action it escalates to if any.
+        """
+        data_manager = self.__data_manager
+        count = data_manager.get_member_warns(member_id, guild_id) or 0
+        if is_warn:
+            count += 1
+        elif count:
+            count -= 1
+        await data_manager.set_member_warns(member_id, guild_id, count)
+        self.__rows.append((
+            str(guild_id), str(member_id), str(mod_id), reason, not is_warn,
+            datetime.utcnow()
+        ))
+        if self.__writer is None or self.__writer.done():
+            self.__writer = ensure_future(self.__write())
+        action = None
+        if is_warn:
+            action = self.__rules.get(guild_id, {}).get(count)
+        return count, action
+
+    async def flush(self):
+        """
+        Write the queued history rows now.
+        """
+        rows, self.__rows = self.__rows, []
+        if rows:
+            await self.__postgres.add_warns(rows)
+
+    async def __write(self):
+        """
+        Write the queued history rows after the window. Rows added while
+        writing are written in the next round.
+        """
+        while self.__rows:
+            await sleep(self.window)
+            try:
+                await self.flush()
+            except Exception as e:
+                self.__logger.warning(f'Failed to save warn history: {e}')
+
+    async def close(self):
+        """
+        Wait for the queued history rows to be written.
+        """
+        if self.__writer is not None and not self.__writer.done():
+            await self.__writer
+        await self.flush()
+
+    async def history(self, guild_id: int, member_id: int,
+                      limit: int = 10) -> List[tuple]:
+        """
+        Get the most recent warns and pardons of a member.
+        :param guild_id: the guild id.
+        :param member_id: the member id.
+        :param limit: the maximum number of rows.
+        :return: a list of (mod id, reason, is pardon, time), newest first.
+        """
+        await self.flush()
+        return await self.__postgres.get_warns(
+            str(guild_id), str(member_id), limit
+        )
@@ -1,5 +1,13 @@
+from atexit import register
+from gzip import open as gzip_open
+from json import dumps
 from logging import FileHandler, Formatter, INFO, StreamHandler, getLogger
+from logging.handlers import QueueHandler, QueueListener, \
+    RotatingFileHandler, TimedRotatingFileHandler
+from os import remove
 from pathlib import Path
+from queue import Queue
+from shutil import copyfileobj
 from sys import stdout
 
 from colorlog import ColoredFormatter
@@ -9,32 +17,119 @@ CONSOLE_FORMAT = '%(asctime)s %(log_color)s%(levelname)s %(name)s: ' \
 FILE_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
 
 
-def setup_logging(start_time, path: Path):
+class JsonFormatter(Formatter):
     """
-    Set up logging
+    A formatter that writes every record as one line of JSON.
+    """
+
+    def format(self, record):
+        res = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'name': record.name,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            res['exc_info'] = self.formatException(record.exc_info)
+        return dumps(res, ensure_ascii=False)
+
+
+class _QueueHandler(QueueHandler):
+    """
+    A queue handler that keeps the traceback of a record. Before Python 3.8
+    QueueHandler.prepare drops exc_info without adding the traceback to the
+    message, so it's added here before the record is queued.
+    """
+
+    def prepare(self, record):
+        msg = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = Formatter().formatException(record.exc_info)
+        if record.exc_text:
+            msg = f'{msg}\n{record.exc_text}'
+        record.message = msg
+        record.msg = msg
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+
+def setup_logging(start_time, path: Path, console: bool, config: dict):
+    """
+    Set up logging. Records are put on a queue by the logger and written
+    by a background thread, so logging never blocks the event loop.
     :param start_time: the start time of the log
     :param path: the path to the log folder
+    :param console: True to enable console logging
+    :param config: the logging config
     :return: the logger object
     """
+    handlers = [get_file_handler(path, start_time, config)]
+    if console:
+        handlers.append(get_console_handler())
+    queue = Queue(-1)
+    listener = QueueListener(queue, *handlers, respect_handler_level=True)
+    listener.start()
+    register(listener.stop)
     logger = getLogger()
     logger.setLevel(INFO)
-    logger.addHandler(get_file_handler(path, start_time))
+    logger.addHandler(_QueueHandler(queue))
     return logger
 
 
-def get_file_handler(path: Path, start_time):
+def _gzip_rotator(source: str, dest: str):
+    """
+    Compress a rotated log file.
+    :param source: the log file.
+    :param dest: the compressed file.
+    """
+    with open(source, 'rb') as src, gzip_open(dest, 'wb') as dst:
+        copyfileobj(src, dst)
+    remove(source)
+
+
+def get_file_handler(path: Path, start_time, config: dict):
     """
-    Get a file handler for logging
+    Get a file handler for logging. The log file is rotated by size if
+    ``max size`` is set, else by time if ``rotate`` is set, otherwise a new
+    file is written for every start. Size rotation keeps at least one
+    rotated file, as it never rotates without one.
     :param path: the log file path
     :param start_time: the start time
+    :param config: the logging config
     :return: the file handler
     """
-    handler = FileHandler(
-        filename=path.joinpath('{}.log'.format(int(start_time))),
-        encoding='utf-8',
-        mode='w+'
-    )
-    handler.setFormatter(Formatter(FILE_FORMAT))
+    max_size = config.get('max size', 0)
+    when = config.get('rotate', '')
+    backup_count = config.get('backup count', 0)
+    if max_size:
+        handler = RotatingFileHandler(
+            filename=path.joinpath('hifumi.log'),
+            encoding='utf-8',
+            maxBytes=max_size * 1024 * 1024,
+            backupCount=max(backup_count, 1)
+        )
+    elif when:
+        handler = TimedRotatingFileHandler(
+            filename=path.joinpath('hifumi.log'),
+            encoding='utf-8',
+            when=when,
+            backupCount=backup_count
+        )
+    else:
+        handler = FileHandler(
+            filename=path.joinpath('{}.log'.format(int(start_time))),
+            encoding='utf-8',
+            mode='w+'
+        )
+    if config.get('compress') and (max_size or when):
+        handler.namer = lambda name: name + '.gz'
+        handler.rotator = _gzip_rotator
+    if config.get('json'):
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(Formatter(FILE_FORMAT))
     return handler
 
 
@@ -51,6 +51,93 @@ async def _make_tables(pool: Pool):
         daily TIMESTAMP
     )
     ;
+    
+    CREATE TABLE IF NOT EXISTS testing.command_filter
+    (
+        guild_id VARCHAR NOT NULL,
+        scope VARCHAR NOT NULL,
+        target_id VARCHAR NOT NULL,
+        command VARCHAR NOT NULL,
+        whitelist BOOLEAN NOT NULL,
+        CONSTRAINT command_filter_key
+            UNIQUE (guild_id, scope, target_id, command)
+    )
+    ;
+    
+    CREATE TABLE IF NOT EXISTS testing.reminder
+    (
+        id SERIAL NOT NULL
+            CONSTRAINT reminder_pkey
+                PRIMARY KEY,
+        channel_id VARCHAR NOT NULL,
+        end_time TIMESTAMP NOT NULL,
+        content VARCHAR NOT NULL
+    )
+    ;
+    
+    CREATE INDEX IF NOT EXISTS reminder_end_time_idx
+        ON testing.reminder (end_time)
+    ;
+    
+    CREATE TABLE IF NOT EXISTS testing.mod_log
+    (
+        id SERIAL NOT NULL
+            CONSTRAINT mod_log_pkey
+                PRIMARY KEY,
+        guild_id VARCHAR NOT NULL,
+        action VARCHAR NOT NULL,
+        mod_id VARCHAR NOT NULL,
+        target_id VARCHAR NOT NULL,
+        reason VARCHAR NOT NULL,
+        time TIMESTAMP NOT NULL
+    )
+    ;
+    
+    CREATE INDEX IF NOT EXISTS mod_log_guild_time_idx
+        ON testing.mod_log (guild_id, time)
+    ;
+    
+    CREATE INDEX IF NOT EXISTS mod_log_guild_target_time_idx
+        ON testing.mod_log (guild_id, target_id, time)
+    ;
+    
+    CREATE TABLE IF NOT EXISTS testing.warn_history
+    (
+        id SERIAL NOT NULL
+            CONSTRAINT warn_history_pkey
+                PRIMARY KEY,
+        guild_id VARCHAR NOT NULL,
+        member_id VARCHAR NOT NULL,
+        mod_id VARCHAR NOT NULL,
+        reason VARCHAR NOT NULL,
+        pardon BOOLEAN NOT NULL,
+        time TIMESTAMP NOT NULL
+    )
+    ;
+    
+    CREATE INDEX IF NOT EXISTS warn_history_guild_member_time_idx
+        ON testing.warn_history (guild_id, member_id, time)
+    ;
+    
+    CREATE TABLE IF NOT EXISTS testing.warn_rule
+    (
+        guild_id VARCHAR NOT NULL,
+        threshold INTEGER NOT NULL
+            CONSTRAINT positive_threshold
+                CHECK (threshold > 0),
+        action VARCHAR NOT NULL,
+        CONSTRAINT warn_rule_guild_id_threshold_key
+            UNIQUE (guild_id, threshold)
+    )
+    ;
+    
+    CREATE TABLE IF NOT EXISTS testing.anti_spam
+    (
+        guild_id VARCHAR NOT NULL
+            CONSTRAINT anti_spam_pkey
+                PRIMARY KEY
+    )
+    ;
     ''')
     schema_exist = await pool.fetchval(
         """
@@ -0,0 +1,59 @@
+from core.anti_spam import SlidingWindow, SpamDetector
+
+
+def test_sliding_window():
+    """
+    Test that a window is full after size events within its length
+    """
+    window = SlidingWindow(3)
+    assert not window.hit(0, 5)
+    assert not window.hit(1, 5)
+    assert window.hit(2, 5)
+    assert not window.hit(10, 5)
+    assert not window.hit(11, 5)
+    assert window.hit(12, 5)
+    window.clear()
+    assert not window.hit(13, 5)
+
+
+def test_flood():
+    """
+    Test that a member sending too many messages is flagged once
+    """
+    detector = SpamDetector(messages=3, seconds=5, cooldown=10)
+    results = [detector.check(1, 2, 3, str(i), i) for i in range(4)]
+    assert results == [None, None, 'spam_flood', None]
+    assert detector.check(1, 2, 4, 'other member', 3) is None
+    assert detector.flagged == 1
+
+
+def test_duplicates():
+    """
+    Test that repeated content is flagged, even when sent slowly
+    """
+    detector = SpamDetector(duplicates=3, duplicate_seconds=30)
+    assert detector.check(1, 2, 3, 'Buy now', 0) is None
+    assert detector.check(1, 2, 3, 'buy now ', 10) is None
+    assert detector.check(1, 2, 3, 'hello', 15) is None
+    assert detector.check(1, 2, 3, 'buy now', 20) is None
+    assert detector.check(1, 2, 3, 'buy now', 25) is None
+    assert detector.check(1, 2, 3, 'BUY NOW', 30) == 'spam_duplicate'
+
+
+def test_strict():
+    """
+    Test that flooded channels and raids make the limits stricter
+    """
+    detector = SpamDetector(messages=3, seconds=5, channel_messages=4,
+                            joins=2, join_seconds=10)
+    assert detector.check(1, 2, 3, 'a', 0) is None
+    assert detector.check(1, 2, 3, 'b', 4) is None
+    assert detector.check(1, 2, 3, 'c', 8) is None
+    assert detector.check(1, 5, 6, 'a', 20) is None
+    assert detector.check(1, 5, 6, 'b', 24) is None
+    assert detector.check(1, 5, 6, 'c', 28, strict=True) == 'spam_flood'
+
+    assert not detector.member_joined(1, 100)
+    assert detector.member_joined(1, 105)
+    assert detector.raided(1, 150)
+    assert not detector.raided(1, 170)
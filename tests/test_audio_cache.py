@@ -0,0 +1,98 @@
+from asyncio import gather
+from os import chmod, utime
+from pathlib import Path
+
+import pytest
+
+from core.audio_cache import AudioCache
+from tests import MockLogger
+
+pytestmark = pytest.mark.asyncio
+
+# Writes 1000 bytes to the output file, which is the last argument.
+FAKE_FFMPEG = '''#!/bin/sh
+for last; do :; done
+head -c 1000 /dev/zero > "$last"
+'''
+
+
+class MockTrack:
+    def __init__(self, i, duration=100):
+        self.source_id = f'Youtube-{i}'
+        self.url = f'url {i}'
+        self.duration = duration
+        self.is_live = False
+
+
+@pytest.fixture
+def cache_dir(tmpdir, monkeypatch):
+    bin_dir = tmpdir.mkdir('bin')
+    ffmpeg = bin_dir.join('ffmpeg')
+    ffmpeg.write(FAKE_FFMPEG)
+    chmod(str(ffmpeg), 0o755)
+    monkeypatch.setenv('PATH', str(bin_dir), prepend=':')
+    return Path(str(tmpdir.mkdir('cache')))
+
+
+async def _play(cache, track):
+    """
+    Play a track and wait for the transcode it started, if any.
+    """
+    res = cache.get(track)
+    await gather(*list(cache._jobs.values()))
+    return res
+
+
+async def test_play_threshold(cache_dir):
+    """
+    Test a track is only cached once it's been played enough.
+    """
+    cache = AudioCache(MockLogger(), cache_dir, min_plays=2)
+    assert await _play(cache, MockTrack(1)) is None
+    assert len(cache) == 0
+    assert await _play(cache, MockTrack(1)) is None
+    assert len(cache) == 1
+    assert cache.size == 1000
+    path = await _play(cache, MockTrack(1))
+    assert path == str(cache_dir.joinpath('Youtube-1.opus'))
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert await _play(cache, MockTrack(2, duration=10000)) is None
+    assert await _play(cache, MockTrack(2, duration=10000)) is None
+    assert len(cache) == 1
+
+
+async def test_lru_eviction(cache_dir):
+    """
+    Test the least recently played file is deleted when the cache is full.
+    """
+    cache = AudioCache(MockLogger(), cache_dir, max_bytes=2500, min_plays=1)
+    await _play(cache, MockTrack(1))
+    await _play(cache, MockTrack(2))
+    assert await _play(cache, MockTrack(1)) is not None
+    await _play(cache, MockTrack(3))
+    assert sorted(p.name for p in cache_dir.iterdir()) == [
+        'Youtube-1.opus', 'Youtube-3.opus'
+    ]
+    assert cache.size == 2000
+    assert await _play(cache, MockTrack(2)) is None
+
+
+async def test_scan(cache_dir):
+    """
+    Test the index is rebuilt from the files on disk, least recently
+    played first, and only unfinished transcodes are deleted.
+    """
+    for i, mtime in ((1, 300), (2, 100), (3, 200)):
+        path = cache_dir.joinpath(f'Youtube-{i}.opus')
+        path.write_bytes(b'0' * i)
+        utime(str(path), (mtime, mtime))
+    cache_dir.joinpath('Youtube-4.part').write_bytes(b'0')
+    cache_dir.joinpath('notes.txt').write_text('keep me')
+
+    cache = AudioCache(MockLogger(), cache_dir)
+    assert list(cache._files) == [
+        'Youtube-2.opus', 'Youtube-3.opus', 'Youtube-1.opus'
+    ]
+    assert cache.size == 6
+    assert not cache_dir.joinpath('Youtube-4.part').exists()
+    assert cache_dir.joinpath('notes.txt').read_text() == 'keep me'
@@ -0,0 +1,84 @@
+import pytest
+
+from data_controller.command_filter import ALL_COMMANDS, CommandFilter
+
+pytestmark = pytest.mark.asyncio
+
+
+class MockPostgres:
+    def __init__(self, rows=()):
+        self.rows = {r[:4]: r[4] for r in rows}
+        self.loads = []
+
+    async def get_filter_guilds(self):
+        return list({k[0] for k in self.rows})
+
+    async def get_command_filters(self, guild_id):
+        self.loads.append(guild_id)
+        return [k + (v,) for k, v in self.rows.items() if k[0] == guild_id]
+
+    async def set_command_filter(self, values):
+        self.rows[tuple(values[:4])] = values[4]
+
+    async def delete_command_filter(self, values):
+        self.rows.pop(tuple(values), None)
+
+
+async def _filter(rows=()):
+    res = CommandFilter(MockPostgres(rows))
+    await res.init()
+    return res
+
+
+async def test_precedence():
+    """
+    Test user entries win over channel entries, which win over guild
+    entries, and a command wins over the wildcard in the same scope.
+    """
+    command_filter = await _filter([
+        ('1', 'guild', '1', ALL_COMMANDS, False),
+        ('1', 'channel', '2', 'ban', True),
+        ('1', 'channel', '2', ALL_COMMANDS, False),
+        ('1', 'user', '3', ALL_COMMANDS, True),
+        ('1', 'user', '4', 'ban', False)
+    ])
+    assert await command_filter.is_blocked(1, 5, 6, 'kick')
+    assert not await command_filter.is_blocked(1, 2, 6, 'ban')
+    assert await command_filter.is_blocked(1, 2, 6, 'kick')
+    assert not await command_filter.is_blocked(1, 2, 3, 'kick')
+    assert await command_filter.is_blocked(1, 2, 4, 'ban')
+    assert await command_filter.is_blocked(1, 2, 4, 'kick')
+    assert not await command_filter.is_blocked(7, 2, 4, 'ban')
+    assert not await command_filter.is_blocked(None, 2, 4, 'ban')
+
+
+async def test_lazy_load():
+    """
+    Test guilds without filters never hit the db, and a guild's filters
+    are loaded once.
+    """
+    command_filter = await _filter([('1', 'guild', '1', 'ban', False)])
+    postgres = command_filter._CommandFilter__postgres
+    assert not await command_filter.is_blocked(2, 3, 4, 'ban')
+    assert await command_filter.is_blocked(1, 3, 4, 'ban')
+    assert await command_filter.is_blocked(1, 5, 6, 'ban')
+    assert postgres.loads == ['1']
+
+
+async def test_set_remove():
+    """
+    Test set_filter and remove_filter update the memory and the db.
+    """
+    command_filter = await _filter()
+    postgres = command_filter._CommandFilter__postgres
+    await command_filter.set_filter(1, 'channel', 2, 'ban', False)
+    assert await command_filter.is_blocked(1, 2, 3, 'ban')
+    assert postgres.rows == {('1', 'channel', '2', 'ban'): False}
+
+    await command_filter.set_filter(1, 'user', 3, 'ban', True)
+    assert not await command_filter.is_blocked(1, 2, 3, 'ban')
+
+    await command_filter.remove_filter(1, 'user', 3, 'ban')
+    await command_filter.remove_filter(1, 'channel', 2, 'ban')
+    assert not await command_filter.is_blocked(1, 2, 3, 'ban')
+    assert postgres.rows == {}
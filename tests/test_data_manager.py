@@ -241,3 +241,60 @@ async def test_daily(manager):
             (day0, day1)
     ):
         assert test
+
+
+async def test_add_balances(manager):
+    """
+    Test adding to many balances at once
+    """
+    user_ids = __unique_ints()
+    await manager.set_user_balance(user_ids[0], 100)
+    res = await manager.add_user_balances({user_ids[0]: 50, user_ids[1]: 20})
+    assert res == {user_ids[0]: 150, user_ids[1]: 20}
+    assert manager.get_user_balance(user_ids[0]) == 150
+    assert manager.get_user_balance(user_ids[1]) == 20
+    try:
+        await manager.add_user_balances({user_ids[0]: -200, user_ids[1]: 1})
+    except AssertionError:
+        pass
+    else:
+        assert False
+    finally:
+        assert manager.get_user_balance(user_ids[0]) == 150
+        assert manager.get_user_balance(user_ids[1]) == 20
+
+
+async def test_add_balances_failed_write(manager, monkeypatch):
+    """
+    Test the deltas are taken back off the balances if the db write fails
+    """
+    user_ids = __unique_ints()
+    await manager.set_user_balance(user_ids[0], 100)
+
+    async def set_users(self, rows):
+        raise OSError
+
+    monkeypatch.setattr(Postgres, 'set_users', set_users)
+    with pytest.raises(OSError):
+        await manager.add_user_balances({user_ids[0]: 50, user_ids[1]: 20})
+    assert manager.get_user_balance(user_ids[0]) == 100
+    assert not manager.get_user_balance(user_ids[1])
+
+
+async def test_add_balances_concurrent_set(manager, monkeypatch):
+    """
+    Test a balance set while the db write is awaited isn't overwritten
+    """
+    user_ids = __unique_ints()
+    await manager.set_user_balance(user_ids[0], 100)
+    set_users = Postgres.set_users
+
+    async def slow_set_users(self, rows):
+        await set_users(self, rows)
+        await manager.set_user_balance(user_ids[0], 30)
+
+    monkeypatch.setattr(Postgres, 'set_users', slow_set_users)
+    res = await manager.add_user_balances({user_ids[0]: 50, user_ids[1]: 20})
+    assert res == {user_ids[0]: 150, user_ids[1]: 20}
+    assert manager.get_user_balance(user_ids[0]) == 30
+    assert manager.get_user_balance(user_ids[1]) == 20
@@ -0,0 +1,88 @@
+import pytest
+
+from bot.error_reporter import ErrorReporter
+
+pytestmark = pytest.mark.asyncio
+
+
+class MockChannel:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, *, file=None):
+        self.sent.append((content, file))
+
+
+class MockBot:
+    def __init__(self):
+        self.config = {'Bot': {'error log': 1}}
+        self.channel = MockChannel()
+
+    def get_channel(self, id_):
+        return self.channel
+
+
+def _stop(reporter):
+    """
+    Cancel the background delivery started by report.
+    """
+    if reporter._task is not None:
+        reporter._task.cancel()
+
+
+async def test_dedupe():
+    """
+    Test identical tracebacks are sent once with a count.
+    """
+    bot = MockBot()
+    reporter = ErrorReporter(bot, interval=0)
+    for _ in range(5):
+        reporter.report('header', 'tb')
+    reporter.report('other', 'other tb')
+    await reporter.flush()
+    assert len(bot.channel.sent) == 1
+    content, file = bot.channel.sent[0]
+    assert content.startswith('header (x5)\n')
+    assert '\nother\n' in content
+    assert file is None
+    assert reporter.sent == 2
+    _stop(reporter)
+
+
+async def test_file_fallback():
+    """
+    Test too many reports are sent as a single file.
+    """
+    bot = MockBot()
+    reporter = ErrorReporter(bot, interval=0, max_pages=2)
+    for i in range(10):
+        reporter.report('header', str(i) * 1500)
+    await reporter.flush()
+    assert len(bot.channel.sent) == 1
+    content, file = bot.channel.sent[0]
+    assert content == '**10** errors'
+    assert file is not None
+    _stop(reporter)
+
+
+async def test_max_pending():
+    """
+    Test reports past the limit are dropped.
+    """
+    reporter = ErrorReporter(MockBot(), interval=0, max_pending=3)
+    for i in range(5):
+        reporter.report('header', f'tb {i}')
+    assert reporter.dropped == 2
+    _stop(reporter)
+
+
+async def test_long_header():
+    """
+    Test a header longer than a message is split over pages.
+    """
+    reporter = ErrorReporter(MockBot(), interval=0)
+    reporter.report('h' * 4500, 'tb')
+    pages = reporter.pages(list(reporter._pending.values()))
+    assert all(len(p) <= 2000 for p in pages)
+    assert ''.join(pages).count('h') == 4500
+    _stop(reporter)
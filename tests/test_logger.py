@@ -0,0 +1,97 @@
+from gzip import open as gzip_open
+from json import loads
+from logging import FileHandler, INFO, LogRecord, getLogger
+from logging.handlers import QueueHandler, RotatingFileHandler, \
+    TimedRotatingFileHandler
+from pathlib import Path
+from sys import exc_info
+
+from scripts.logger import JsonFormatter, get_file_handler, setup_logging
+
+
+def _record(msg='hello', exc_info=None):
+    return LogRecord('hifumi', INFO, __file__, 1, msg, (), exc_info)
+
+
+def test_file_handler_kinds(tmpdir):
+    """
+    Test the kind of file handler picked from the config
+    """
+    path = Path(str(tmpdir))
+    handler = get_file_handler(path, 1, {'max size': 1, 'backup count': 0})
+    assert isinstance(handler, RotatingFileHandler)
+    assert handler.maxBytes == 1024 * 1024
+    assert handler.backupCount == 1
+    handler.close()
+
+    handler = get_file_handler(path, 1, {'rotate': 'H', 'backup count': 0})
+    assert isinstance(handler, TimedRotatingFileHandler)
+    assert handler.backupCount == 0
+    handler.close()
+
+    handler = get_file_handler(path, 1, {})
+    assert type(handler) is FileHandler
+    assert handler.baseFilename == str(path.joinpath('1.log'))
+    handler.close()
+
+
+def test_compressed_rotation(tmpdir):
+    """
+    Test rotated files are gzipped
+    """
+    path = Path(str(tmpdir))
+    handler = get_file_handler(
+        path, 1, {'max size': 1, 'backup count': 2, 'compress': True}
+    )
+    handler.emit(_record('first'))
+    handler.doRollover()
+    handler.close()
+    rotated = path.joinpath('hifumi.log.1.gz')
+    assert rotated.exists()
+    with gzip_open(str(rotated), 'rt', encoding='utf-8') as f:
+        assert 'first' in f.read()
+
+
+def test_json_formatter():
+    """
+    Test records are formatted as one line of JSON
+    """
+    line = JsonFormatter().format(_record('a "quoted"\nmessage'))
+    assert '\n' not in line
+    res = loads(line)
+    assert res['message'] == 'a "quoted"\nmessage'
+    assert res['level'] == 'INFO'
+    assert res['name'] == 'hifumi'
+    assert 'exc_info' not in res
+
+    try:
+        raise ValueError('bad')
+    except ValueError:
+        res = loads(JsonFormatter().format(_record(exc_info=exc_info())))
+    assert 'ValueError: bad' in res['exc_info']
+
+
+def test_setup_logging(tmpdir):
+    """
+    Test records logged through the queue reach the file, with the
+    traceback of exceptions
+    """
+    path = Path(str(tmpdir))
+    logger = setup_logging(2, path, False, {'json': True})
+    handler = next(h for h in logger.handlers if isinstance(h, QueueHandler))
+    queue = handler.queue
+    try:
+        logger.info('queued')
+        try:
+            raise ValueError('bad')
+        except ValueError:
+            logger.exception('failed')
+        queue.join()
+    finally:
+        logger.removeHandler(handler)
+    lines = path.joinpath('2.log').read_text(encoding='utf-8').splitlines()
+    messages = [loads(line)['message'] for line in lines]
+    assert messages[0] == 'queued'
+    assert messages[1].startswith('failed')
+    assert 'ValueError: bad' in messages[1]
+    assert getLogger() is logger
@@ -0,0 +1,93 @@
+from asyncio import sleep
+
+import pytest
+from discord.abc import Messageable
+
+from bot.message_router import MessageKind, MessageRouter
+
+pytestmark = pytest.mark.asyncio
+
+
+class MockChannel(Messageable):
+    async def _get_channel(self):
+        return self
+
+
+class MockAuthor:
+    def __init__(self, bot=False):
+        self.bot = bot
+
+
+class MockMessage:
+    def __init__(self, content, bot=False, channel=None):
+        self.content = content
+        self.author = MockAuthor(bot)
+        self.channel = MockChannel() if channel is None else channel
+
+
+class MockContext:
+    prefix = '!'
+
+
+class MockBot:
+    user = 'hifumi'
+    mention_normal = '<@1>'
+    mention_nick = '<@!1>'
+
+    def __init__(self):
+        self.errors = []
+
+    def message_context(self, message):
+        return MockContext()
+
+    async def on_error(self, event, message):
+        self.errors.append((event, message.content))
+
+
+def test_classify():
+    """
+    Test every kind of message is told apart.
+    """
+    router = MessageRouter(MockBot())
+    assert router.classify(MockMessage('!help', bot=True)) == MessageKind.BOT
+    assert router.classify(MockMessage('')) == MessageKind.IGNORED
+    assert router.classify(
+        MockMessage('hi', channel=object())
+    ) == MessageKind.IGNORED
+    assert router.classify(MockMessage('!help')) == MessageKind.COMMAND
+    assert router.classify(MockMessage('<@1> prefix')) == MessageKind.MENTION
+    assert router.classify(MockMessage('<@!1> prefix')) == MessageKind.MENTION
+    assert router.classify(MockMessage('hi <@1>')) == MessageKind.PLAIN
+
+
+async def test_route():
+    """
+    Test messages only reach the handlers of their kind, errors go to the
+    bot, and unsubscribed handlers stop receiving messages.
+    """
+    bot = MockBot()
+    router = MessageRouter(bot)
+    received = []
+
+    async def handler(message):
+        received.append(message.content)
+
+    async def failing(message):
+        raise ValueError
+
+    router.subscribe(MessageKind.PLAIN | MessageKind.MENTION, handler)
+    router.subscribe(MessageKind.COMMAND, failing)
+    for content in ('hi', '<@1> prefix', '!help', ''):
+        await router.route(MockMessage(content))
+    await router.route(MockMessage('hi', bot=True))
+    await sleep(0)
+    assert received == ['hi', '<@1> prefix']
+    assert bot.errors == [('on_message', '!help')]
+    assert router.stats == {'plain': 1, 'mention': 1, 'command': 1,
+                            'ignored': 1, 'bot': 1, 'dropped': 2}
+
+    router.unsubscribe(handler)
+    await router.route(MockMessage('again'))
+    await sleep(0)
+    assert received == ['hi', '<@1> prefix']
+    assert router.stats['dropped'] == 3
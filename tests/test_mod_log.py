@@ -0,0 +1,125 @@
+from asyncio import sleep
+
+import pytest
+
+from bot.mod_log import ModLog, ModLogEntry
+
+pytestmark = pytest.mark.asyncio
+
+LOCALIZE = {
+    'ban': 'ban', 'kick': 'kick', 'type': 'Type', 'reason': 'Reason',
+    'members': 'Members', 'warnings': 'Total Warnings',
+    'bulk_mod_log': '{} members', 'mod_log_batch': '{} moderation actions'
+}
+
+
+class MockMember:
+    def __init__(self, id_):
+        self.id = str(id_)
+        self.display_name = f'user{id_}'
+        self.discriminator = '0001'
+        self.avatar_url = ''
+        self.default_avatar_url = 'url'
+
+
+class MockGuild:
+    def __init__(self, id_, channel):
+        self.id = str(id_)
+        self.channel = channel
+
+    def get_channel(self, id_):
+        return self.channel if id_ == '10' else None
+
+
+class MockDataManager:
+    def __init__(self, mod_log):
+        self.mod_log = mod_log
+        self.rows = []
+        self.mod_log_lookups = 0
+
+    def get_mod_log(self, guild_id):
+        self.mod_log_lookups += 1
+        return self.mod_log
+
+    async def add_mod_logs(self, rows):
+        self.rows.append(rows)
+
+
+class MockBot:
+    def __init__(self, mod_log=10):
+        self.data_manager = MockDataManager(mod_log)
+        self.sent = []
+
+    async def send_message(self, channel, *, embed):
+        self.sent.append((channel, embed))
+
+
+async def test_batch():
+    """
+    Test entries added within the window are sent as one message, and
+    the history is written in one batch.
+    """
+    bot = MockBot()
+    mod_log = ModLog(bot, window=0.01)
+    guild = MockGuild(1, 'channel')
+    mod = MockMember(2)
+    for i in range(3):
+        mod_log.add(guild, LOCALIZE, ModLogEntry(
+            'ban', mod, [MockMember(3 + i)], 'reason'
+        ))
+    mod_log.add(guild, LOCALIZE, ModLogEntry(
+        'kick', mod, [MockMember(6), MockMember(7)], 'raid'
+    ))
+    await sleep(0.05)
+    assert len(bot.sent) == 1
+    channel, embed = bot.sent[0]
+    assert channel == 'channel'
+    assert embed.title == '4 moderation actions'
+    assert len(embed.fields) == 4
+    assert bot.data_manager.mod_log_lookups == 1
+    assert len(bot.data_manager.rows) == 1
+    assert [r[3] for r in bot.data_manager.rows[0]] == \
+        ['3', '4', '5', '6', '7']
+    assert mod_log.sent == 4
+
+
+async def test_no_channel():
+    """
+    Test the history is still saved without a mod log channel.
+    """
+    bot = MockBot(mod_log=None)
+    mod_log = ModLog(bot, window=0.01)
+    guild = MockGuild(1, 'channel')
+    mod_log.add(guild, LOCALIZE, ModLogEntry(
+        'ban', MockMember(2), [MockMember(3)], 'reason'
+    ))
+    await sleep(0.05)
+    assert bot.sent == []
+    assert len(bot.data_manager.rows) == 1
+
+
+class SlowBot(MockBot):
+    async def send_message(self, channel, *, embed):
+        await sleep(0.05)
+        self.sent.append((channel, embed))
+
+
+async def test_added_while_sending():
+    """
+    Test entries added while a message is being sent are not left behind.
+    """
+    bot = SlowBot()
+    mod_log = ModLog(bot, window=0.01)
+    guild = MockGuild(1, 'channel')
+    mod_log.add(guild, LOCALIZE, ModLogEntry(
+        'ban', MockMember(2), [MockMember(3)], 'reason'
+    ))
+    await sleep(0.03)
+    mod_log.add(guild, LOCALIZE, ModLogEntry(
+        'kick', MockMember(2), [MockMember(4)], 'reason'
+    ))
+    await mod_log.close()
+    assert len(bot.sent) == 2
+    assert mod_log._pending == {}
+    assert [r[3] for rows in bot.data_manager.rows for r in rows] == \
+        ['3', '4']
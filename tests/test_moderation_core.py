@@ -0,0 +1,121 @@
+import pytest
+
+from core.moderation_core import bulk_moderate, parse_members
+
+pytestmark = pytest.mark.asyncio
+
+IDS = [str(10 ** 17 + i) for i in range(5)]
+
+
+class MockMember:
+    def __init__(self, id_):
+        self.id = id_
+        self.name = f'member {id_[-1]}'
+
+
+class MockGuild:
+    def __init__(self, ids=IDS):
+        self.members = {id_: MockMember(id_) for id_ in ids}
+
+    def get_member(self, id_):
+        return self.members.get(id_)
+
+
+class MockLocalize(dict):
+    def __missing__(self, key):
+        return key
+
+
+class MockModLog:
+    def __init__(self):
+        self.entries = []
+
+    def add(self, guild, localize, entry):
+        self.entries.append(entry)
+
+
+class MockMessage:
+    def __init__(self, author):
+        self.author = author
+        self.server = None
+        self.channel = None
+
+
+class MockContext:
+    def __init__(self, author):
+        self.message = MockMessage(author)
+
+
+class MockBot:
+    def __init__(self, failing=()):
+        self.user = MockMember('1')
+        self.failing = failing
+        self.banned = []
+        self.said = []
+        self.mod_log = MockModLog()
+
+    def localize(self, ctx):
+        return MockLocalize(
+            bulk_done='{} {}/{}: {}', bulk_failed='{} failed: {}'
+        )
+
+    async def ban(self, member, delete_message_days):
+        if member.id in self.failing:
+            raise ValueError
+        self.banned.append(member.id)
+
+    async def send_typing(self, channel):
+        pass
+
+    async def say(self, content):
+        self.said.append(content)
+
+
+def test_parse_members():
+    """
+    Test members are parsed from mentions and ids, without duplicates, and
+    everything else is the reason.
+    """
+    guild = MockGuild()
+    members, reason = parse_members(guild, [
+        f'<@{IDS[0]}>', IDS[1], f'<@!{IDS[2]}>', IDS[0], 'spam', 'and',
+        f'<@{IDS[3]}>abc', f'{IDS[4]}1', '123', 'raids'
+    ])
+    assert [m.id for m in members] == IDS[:3]
+    assert reason == f'spam and <@{IDS[3]}>abc {IDS[4]}1 123 raids'
+
+    members, reason = parse_members(guild, [str(10 ** 17 + 9), 'gone'])
+    assert members == []
+    assert reason == f'{10 ** 17 + 9} gone'
+
+
+async def test_bulk_partial_failure():
+    """
+    Test members that fail are reported, and one mod log entry has every
+    member that was banned.
+    """
+    guild = MockGuild()
+    bot = MockBot(failing={IDS[1]})
+    members = [guild.get_member(id_) for id_ in IDS[:3]]
+    await bulk_moderate(bot, MockContext(MockMember('2')), members,
+                        'spam', 'ban')
+    assert sorted(bot.banned) == [IDS[0], IDS[2]]
+    assert len(bot.mod_log.entries) == 1
+    entry = bot.mod_log.entries[0]
+    assert [m.id for m in entry.targets] == [IDS[0], IDS[2]]
+    assert (entry.action, entry.reason) == ('ban', 'spam')
+    assert bot.said == [
+        'banned 2/3: `member 0`, `member 2`\nban failed: `member 1`'
+    ]
+
+
+async def test_bulk_all_failed():
+    """
+    Test nothing is logged when every member fails.
+    """
+    guild = MockGuild()
+    bot = MockBot(failing=set(IDS))
+    await bulk_moderate(bot, MockContext(MockMember('2')),
+                        [guild.get_member(IDS[0])], 'spam', 'ban')
+    assert bot.mod_log.entries == []
+    assert bot.said == ['banned 0/1: \nban failed: `member 0`']
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from random import randint
 from string import printable
 
@@ -138,3 +138,118 @@ async def test_tags(postgres):
         await postgres.set_tags(site, tags)
 
     assert await postgres.get_tags() == expected
+
+
+async def test_reminders(postgres):
+    """
+    Test add_reminder, get_reminders, delete_reminders
+    """
+    now = datetime.utcnow()
+    soon = now + timedelta(minutes=5)
+    later = now + timedelta(days=30)
+    later_id = await postgres.add_reminder(('1', later, 'later'))
+    soon_id = await postgres.add_reminder(('1', soon, 'soon'))
+
+    assert await postgres.get_reminders(now) == []
+    assert await postgres.get_reminders(soon) == [(soon_id, '1', soon, 'soon')]
+    assert await postgres.get_reminders(later) == [
+        (soon_id, '1', soon, 'soon'), (later_id, '1', later, 'later')
+    ]
+
+    await postgres.delete_reminders([soon_id])
+    assert await postgres.get_reminders(later) == [
+        (later_id, '1', later, 'later')
+    ]
+
+
+async def test_mod_logs(postgres):
+    """
+    Test add_mod_logs, get_mod_logs
+    """
+    now = datetime.utcnow()
+    rows = [
+        ('1', 'ban', '2', str(i % 2), f'reason {i}', now + timedelta(i))
+        for i in range(5)
+    ]
+    await postgres.add_mod_logs(rows)
+    await postgres.add_mod_logs([('3', 'kick', '2', '0', 'other', now)])
+
+    assert await postgres.get_mod_logs('1', limit=2) == [
+        rows[4][1:], rows[3][1:]
+    ]
+    assert await postgres.get_mod_logs('1', '1') == [
+        rows[3][1:], rows[1][1:]
+    ]
+    assert await postgres.get_mod_logs('2') == []
+
+
+async def test_warns(postgres):
+    """
+    Test add_warns, get_warns
+    """
+    now = datetime.utcnow()
+    rows = [
+        ('1', str(i % 2), '2', f'reason {i}', i == 4, now + timedelta(i))
+        for i in range(5)
+    ]
+    await postgres.add_warns(rows)
+
+    assert await postgres.get_warns('1', '0', 2) == [rows[4][2:], rows[2][2:]]
+    assert await postgres.get_warns('1', '1') == [rows[3][2:], rows[1][2:]]
+    assert await postgres.get_warns('2', '0') == []
+
+
+async def test_warn_rules(postgres):
+    """
+    Test get_warn_rules, set_warn_rule, delete_warn_rule
+    """
+    await postgres.set_warn_rule(('1', 3, 'mute'))
+    await postgres.set_warn_rule(('1', 5, 'kick'))
+    await postgres.set_warn_rule(('1', 5, 'ban'))
+    await postgres.set_warn_rule(('2', 3, 'kick'))
+    assert sorted(await postgres.get_warn_rules()) == [
+        ('1', 3, 'mute'), ('1', 5, 'ban'), ('2', 3, 'kick')
+    ]
+
+    await postgres.delete_warn_rule(('1', 3))
+    assert sorted(await postgres.get_warn_rules()) == [
+        ('1', 5, 'ban'), ('2', 3, 'kick')
+    ]
+
+
+async def test_anti_spam(postgres):
+    """
+    Test get_anti_spam_guilds, set_anti_spam
+    """
+    await postgres.set_anti_spam('1', True)
+    await postgres.set_anti_spam('1', True)
+    await postgres.set_anti_spam('2', True)
+    assert sorted(await postgres.get_anti_spam_guilds()) == ['1', '2']
+
+    await postgres.set_anti_spam('1', False)
+    assert await postgres.get_anti_spam_guilds() == ['2']
+
+
+async def test_command_filters(postgres):
+    """
+    Test get_filter_guilds, get_command_filters, set_command_filter,
+    delete_command_filter
+    """
+    rows = [
+        ('1', 'user', '2', 'ban', False),
+        ('1', 'guild', '1', '*', False),
+        ('3', 'channel', '4', 'ban', True)
+    ]
+    for row in rows:
+        await postgres.set_command_filter(row)
+    await postgres.set_command_filter(('1', 'user', '2', 'ban', True))
+
+    assert sorted(await postgres.get_filter_guilds()) == ['1', '3']
+    assert sorted(await postgres.get_command_filters('1')) == [
+        ('1', 'guild', '1', '*', False), ('1', 'user', '2', 'ban', True)
+    ]
+
+    await postgres.delete_command_filter(('1', 'guild', '1', '*'))
+    await postgres.delete_command_filter(('3', 'channel', '4', 'ban'))
+    assert await postgres.get_filter_guilds() == ['1']
+    assert await postgres.get_command_filters('3') == []
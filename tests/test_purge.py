@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+from re import compile
+
+import pytest
+
+from core.purge import Purge, PurgeFilter, parse_purge_args
+
+pytestmark = pytest.mark.asyncio
+
+
+class MockAuthor:
+    def __init__(self, id_, bot=False):
+        self.id = id_
+        self.bot = bot
+
+
+class MockMessage:
+    def __init__(self, id_, author, content, days):
+        self.id = id_
+        self.author = author
+        self.content = content
+        self.attachments = []
+        self.embeds = []
+        self.timestamp = datetime.utcnow() - timedelta(days=days)
+
+
+class MockBot:
+    def __init__(self, history):
+        self.history = history
+        self.bulk = []
+        self.single = []
+
+    async def logs_from(self, channel, limit):
+        for message in self.history[:limit]:
+            yield message
+
+    async def delete_messages(self, messages):
+        assert 2 <= len(messages) <= 100
+        self.bulk.append(len(messages))
+
+    async def delete_message(self, message):
+        self.single.append(message.id)
+
+
+def _history(count, old_after):
+    user = MockAuthor('1')
+    return [
+        MockMessage(str(i), user, f'message {i}', 20 if i >= old_after else 0)
+        for i in range(count)
+    ]
+
+
+async def test_chunks():
+    """
+    Test new messages are deleted in chunks and old ones one at a time.
+    """
+    bot = MockBot(_history(260, 250))
+    purge = Purge(bot, None, 255, PurgeFilter(), skip={'0'}, delay=0)
+    await purge.run()
+    assert bot.bulk == [100, 100, 49]
+    assert bot.single == ['250', '251', '252', '253', '254', '255']
+    assert purge.deleted == 255
+
+
+async def test_filter():
+    """
+    Test only matching messages are deleted.
+    """
+    history = _history(300, 300)
+    spammer = MockAuthor('2', bot=True)
+    for message in history[::3]:
+        message.author = spammer
+    bot = MockBot(history)
+    check = PurgeFilter(authors={'2'}, pattern=compile(r'[05]$'))
+    purge = Purge(bot, None, 1000, check, delay=0)
+    await purge.run()
+    assert purge.scanned == 300
+    assert purge.deleted == len(
+        [m for m in history[::3] if m.content[-1] in '05']
+    )
+    assert purge.deleted == sum(bot.bulk)
+
+
+async def test_cancel():
+    """
+    Test a cancelled purge stops before its next delete.
+    """
+    async def cancel_scan(p):
+        p.cancelled = p.scanned >= 150
+
+    async def cancel_single(p):
+        p.cancelled = p.deleted >= 2
+
+    bot = MockBot(_history(260, 260))
+    purge = Purge(bot, None, 255, PurgeFilter(), delay=0)
+    await purge.run(cancel_scan, interval=0)
+    assert bot.bulk == [100]
+    assert purge.deleted == 100
+
+    bot = MockBot(_history(10, 0))
+    purge = Purge(bot, None, 10, PurgeFilter(), delay=0)
+    await purge.run(cancel_single, interval=0)
+    assert bot.single == ['0', '1']
+    assert purge.deleted == 2
+
+
+def test_bad_within():
+    """
+    Test an invalid within: filter reports the argument.
+    """
+    class MockCommand:
+        mentions = []
+
+    with pytest.raises(ValueError) as e:
+        parse_purge_args(MockCommand(), ['bots', 'within:1h'])
+    assert str(e.value) == 'within:1h'
@@ -0,0 +1,111 @@
+from asyncio import sleep
+from datetime import datetime, timedelta
+
+import pytest
+
+from data_controller.postgres import Postgres
+from data_controller.reminders import ReminderScheduler
+from tests import *
+
+pytestmark = pytest.mark.asyncio
+
+
+class CountingPostgres(Postgres):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.deletes = []
+
+    async def delete_reminders(self, ids):
+        self.deletes.append(sorted(ids))
+        await super().delete_reminders(ids)
+
+
+class WarningLogger(MockLogger):
+    def warning(self, *args, **kwargs):
+        print(args, kwargs)
+
+
+@pytest.fixture(scope='function')
+async def postgres():
+    pool = await _get_pool()
+    pos = CountingPostgres(pool, SCHEMA, MockLogger())
+    yield pos
+    async with pool.acquire() as conn:
+        await _clear_db(conn)
+    await pool.close()
+
+
+@pytest.fixture(scope='function')
+async def scheduler(postgres):
+    res = ReminderScheduler(postgres, WarningLogger(), horizon=3600)
+    yield res
+    task = res._ReminderScheduler__task
+    if task:
+        task.cancel()
+
+
+async def _start(scheduler: ReminderScheduler) -> list:
+    """
+    Start a scheduler and let it load the db.
+    :return: the list of (channel id, content) it sends.
+    """
+    sent = []
+
+    async def send(channel_id, content):
+        sent.append((channel_id, content))
+
+    scheduler.start(send)
+    await sleep(0.2)
+    return sent
+
+
+async def test_horizon(postgres, scheduler):
+    """
+    Test only reminders due within the horizon are loaded.
+    """
+    now = datetime.utcnow()
+    await postgres.add_reminder(('1', now + timedelta(minutes=30), 'soon'))
+    later_id = await postgres.add_reminder(
+        ('1', now + timedelta(days=2), 'later')
+    )
+    sent = await _start(scheduler)
+    assert sent == []
+    assert len(scheduler) == 1
+    rows = await postgres.get_reminders(now + timedelta(days=3))
+    assert [row[0] for row in rows][-1] == later_id
+
+
+async def test_batch(postgres, scheduler):
+    """
+    Test reminders that are due together are fired in one batch and
+    deleted with one query.
+    """
+    past = datetime.utcnow() - timedelta(minutes=1)
+    ids = [
+        await postgres.add_reminder((str(i), past, f'reminder {i}'))
+        for i in range(3)
+    ]
+    sent = await _start(scheduler)
+    assert sorted(sent) == [(i, f'reminder {i}') for i in range(3)]
+    assert postgres.deletes == [sorted(ids)]
+    assert scheduler.fired == 3
+    assert len(scheduler) == 0
+    assert await postgres.get_reminders(datetime.utcnow()) == []
+
+
+async def test_add_before_wake(postgres, scheduler):
+    """
+    Test a reminder added after loading that is due before the current
+    wake up wakes the scheduler, and one past the horizon is only stored.
+    """
+    now = datetime.utcnow()
+    await postgres.add_reminder(('1', now + timedelta(minutes=30), 'later'))
+    sent = await _start(scheduler)
+    await scheduler.add(2, datetime.utcnow() + timedelta(seconds=0.2), 'now')
+    await scheduler.add(3, now + timedelta(days=2), 'next week')
+    assert len(scheduler) == 2
+    await sleep(1.5)
+    assert sent == [(2, 'now')]
+    assert len(scheduler) == 1
+    rows = await postgres.get_reminders(now + timedelta(days=3))
+    assert [row[3] for row in rows] == ['later', 'next week']
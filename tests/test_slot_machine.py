@@ -0,0 +1,68 @@
+from collections import Counter
+from random import Random
+
+from core.slot_machine import SlotMachine, payout
+
+EMOJIS = [str(i) for i in range(100)]
+
+
+def test_payout():
+    """
+    Test payout for wins, draws and losses.
+    """
+    assert payout(('a', 'a', 'a'), 10) == 30
+    assert payout(('a', 'b', 'a'), 10) == 10
+    assert payout(('a', 'b', 'c'), 10) == 0
+
+
+def test_seeded():
+    """
+    Test spins with the same seed are the same.
+    """
+    a = SlotMachine(EMOJIS, seed=42)
+    b = SlotMachine(EMOJIS, seed=42)
+    assert [a.spin() for _ in range(100)] == [b.spin() for _ in range(100)]
+
+
+def test_spin():
+    """
+    Test the frames of a spin.
+    """
+    machine = SlotMachine(EMOJIS, seed=0)
+    for _ in range(1000):
+        reels = machine.spin_indices()
+        for reel in reels:
+            assert 3 <= len(reel) <= 6
+            assert len(set(reel)) == len(reel)
+        frames = machine.spin(3)
+        assert 2 <= len(frames) <= 4
+        assert all(e in EMOJIS for frame in frames for e in frame)
+
+
+def test_distribution():
+    """
+    Test every reel result is equally likely.
+    """
+    machine = SlotMachine(EMOJIS[:20], seed=1)
+    counts = Counter(
+        machine.spin_indices()[0][-1] for _ in range(20000)
+    )
+    assert len(counts) == 20
+    assert max(counts.values()) / min(counts.values()) < 1.2
+
+
+def test_single_draw():
+    """
+    Test a spin is drawn with a single call into the random generator.
+    """
+    class CountingRandom(Random):
+        calls = 0
+
+        def getrandbits(self, k):
+            self.calls += 1
+            return super().getrandbits(k)
+
+    machine = SlotMachine(EMOJIS)
+    machine.random = CountingRandom(0)
+    machine.spin()
+    assert machine.random.calls == 1
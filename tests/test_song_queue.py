@@ -0,0 +1,58 @@
+from core.music_core import SongQueue
+
+
+class MockEntry:
+    def __init__(self, duration):
+        self.duration = duration
+
+
+def _queue(*durations):
+    queue = SongQueue()
+    for duration in durations:
+        queue.append(MockEntry(duration))
+    return queue
+
+
+def test_popleft():
+    """
+    Test the total follows entries leaving the queue, past compaction.
+    """
+    queue = _queue(*range(1, 11))
+    for i in range(1, 8):
+        assert queue.popleft().duration == i
+        assert queue.total == sum(range(i + 1, 11))
+    assert len(queue) == 3
+    assert queue.starts_in(2) == 8 + 9
+    queue.append(MockEntry(None))
+    assert queue.total == 8 + 9 + 10
+
+
+def test_reorder():
+    """
+    Test the running totals after removing, moving and shuffling.
+    """
+    queue = _queue(10, 20, 30, 40)
+    queue.popleft()
+    assert queue.remove(1).duration == 30
+    assert [e.duration for e in queue] == [20, 40]
+    assert queue.starts_in(1) == 20
+    queue.append(MockEntry(5))
+    assert queue.move(2, 0).duration == 5
+    assert [e.duration for e in queue] == [5, 20, 40]
+    assert [queue.starts_in(i) for i in range(3)] == [0, 5, 25]
+    queue.shuffle()
+    assert queue.total == 65
+    assert queue.starts_in(2) == 65 - queue[2].duration
+
+
+def test_page():
+    """
+    Test paging.
+    """
+    queue = _queue(*range(45))
+    queue.popleft()
+    assert queue.pages(20) == 3
+    page = queue.page(3, 20)
+    assert [i for i, _ in page] == [40, 41, 42, 43]
+    assert page[0][1].duration == 41
+    assert SongQueue().pages(20) == 1
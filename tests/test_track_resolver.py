@@ -0,0 +1,93 @@
+from asyncio import gather
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+
+import pytest
+
+import core.music_core
+from core.music_core import TrackInfo, TrackResolver
+
+pytestmark = pytest.mark.asyncio
+
+
+class MockExtractor:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, query, opts):
+        self.calls.append(query)
+        sleep(0.05)
+        if query == 'nothing':
+            return None
+        return TrackInfo({'title': query, 'url': 'url',
+                          'is_live': query == 'live'})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    res = [0.0]
+    monkeypatch.setattr(core.music_core, 'monotonic', lambda: res[0])
+    return res
+
+
+@pytest.fixture
+def extractor(monkeypatch):
+    res = MockExtractor()
+    monkeypatch.setattr(core.music_core, '_extract', res)
+    return res
+
+
+@pytest.fixture
+def resolver(extractor):
+    res = TrackResolver(ttl=60, max_size=2)
+    res.executor.shutdown()
+    res.executor = ThreadPoolExecutor(2)
+    yield res
+    res.close()
+
+
+async def test_cache(resolver, extractor):
+    """
+    Test results are cached by normalised query, live streams and queries
+    without results aren't, and the least recently used result is evicted.
+    """
+    assert (await resolver.resolve('Some  Song')).title == 'Some  Song'
+    assert (await resolver.resolve('some song ')).title == 'Some  Song'
+    assert await resolver.resolve('nothing') is None
+    assert await resolver.resolve('nothing') is None
+    await resolver.resolve('live')
+    await resolver.resolve('live')
+    assert extractor.calls == ['Some  Song', 'nothing', 'nothing',
+                               'live', 'live']
+    assert (resolver.hits, resolver.misses) == (1, 5)
+
+    await resolver.resolve('other')
+    await resolver.resolve('some song')
+    await resolver.resolve('third')
+    assert resolver.get('other') is None
+    assert resolver.get('some song') is not None
+
+
+async def test_ttl(resolver, extractor, clock):
+    """
+    Test results are resolved again once they expire.
+    """
+    await resolver.resolve('song')
+    clock[0] = 59
+    assert resolver.get('song') is not None
+    clock[0] = 61
+    assert resolver.get('song') is None
+    await resolver.resolve('song')
+    assert extractor.calls == ['song', 'song']
+
+
+async def test_shared_request(resolver, extractor):
+    """
+    Test concurrent requests for the same query share one extraction.
+    """
+    res = await gather(resolver.resolve('song'), resolver.resolve('Song'),
+                       resolver.resolve('other'))
+    assert res[0] is res[1]
+    assert res[2].title == 'other'
+    assert extractor.calls == ['song', 'other']
+    assert not resolver._pending
@@ -0,0 +1,132 @@
+from asyncio import sleep
+from pathlib import Path
+
+import pytest
+from pytrivia import Category
+
+from core.trivia_pool import TriviaPool
+from tests import MockLogger
+
+pytestmark = pytest.mark.asyncio
+
+
+class MockApi:
+    def __init__(self, limit):
+        self.limit = limit
+        self.calls = []
+        self.down = False
+        self.empty = False
+        self.stale = False
+        self.count = 0
+        self.token = 'token'
+
+    async def request_async(self, session, close, amount, *args):
+        self.calls.append(amount)
+        if self.down:
+            raise OSError
+        if self.stale:
+            return {'response_code': 3, 'results': []}
+        if self.empty:
+            return {'response_code': 4, 'results': []}
+        if amount > self.limit:
+            return {'response_code': 1, 'results': []}
+        start, self.count = self.count, self.count + amount
+        return {'response_code': 0,
+                'results': [{'id': i} for i in range(start, self.count)]}
+
+
+class MockSessionManager:
+    session = None
+
+    def __init__(self, api=None):
+        self.api = api
+        self.resets = []
+
+    async def get_json(self, url, params):
+        self.resets.append(params)
+        if self.api is None:
+            raise OSError
+        if params['command'] == 'request':
+            self.api.stale = False
+            return {'response_code': 0, 'token': 'new token'}
+        self.api.empty = False
+        return {'response_code': 0, 'token': params['token']}
+
+
+async def test_prefetch(tmpdir):
+    """
+    Test questions are fetched in bulk and refilled below the watermark.
+    """
+    api = MockApi(20)
+    path = Path(str(tmpdir.join('bank.json')))
+    pool = TriviaPool(api, MockSessionManager(), MockLogger(),
+                      low_water=5, bank_path=path)
+    questions = [await pool.get(Category.Books) for _ in range(7)]
+    assert [q['id'] for q in questions] == list(range(7))
+    assert api.calls == [50, 25, 12]
+    await pool.get(Category.Books)
+    await sleep(0)
+    assert api.calls == [50, 25, 12, 50, 25, 12]
+    questions = [await pool.get(Category.Books) for _ in range(16)]
+    assert [q['id'] for q in questions] == list(range(8, 24))
+
+
+async def test_bank_fallback(tmpdir):
+    """
+    Test questions come from the bank when the api is down.
+    """
+    api = MockApi(50)
+    path = Path(str(tmpdir.join('bank.json')))
+    pool = TriviaPool(api, MockSessionManager(), MockLogger(), bank_path=path)
+    await pool.get(Category.Books)
+    await sleep(0.1)
+    api.down = True
+    pool = TriviaPool(api, MockSessionManager(), MockLogger(), bank_path=path)
+    assert await pool.get(Category.Books) is not None
+    assert await pool.get(Category.Film) is None
+    assert api.calls == [50, 50]
+
+
+async def test_token_reset(tmpdir):
+    """
+    Test the session token is reset once it has no questions left, and
+    only the bank is used if the reset fails.
+    """
+    api = MockApi(50)
+    api.empty = True
+    manager = MockSessionManager(api)
+    pool = TriviaPool(api, manager, MockLogger(),
+                      bank_path=Path(str(tmpdir.join('bank.json'))))
+    assert await pool.get(Category.Books) is not None
+    assert api.calls == [50, 50]
+    assert manager.resets == [{'command': 'reset', 'token': 'token'}]
+
+    api.empty = True
+    pool = TriviaPool(api, MockSessionManager(), MockLogger(),
+                      bank_path=Path(str(tmpdir.join('other.json'))))
+    assert await pool.get(Category.Film) is None
+    assert await pool.get(Category.Film) is None
+    assert api.calls == [50, 50, 50]
+
+
+async def test_token_request(tmpdir):
+    """
+    Test a new session token is requested once the old one is dropped,
+    and only the bank is used if the request fails.
+    """
+    api = MockApi(50)
+    api.stale = True
+    manager = MockSessionManager(api)
+    pool = TriviaPool(api, manager, MockLogger(),
+                      bank_path=Path(str(tmpdir.join('bank.json'))))
+    assert await pool.get(Category.Books) is not None
+    assert api.calls == [50, 50]
+    assert manager.resets == [{'command': 'request'}]
+    assert api.token == 'new token'
+
+    api.stale = True
+    pool = TriviaPool(api, MockSessionManager(), MockLogger(),
+                      bank_path=Path(str(tmpdir.join('other.json'))))
+    assert await pool.get(Category.Film) is None
+    assert await pool.get(Category.Film) is None
+    assert api.calls == [50, 50, 50]
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+
+from core.tz_index import TzIndex, build_index
+
+
+def _square(x0, y0, x1, y1):
+    return [[(x0, y0), (x1, y0), (x1, y1), (x0, y1), (x0, y0)]]
+
+
+@pytest.fixture(scope='module')
+def index(tmpdir_factory):
+    path = Path(str(tmpdir_factory.mktemp('tz').join('tz_index.bin')))
+    zones = [
+        ('Zone/Whole', [_square(0, 0, 10, 10)]),
+        ('Zone/Partial', [_square(-50.52, -20, -30.22, 5),
+                          _square(100, 40, 120, 60)]),
+        ('Zone/Hole', [_square(20, 20, 40, 40) +
+                       [[(25, 25), (35, 25), (35, 35), (25, 35)]]])
+    ]
+    yield TzIndex(build_index(zones, path))
+
+
+def test_whole_cells(index):
+    """
+    Test lookups in cells fully inside of a zone.
+    """
+    assert index.available
+    assert index.tz_name_at(5, 5) == 'Zone/Whole'
+    assert index.tz_name_at(0.01, 9.99) == 'Zone/Whole'
+    assert index.tz_name_at(50, 110) == 'Zone/Partial'
+
+
+def test_boundary_cells(index):
+    """
+    Test lookups in cells crossed by a zone boundary.
+    """
+    assert index.tz_name_at(0, -50.45) == 'Zone/Partial'
+    assert index.tz_name_at(0, -50.55) is None
+    assert index.tz_name_at(0, -30.25) == 'Zone/Partial'
+    assert index.tz_name_at(0, -30.15) is None
+
+
+def test_holes_and_sea(index):
+    """
+    Test lookups in polygon holes and outside of every zone.
+    """
+    assert index.tz_name_at(22, 22) == 'Zone/Hole'
+    assert index.tz_name_at(30, 30) is None
+    assert index.tz_name_at(-80, 0) is None
+    assert index.tz_name_at(90, 180) is None
+    assert index.tz_name_at(-90, -180) is None
+
+
+def test_missing_file(tmpdir):
+    """
+    Test a missing index file doesn't break lookups.
+    """
+    index = TzIndex(Path(str(tmpdir.join('missing.bin'))))
+    assert not index.available
+    assert index.tz_name_at(5, 5) is None
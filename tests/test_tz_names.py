@@ -0,0 +1,56 @@
+import pytest
+from pytz import all_timezones
+
+from core.tz_names import TzNameIndex
+
+
+@pytest.fixture(scope='module')
+def index():
+    yield TzNameIndex()
+
+
+def test_exact_names(index):
+    """
+    Test every time zone name resolves to itself.
+    """
+    for zone in all_timezones:
+        assert index.resolve(zone) == zone
+
+
+def test_aliases(index):
+    """
+    Test city, country and abbreviation aliases.
+    """
+    assert index.resolve('tokyo') == 'Asia/Tokyo'
+    assert index.resolve('New York') == 'America/New_York'
+    assert index.resolve('buenos aires') == 'America/Argentina/Buenos_Aires'
+    assert index.resolve('JST') == 'Asia/Tokyo'
+    assert index.resolve('pst') == 'America/Los_Angeles'
+    assert index.resolve('Germany') == 'Europe/Berlin'
+
+
+def test_offsets(index):
+    """
+    Test UTC offsets resolve to the Etc zones, or a named zone if they
+    aren't whole hours.
+    """
+    assert index.resolve('UTC+8') == 'Etc/GMT-8'
+    assert index.resolve('gmt - 5') == 'Etc/GMT+5'
+    assert index.resolve('UTC+14') == 'Etc/GMT-14'
+    assert index.resolve('UTC-13') is None
+    assert index.resolve('UTC+5:00') == 'Etc/GMT-5'
+    assert index.resolve('UTC+5:30') == 'Asia/Kolkata'
+    assert index.resolve('gmt-0330') == 'America/St_Johns'
+    assert index.resolve('UTC+545') == 'Asia/Kathmandu'
+    assert index.resolve('UTC+5:15') is None
+
+
+def test_fuzzy(index):
+    """
+    Test misspelled queries.
+    """
+    assert index.resolve('Amercia/Los Angles') == 'America/Los_Angeles'
+    assert index.resolve('londn') == 'Europe/London'
+    assert index.resolve('sydny') == 'Australia/Sydney'
+    assert index.resolve('qwertyuiop') is None
+    assert index.resolve('   ') is None
@@ -0,0 +1,50 @@
+import pytest
+
+from core.music_core import VoiceSessions
+from tests import MockLogger
+
+pytestmark = pytest.mark.asyncio
+
+
+class MockSession:
+    def __init__(self):
+        self.idle_since = 0
+        self.closed = None
+
+    def is_connected(self):
+        return True
+
+    def is_playing(self):
+        return self.idle_since is None
+
+    def ffmpeg_processes(self):
+        return int(self.is_playing())
+
+    async def close(self, timed_out):
+        self.closed = timed_out
+
+
+async def test_sweep():
+    """
+    Test only the sessions idle for longer than the timeout are closed.
+    """
+    sessions = VoiceSessions(MockSession, MockLogger(), idle_timeout=10,
+                             interval=3600)
+    idle = sessions.get(1)
+    playing = sessions.get(2)
+    playing.idle_since = None
+    recent = sessions.get(3)
+    recent.idle_since = 5
+    assert sessions.get(1) is idle
+    assert sessions.stats() == {
+        'sessions': 3, 'connected': 3, 'playing': 1, 'ffmpeg': 1
+    }
+    assert await sessions.sweep(now=12) == 1
+    assert idle.closed is True
+    assert 1 not in sessions and 3 in sessions
+    assert await sessions.sweep(now=15) == 1
+    assert len(sessions) == 1
+    assert sessions.evicted == 2
+    await sessions.close()
+    assert playing.closed is False
+    assert len(sessions) == 0
@@ -0,0 +1,114 @@
+from asyncio import sleep
+
+import pytest
+
+from data_controller.warns import WarnTracker
+from tests import MockLogger
+
+pytestmark = pytest.mark.asyncio
+
+
+class MockPostgres:
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+        self.rows = []
+
+    async def get_warn_rules(self):
+        return self.rules
+
+    async def set_warn_rule(self, values):
+        self.rules.append(values)
+
+    async def delete_warn_rule(self, values):
+        pass
+
+    async def add_warns(self, rows):
+        self.rows.append(rows)
+
+    async def get_warns(self, guild_id, member_id, limit):
+        return [r[2:] for rows in self.rows for r in rows
+                if r[:2] == (guild_id, member_id)][::-1][:limit]
+
+
+class MockDataManager:
+    def __init__(self):
+        self.warns = {}
+
+    def get_member_warns(self, member_id, guild_id):
+        return self.warns.get((member_id, guild_id))
+
+    async def set_member_warns(self, member_id, guild_id, warns):
+        self.warns[(member_id, guild_id)] = warns
+
+
+async def _tracker(rules=()):
+    tracker = WarnTracker(
+        MockPostgres(rules), MockDataManager(), MockLogger(), window=0.01
+    )
+    await tracker.init()
+    return tracker
+
+
+async def test_escalation():
+    """
+    Test that warns escalate at the rule thresholds of their guild
+    """
+    tracker = await _tracker([('1', 2, 'mute'), ('1', 3, 'ban')])
+    assert await tracker.add(1, 5, 9, 'a', True) == (1, None)
+    assert await tracker.add(1, 5, 9, 'b', True) == (2, 'mute')
+    assert await tracker.add(2, 5, 9, 'c', True) == (1, None)
+    assert await tracker.add(1, 5, 9, 'd', False) == (1, None)
+    assert await tracker.add(1, 5, 9, 'e', True) == (2, 'mute')
+    assert await tracker.add(1, 5, 9, 'f', True) == (3, 'ban')
+
+    await tracker.remove_rule(1, 3)
+    await tracker.set_rule(1, 4, 'kick')
+    assert tracker.get_rules(1) == {2: 'mute', 4: 'kick'}
+    assert await tracker.add(1, 6, 9, 'g', True) == (1, None)
+
+
+async def test_pardon_floor():
+    """
+    Test that a pardon never makes the warn count negative
+    """
+    tracker = await _tracker()
+    assert await tracker.add(1, 5, 9, 'a', False) == (0, None)
+
+
+async def test_history_batch():
+    """
+    Test that history rows are written in one batch
+    """
+    tracker = await _tracker()
+    for i in range(3):
+        await tracker.add(1, 5, 9, str(i), i != 1)
+    await sleep(0.05)
+    postgres = tracker._WarnTracker__postgres
+    assert len(postgres.rows) == 1
+    assert [r[3:5] for r in postgres.rows[0]] == [
+        ('0', False), ('1', True), ('2', False)
+    ]
+    await tracker.add(1, 5, 9, 'x', True)
+    history = await tracker.history(1, 5, 2)
+    assert [h[1] for h in history] == ['x', '2']
+
+
+class SlowPostgres(MockPostgres):
+    async def add_warns(self, rows):
+        await sleep(0.05)
+        self.rows.append(rows)
+
+
+async def test_added_while_writing():
+    """
+    Test rows added while a batch is being written are not left behind
+    """
+    tracker = WarnTracker(
+        SlowPostgres(), MockDataManager(), MockLogger(), window=0.01
+    )
+    await tracker.add(1, 5, 9, 'a', True)
+    await sleep(0.03)
+    await tracker.add(1, 5, 9, 'b', True)
+    await tracker.close()
+    postgres = tracker._WarnTracker__postgres
+    assert [r[3] for rows in postgres.rows for r in rows] == ['a', 'b']
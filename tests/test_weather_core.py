@@ -0,0 +1,100 @@
+from asyncio import gather
+
+import pytest
+
+import core.weather_core
+from bot import HTTPStatusError
+from core.weather_core import WeatherBatcher, WeatherCache, weather
+
+pytestmark = pytest.mark.asyncio
+
+LOCALIZE = {'nothing_found': 'nothing found', 'api_error': '{} error'}
+
+
+class MockSessionManager:
+    def __init__(self, missing=()):
+        self.missing = missing
+        self.calls = []
+
+    async def get_json(self, url, params):
+        self.calls.append(params)
+        if 'q' in params:
+            raise HTTPStatusError(404, 'NOT_FOUND')
+        ids = [int(i) for i in params['id'].split(',')]
+        return {'list': [{'id': i} for i in ids if i not in self.missing]}
+
+
+@pytest.fixture
+def now(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(core.weather_core, 'time', lambda: clock[0])
+    return clock
+
+
+async def test_normalise(now):
+    """
+    Test lookups differing only in case and whitespace share an entry, and
+    a location is resolved to its city id.
+    """
+    cache = WeatherCache()
+    cache.put('  New   York ,US', {'id': 5, 'dt': 1000})
+    assert cache.get('new york, us') == {'id': 5, 'dt': 1000}
+    assert cache.get_id('NEW YORK,us') == 5
+    assert cache.get('new york') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.hit_rate == 0.5
+
+
+async def test_ttl(now):
+    """
+    Test entries expire when the upstream data is due to be updated, but
+    are kept for at least the minimum ttl.
+    """
+    cache = WeatherCache(interval=600, min_ttl=60)
+    cache.put('tokyo', {'id': 1, 'dt': 900})
+    cache.put('paris', {'id': 2, 'dt': 100})
+    now[0] = 1050
+    assert cache.get('tokyo') is not None
+    assert cache.get('paris') is not None
+    now[0] = 1100
+    assert cache.get('paris') is None
+    now[0] = 1500
+    assert cache.get('tokyo') is None
+    assert cache.get_id('tokyo') == 1
+
+
+async def test_coalesce():
+    """
+    Test lookups within the window are sent as one request per batch, and
+    the same city is only asked for once.
+    """
+    manager = MockSessionManager()
+    batcher = WeatherBatcher(manager, 'key', window=0.01, batch_size=3)
+    res = await gather(*[batcher.get(i) for i in (1, 2, 1, 3, 4)])
+    assert [r['id'] for r in res] == [1, 2, 1, 3, 4]
+    batches = [c['id'].split(',') for c in manager.calls]
+    assert sorted(map(len, batches)) == [1, 3]
+    assert sorted(id_ for batch in batches for id_ in batch) == [
+        '1', '2', '3', '4'
+    ]
+    assert batcher.upstream_calls == 2
+
+
+async def test_not_found():
+    """
+    Test a city missing from the response raises a 404, and an unknown
+    location is reported as not found.
+    """
+    manager = MockSessionManager(missing=(2,))
+    batcher = WeatherBatcher(manager, 'key', window=0.01)
+    res = await gather(batcher.get(1), batcher.get(2),
+                       return_exceptions=True)
+    assert res[0] == {'id': 1}
+    assert isinstance(res[1], HTTPStatusError)
+    assert res[1].code == 404
+
+    cache = WeatherCache()
+    res = await weather('key', None, manager, None, cache, batcher,
+                        'nowhere', LOCALIZE)
+    assert res == 'nothing found'
+    assert cache.get_id('nowhere') is None
@@ -6,17 +6,17 @@ from translations import Translation
 def test_language():
     tr = Translation()
     en = tr.en
-    for lan, val in tr._data.items():
+    for lan in tr.languages:
         if lan == 'en':
             continue
-        for file_name, file_data in val.items():
+        for file_name, file_data in tr.raw(lan).items():
             assert file_name in en
             for key, en_key in zip_longest(
                     file_data.keys(), en[file_name].keys()):
                 assert not key or key in en[file_name]
                 assert (
-                    tr.get(lan, file_name, en_key) ==
-                    tr.get(lan, file_name[:-5], en_key)
+                    tr.get(lan, file_name + '.json', en_key) ==
+                    tr.get(lan, file_name, en_key)
                 )
                 if en_key in file_data:
                     assert (
@@ -28,3 +28,31 @@ def test_language():
                         tr.get(lan, file_name, en_key) ==
                         tr.get('en', file_name, en_key)
                     )
+
+
+def test_lazy_load():
+    tr = Translation()
+    lan = next(lan for lan in tr.languages if lan != 'en')
+    assert set(tr._raw) == {'en'}
+    assert tr.get(lan, 'meta', 'code') == lan
+    assert set(tr._raw) == {'en', lan}
+    for bad in (('xx', 'meta', 'code'), ('en', 'xx', 'code'),
+                ('en', 'meta', 'xx')):
+        try:
+            tr.get(*bad)
+        except KeyError:
+            pass
+        else:
+            assert False
+
+
+def test_reload():
+    tr = Translation()
+    lan = next(lan for lan in tr.languages if lan != 'en')
+    expected = tr.get(lan, 'meta', 'native_name')
+    old_table = tr._table
+    tr.reload()
+    assert tr._table is not old_table
+    assert set(tr._raw) == {'en', lan}
+    assert (lan, 'meta', 'native_name') in tr._table
+    assert tr.get(lan, 'meta', 'native_name') == expected
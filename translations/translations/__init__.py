@@ -1,5 +1,6 @@
 from json import load
-from pathlib import Path
+from sys import intern
+from typing import Dict, Tuple
 
 from language_data import LANGUAGE_PATH
 
@@ -26,49 +27,105 @@ def _good_folder(path):
     return False
 
 
-def get_all_data():
+def get_languages() -> Tuple[str]:
     """
-    Get all language data.
+    Get the names of all languages with language data.
 
-    :return: All of the language data in a dict.
+    :return: A tuple of language names.
     """
+    return tuple(sorted(
+        path.name for path in LANGUAGE_PATH.iterdir() if _good_folder(path)
+    ))
+
+
+def get_language_data(lan: str) -> Dict[str, dict]:
+    """
+    Get the language data of a single language.
+
+    :param lan: the language name.
+
+    :return: A dict of {file name without extension: file content}
+
+    :raises KeyError: If the language doesn't exist.
+    """
+    path = LANGUAGE_PATH.joinpath(lan)
+    if not _good_folder(path):
+        raise KeyError(lan)
     res = {}
-    for folder in LANGUAGE_PATH.iterdir():
-        path = Path(folder)
-        lan_name = path.name
-        if not _good_folder(path):
+    for file in path.iterdir():
+        if file.suffix != '.json':
             continue
-        for file in path.iterdir():
-            if not file.name.endswith('.json'):
-                continue
-            fp = Path(file)
-            fname = fp.name
-            with fp.open() as f:
-                dict_ = load(f, encoding='utf-8')
-            if lan_name not in res:
-                res[lan_name] = {}
-            res[lan_name][fname] = dict_
+        with file.open(encoding='utf-8') as f:
+            res[intern(file.stem)] = load(f)
+    return res
+
+
+def _compile(lan_data: Dict[str, dict], en_data: Dict[str, dict],
+             lan: str) -> dict:
+    """
+    Compile the data of a language into a flat lookup table, with English
+    fallbacks already resolved.
+
+    :param lan_data: the language data.
+
+    :param en_data: the English language data.
+
+    :param lan: the language name.
+
+    :return: A dict of {(language, file, key): value}
+    """
+    lan = intern(lan)
+    res = {}
+    for file in set(en_data) | set(lan_data):
+        merged = dict(en_data.get(file, {}))
+        merged.update(lan_data.get(file, {}))
+        for key, val in merged.items():
+            if isinstance(val, str):
+                val = intern(val)
+            res[(lan, file, intern(key))] = val
     return res
 
 
 class Translation:
     """
     Class to provide translation support for Hifumi.
+
+    All strings are kept in a single flat table keyed by
+    (language, file, key). Languages other than English are compiled
+    into the table the first time they are requested.
     """
-    __slots__ = ('_data',)
+    __slots__ = ('_languages', '_raw', '_table')
 
     def __init__(self):
         """
         Init the class.
         """
-        self._data = {}
+        self._languages = ()
+        self._raw = {}
+        self._table = {}
         self.reload()
 
     def reload(self):
         """
-        Reload the class with new data read from disk.
+        Reload the class with new data read from disk. The languages that
+        were already loaded are compiled again and swapped in at once.
+        """
+        languages = get_languages()
+        en = get_language_data('en')
+        raw = {'en': en}
+        table = _compile(en, en, 'en')
+        for lan in self._raw:
+            if lan != 'en' and lan in languages:
+                raw[lan] = get_language_data(lan)
+                table.update(_compile(raw[lan], en, lan))
+        self._languages, self._raw, self._table = languages, raw, table
+
+    @property
+    def languages(self) -> Tuple[str]:
+        """
+        :return: The names of all available languages.
         """
-        self._data = get_all_data()
+        return self._languages
 
     @property
     def en(self):
@@ -76,7 +133,38 @@ class Translation:
         A quick access to the base language(English)
         :return: The English language data.
         """
-        return self._data['en']
+        return self._raw['en']
+
+    def raw(self, lan: str) -> Dict[str, dict]:
+        """
+        Get the language data of a language as it is on disk.
+
+        :param lan: The language name.
+
+        :return: A dict of {file name without extension: file content}
+
+        :raises KeyError: If the language doesn't exist.
+        """
+        self.__load(lan)
+        return self._raw[lan]
+
+    def __load(self, lan: str):
+        """
+        Compile a language into the table if it hasn't been loaded.
+
+        :param lan: The language name.
+
+        :raises KeyError: If the language doesn't exist.
+        """
+        if lan in self._raw:
+            return
+        if lan not in self._languages:
+            raise KeyError(lan)
+        data = get_language_data(lan)
+        table = dict(self._table)
+        table.update(_compile(data, self.en, lan))
+        self._raw = {**self._raw, lan: data}
+        self._table = table
 
     def get(self, lan: str, file: str, key: str) -> str:
         """
@@ -93,10 +181,13 @@ class Translation:
             return in English if not found.
 
         :raises KeyError:
-            If the language or file name is not in all of the data.
+            If the language, file name or key is not in all of the data.
         """
-        if not file.endswith('.json'):
-            file = f'{file}.json'
-        language_data = self._data[lan][file]
-        english_data = self.en[file][key]
-        return language_data.get(key, english_data)
+        try:
+            return self._table[(lan, file, key)]
+        except KeyError:
+            pass
+        if file.endswith('.json'):
+            file = file[:-5]
+        self.__load(lan)
+        return self._table[(lan, file, key)]